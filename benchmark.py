@@ -0,0 +1,1421 @@
+#!/usr/bin/env python3
+"""
+Benchmarks de rendimiento para Henko Bot
+Levanta servidores HTTP locales que imitan la tienda y miden el bot contra ellos
+"""
+
+import argparse
+import glob
+import hashlib
+import html
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import tracemalloc
+import struct
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CATEGORIAS_FIXTURE = ["Soutien", "Body", "Conjunto", "Bombacha", "Medias", "Pijama", "Top"]
+MARCAS_FIXTURE = ["Marcela Koury", "Lody", "Jazmin Chic", "Sweet Lady", "Henko"]
+
+COLORES_FIXTURE = ["Negro", "Blanco", "Nude", "Rojo", "Bordó"]
+TALLES_FIXTURE = ["S", "M", "L", "XL", "85", "90", "95"]
+
+def generar_pagina_catalogo(pagina: int = 1, productos_por_pagina: int = 60, total_paginas: int = 10,
+                            estructurados: bool = True) -> str:
+    """Genera HTML con la estructura de un listado de Tienda Nube
+
+    Con `estructurados` incluye las variantes en data-variants y un ItemList JSON-LD.
+    """
+    rng = random.Random(pagina)
+    tarjetas = []
+    items_json_ld = []
+
+    for i in range(productos_por_pagina):
+        producto_id = 10000 + pagina * 1000 + i
+        categoria = rng.choice(CATEGORIAS_FIXTURE)
+        marca = rng.choice(MARCAS_FIXTURE)
+        slug = f"{categoria.lower()}-{marca.lower().replace(' ', '-')}-{producto_id}"
+        precio = rng.randint(5000, 40000)
+        imagen = f"//acdn.mitiendanube.com/stores/001/products/{slug}-640-0.jpg"
+
+        variantes = [
+            {'product_id': producto_id, 'price_short': f"${precio:,.0f}".replace(',', '.'),
+             'compare_at_price_short': f"${precio * 1.2:,.0f}".replace(',', '.'),
+             'stock': rng.choice([None, 0, 2, 10]), 'available': True,
+             'image_url': imagen, 'option0': color, 'option1': talle}
+            for color in rng.sample(COLORES_FIXTURE, 2) for talle in rng.sample(TALLES_FIXTURE, 3)
+        ]
+        atributo_variantes = ""
+        if estructurados:
+            atributo_variantes = " data-variants='" + json.dumps(variantes).replace("'", "&#39;") + "'"
+            items_json_ld.append({
+                '@type': 'ListItem', 'position': i + 1,
+                'item': {'@type': 'Product', 'name': f"{producto_id} | {marca} {categoria}",
+                         'url': f"/productos/{slug}/", 'image': imagen, 'brand': {'@type': 'Brand', 'name': marca},
+                         'offers': {'@type': 'Offer', 'price': precio, 'priceCurrency': 'ARS',
+                                    'availability': 'http://schema.org/InStock'}}
+            })
+
+        tarjetas.append(f"""
+        <div class="js-item-product col-6 col-md-3 item item-product" data-product-id="{producto_id}"{atributo_variantes}>
+          <div class="item-image">
+            <a href="/productos/{slug}/" title="{categoria} {marca}">
+              <img class="js-item-image lazyload" src="data:image/gif;base64,R0lGODlhAQABAIAAAP"
+                   data-src="https://acdn.mitiendanube.com/stores/001/products/{slug}-640-0.jpg"
+                   data-srcset="https://acdn.mitiendanube.com/stores/001/products/{slug}-320-0.jpg 320w, https://acdn.mitiendanube.com/stores/001/products/{slug}-640-0.jpg 640w, https://acdn.mitiendanube.com/stores/001/products/{slug}-1024-1024.jpg 1024w"
+                   alt="{categoria}">
+            </a>
+          </div>
+          <div class="item-description">
+            <a href="/productos/{slug}/" class="item-link">
+              <div class="item-name">{producto_id} | {marca} {categoria}</div>
+            </a>
+            <div class="item-price-container">
+              <span class="item-price-compare">${precio * 1.2:,.0f}</span>
+              <span class="item-price">${precio:,.0f}</span>
+            </div>
+            <div class="item-stock">{'¡Quedan pocas unidades!' if i % 7 == 0 else ''}</div>
+            <a href="/productos/{slug}/" class="btn btn-primary">Comprar</a>
+          </div>
+        </div>""")
+
+    menu = "".join(f'<li><a href="/{c.lower()}/">{c}</a></li>' for c in CATEGORIAS_FIXTURE * 5)
+    paginacion = "".join(
+        f'<li class="pagination-item"><a href="/productos/page/{n}/">{n}</a></li>'
+        for n in range(1, total_paginas + 1)
+    )
+    scripts = "".join(f'<script>window.dataLayer = window.dataLayer || []; var x{n} = {n};</script>' for n in range(40))
+    if estructurados:
+        item_list = {'@context': 'https://schema.org', '@type': 'ItemList', 'itemListElement': items_json_ld}
+        scripts += f'<script type="application/ld+json">{json.dumps(item_list)}</script>'
+
+    return f"""<!DOCTYPE html>
+<html lang="es">
+<head><title>Productos - Henko Lencería</title>{scripts}</head>
+<body>
+  <header class="head-main"><nav class="js-nav"><ul class="nav-list">{menu}</ul></nav></header>
+  <section class="category-body">
+    <div class="js-product-table row">{''.join(tarjetas)}</div>
+    <ul class="pagination">{paginacion}</ul>
+  </section>
+  <footer class="js-footer"><ul>{menu}</ul><p>Henko Lencería - Todos los derechos reservados</p></footer>
+</body>
+</html>"""
+
+def generar_pagina_detalle(slug: str) -> str:
+    """Genera la página de detalle de un producto con su formulario de variantes y JSON-LD"""
+    producto_id = int(slug.rsplit('-', 1)[-1]) if slug.rsplit('-', 1)[-1].isdigit() else 0
+    rng = random.Random(producto_id)
+    precio = rng.randint(5000, 40000)
+    imagen = f"//acdn.mitiendanube.com/stores/001/products/{slug}-1024-1024.jpg"
+    variantes = [
+        {'product_id': producto_id, 'price_short': f"${precio:,.0f}".replace(',', '.'),
+         'compare_at_price_short': f"${precio * 1.2:,.0f}".replace(',', '.'),
+         'stock': rng.choice([0, 1, 3, 8]), 'available': True, 'image_url': imagen,
+         'option0': color, 'option1': talle}
+        for color in COLORES_FIXTURE for talle in TALLES_FIXTURE
+    ]
+    json_ld = {'@context': 'https://schema.org', '@type': 'Product', 'name': slug.replace('-', ' ').title(),
+               'url': f"/productos/{slug}/", 'image': imagen,
+               'offers': {'@type': 'Offer', 'price': precio, 'priceCurrency': 'ARS'}}
+    relacionados = "".join(
+        f"""<div class="js-item-product item-product" data-variants='[{{"option0": "Verde"}}]'>
+        <a href="/productos/relacionado-{n}/">Relacionado {n}</a></div>""" for n in range(8)
+    )
+
+    return f"""<!DOCTYPE html>
+<html lang="es">
+<head><title>{slug}</title><script type="application/ld+json">{json.dumps(json_ld)}</script></head>
+<body>
+  <div class="js-product-container">
+    <form class="js-product-form" data-variants='{json.dumps(variantes)}'>
+      <h1>{json_ld['name']}</h1><button>Agregar al carrito</button>
+    </form>
+  </div>
+  <section class="related-products">{relacionados}</section>
+</body>
+</html>"""
+
+def generar_png(ancho: int, alto: int, semilla: int = 0) -> bytes:
+    """Genera un PNG RGB con ruido, sin depender de Pillow, que imita una foto pesada"""
+    rng = random.Random(semilla)
+    filas = b''.join(b'\x00' + rng.randbytes(ancho * 3) for _ in range(alto))
+
+    def bloque(tipo: bytes, datos: bytes) -> bytes:
+        return struct.pack('>I', len(datos)) + tipo + datos + struct.pack('>I', zlib.crc32(tipo + datos))
+
+    return (b'\x89PNG\r\n\x1a\n' + bloque(b'IHDR', struct.pack('>IIBBBBB', ancho, alto, 8, 2, 0, 0, 0))
+            + bloque(b'IDAT', zlib.compress(filas, 1)) + bloque(b'IEND', b''))
+
+class ServidorTiendaLocal:
+    """Servidor HTTP local que imita el listado de la tienda con latencia configurable"""
+
+    def __init__(self, latencia: float = 0.2, total_paginas: int = 10):
+        self.latencia = latencia
+        self.total_paginas = total_paginas
+        self.peticiones = 0
+        self.urls_invalidas = 0
+        self.bytes_enviados = 0
+        self._paginas = {}
+        self._imagenes = {}
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                servidor.peticiones += 1
+                time.sleep(servidor.latencia)
+                if self.path.startswith('/imagenes/'):
+                    cuerpo = servidor._imagen(self.path)
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'image/png')
+                    self.send_header('Content-Length', str(len(cuerpo)))
+                    self.end_headers()
+                    self.wfile.write(cuerpo)
+                    servidor.bytes_enviados += len(cuerpo)
+                    return
+                # Como un servidor real: una URL mal armada (p. ej. dos '?') no se interpreta como página 1
+                ruta, _, query = self.path.partition('?')
+                if '?' in query or any('=' not in parametro for parametro in query.split('&') if parametro):
+                    servidor.urls_invalidas += 1
+                    self.send_error(400, 'URL mal formada')
+                    return
+                match = re.fullmatch(r'/productos/page/(\d+)/?', ruta)
+                if ruta.startswith('/productos/') and ruta != '/productos/' and not match:
+                    slug = ruta.split('/productos/', 1)[1].strip('/')
+                    cuerpo = generar_pagina_detalle(slug).encode('utf-8')
+                else:
+                    pagina = servidor._pagina_desde_path(ruta)
+                    cuerpo = servidor._html_pagina(pagina).encode('utf-8')
+                etag = '"' + hashlib.md5(cuerpo).hexdigest() + '"'
+
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(cuerpo)))
+                self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(cuerpo)
+                servidor.bytes_enviados += len(cuerpo)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def _pagina_desde_path(self, ruta: str) -> int:
+        # /productos/page/<n>/, igual que los enlaces de paginación; fuera de rango devuelve la página 1
+        match = re.fullmatch(r'/productos/page/(\d+)/?', ruta)
+        numero = int(match.group(1)) if match else 1
+        return numero if 1 <= numero <= self.total_paginas else 1
+
+    def _html_pagina(self, pagina: int) -> str:
+        if pagina not in self._paginas:
+            self._paginas[pagina] = generar_pagina_catalogo(pagina, total_paginas=self.total_paginas)
+        return self._paginas[pagina]
+
+    def _imagen(self, path: str) -> bytes:
+        # /imagenes/<n>-<ancho>x<alto>.png
+        if path not in self._imagenes:
+            nombre = path.rsplit('/', 1)[-1].split('.')[0]
+            semilla, medidas = nombre.split('-')
+            ancho, alto = (int(x) for x in medidas.split('x'))
+            self._imagenes[path] = generar_png(ancho, alto, int(semilla))
+        return self._imagenes[path]
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+class ServidorTelegramFalso:
+    """Servidor local que imita la Bot API de Telegram: sendMessage y sendPhoto con file_id
+
+    Puede inyectar respuestas 429 (con retry_after) y 5xx con la probabilidad indicada.
+    """
+
+    def __init__(self, latencia: float = 0.1, latencia_por_mb: float = 0.5, probabilidad_429: float = 0.0,
+                 retry_after: float = 1, probabilidad_5xx: float = 0.0, semilla: int = 1):
+        self.latencia = latencia
+        self.latencia_por_mb = latencia_por_mb
+        self.probabilidad_429 = probabilidad_429
+        self.retry_after = retry_after
+        self.probabilidad_5xx = probabilidad_5xx
+        self._rng = random.Random(semilla)
+        self.peticiones = 0
+        self.conexiones = 0
+        self.errores_inyectados = 0
+        self.errores_formato = 0
+        self.largo_maximo = {'text': 0, 'caption': 0}  # largo visible de los textos aceptados
+        self.envios_por_chat = {}  # chat_id -> instantes de llegada
+        self.bytes_recibidos = 0
+        self.metodos = {}
+        self._file_ids = set()
+        self._lock = threading.Lock()
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, como la API real
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with servidor._lock:
+                    servidor.conexiones += 1
+
+            def do_POST(self):
+                cuerpo = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                metodo = self.path.rsplit('/', 1)[-1]
+                campos, archivos = servidor._leer_formulario(self.headers.get('Content-Type', ''), cuerpo)
+                with servidor._lock:
+                    servidor.peticiones += 1
+                    servidor.bytes_recibidos += len(cuerpo)
+                    servidor.envios_por_chat.setdefault(campos.get('chat_id'), []).append(time.monotonic())
+                    servidor.metodos[metodo] = servidor.metodos.get(metodo, 0) + 1
+
+                # Simular el tiempo de subida del cuerpo además de la latencia de red
+                time.sleep(servidor.latencia + len(cuerpo) / (1024 * 1024) * servidor.latencia_por_mb)
+                estado, respuesta = servidor._responder(metodo, campos, archivos)
+                datos = json.dumps(respuesta).encode('utf-8')
+                self.send_response(estado)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    @staticmethod
+    def _leer_formulario(content_type: str, cuerpo: bytes):
+        """Devuelve (campos, archivos) de un cuerpo urlencoded o multipart"""
+        from email.parser import BytesParser
+        from urllib.parse import parse_qs
+
+        if not content_type.startswith('multipart/'):
+            return {k: v[0] for k, v in parse_qs(cuerpo.decode('utf-8')).items()}, {}
+
+        mensaje = BytesParser().parsebytes(b'Content-Type: ' + content_type.encode() + b'\r\n\r\n' + cuerpo)
+        campos, archivos = {}, {}
+        for parte in mensaje.get_payload():
+            nombre = parte.get_param('name', header='content-disposition')
+            if parte.get_filename():
+                archivos[nombre] = parte.get_payload(decode=True)
+            else:
+                campos[nombre] = parte.get_payload(decode=True).decode('utf-8')
+        return campos, archivos
+
+    @staticmethod
+    def _error_formato(texto: str, parse_mode: str, limite: int):
+        """Valida entidades y longitud como la Bot API; devuelve la descripción del error o None"""
+        if parse_mode == 'HTML':
+            pila = []
+            for etiqueta in re.findall(r'<[^>]*>|<', texto):
+                nombre = re.match(r'</?([a-z]+)', etiqueta)
+                if not nombre or nombre.group(1) not in ('b', 'i', 'u', 's', 'code', 'pre', 'a'):
+                    return f"Bad Request: can't parse entities: Unsupported start tag \"{etiqueta}\""
+                if etiqueta.startswith('</'):
+                    if not pila or pila.pop() != nombre.group(1):
+                        return "Bad Request: can't parse entities: Unmatched end tag"
+                else:
+                    pila.append(nombre.group(1))
+            if pila or re.search(r'&(?!(lt|gt|amp|quot|#\d+);)', texto):
+                return "Bad Request: can't parse entities: Can't find end tag or bad entity"
+            visible = html.unescape(re.sub(r'<[^>]*>', '', texto))
+        elif parse_mode == 'MarkdownV2':
+            visible, abiertas, escapado = [], set(), False
+            for caracter in texto:
+                if escapado:
+                    visible.append(caracter)
+                    escapado = False
+                elif caracter == '\\':
+                    escapado = True
+                elif caracter in '*_~|':
+                    abiertas ^= {caracter}
+                elif caracter in '[]()`>#+-=|{}.!':
+                    return f"Bad Request: can't parse entities: Character '{caracter}' is reserved and must be escaped"
+                else:
+                    visible.append(caracter)
+            if abiertas:
+                return "Bad Request: can't parse entities: Can't find end of the entity"
+            visible = ''.join(visible)
+        elif parse_mode == 'Markdown':
+            if texto.count('*') % 2 or texto.count('_') % 2 or texto.count('[') != texto.count(']'):
+                return "Bad Request: can't parse entities: Can't find end of the entity starting at byte offset 0"
+            visible = re.sub(r'[*_`]', '', texto)
+        else:
+            visible = texto
+
+        if len(visible.encode('utf-16-le')) // 2 > limite:
+            return 'Bad Request: message caption is too long' if limite == 1024 else 'Bad Request: message is too long'
+        return None
+
+    @staticmethod
+    def _largo_visible(texto: str, parse_mode: str) -> int:
+        """Largo en unidades UTF-16 del texto sin marcas, como lo cuenta Telegram para los límites"""
+        if parse_mode == 'HTML':
+            texto = html.unescape(re.sub(r'<[^>]*>', '', texto))
+        elif parse_mode == 'MarkdownV2':
+            texto = re.sub(r'\\(.)', r'\1', re.sub(r'(?<!\\)[*_~|]', '', texto))
+        return len(texto.encode('utf-16-le')) // 2
+
+    def _responder(self, metodo: str, campos: dict, archivos: dict):
+        textos = [('text', campos.get('text'), campos.get('parse_mode'), 4096),
+                  ('caption', campos.get('caption'), campos.get('parse_mode'), 1024)]
+        if metodo == 'sendMediaGroup':
+            textos += [('caption', i.get('caption'), i.get('parse_mode'), 1024)
+                       for i in json.loads(campos.get('media', '[]'))]
+        for campo, texto, parse_mode, limite in textos:
+            if texto is None:
+                continue
+            error = self._error_formato(texto, parse_mode, limite)
+            with self._lock:
+                if error:
+                    self.errores_formato += 1
+                else:
+                    self.largo_maximo[campo] = max(self.largo_maximo[campo], self._largo_visible(texto, parse_mode))
+            if error:
+                return 400, {'ok': False, 'error_code': 400, 'description': error}
+
+        with self._lock:
+            azar = self._rng.random()
+        if azar < self.probabilidad_429:
+            self.errores_inyectados += 1
+            return 429, {'ok': False, 'error_code': 429, 'parameters': {'retry_after': self.retry_after},
+                         'description': f'Too Many Requests: retry after {self.retry_after}'}
+        if azar < self.probabilidad_429 + self.probabilidad_5xx:
+            self.errores_inyectados += 1
+            return 502, {'ok': False, 'error_code': 502, 'description': 'Bad Gateway'}
+
+        resultado = {'message_id': self.peticiones, 'chat': {'id': campos.get('chat_id')}}
+        if metodo == 'sendMediaGroup':
+            mensajes = []
+            for item in json.loads(campos.get('media', '[]')):
+                estado, respuesta = self._responder_foto(item['media'], archivos)
+                if estado != 200:
+                    return estado, respuesta
+                mensajes.append(dict(resultado, photo=respuesta))
+            return 200, {'ok': True, 'result': mensajes}
+        if metodo == 'sendPhoto':
+            estado, respuesta = self._responder_foto(campos.get('photo', 'attach://photo'), archivos)
+            if estado != 200:
+                return estado, respuesta
+            resultado['photo'] = respuesta
+        return 200, {'ok': True, 'result': resultado}
+
+    def _responder_foto(self, media: str, archivos: dict):
+        """Devuelve los PhotoSize de una foto subida, por URL o por file_id conocido"""
+        if media.startswith('attach://') and media[len('attach://'):] in archivos:
+            file_id = 'AgAC' + hashlib.md5(archivos[media[len('attach://'):]]).hexdigest()
+            with self._lock:
+                self._file_ids.add(file_id)
+        elif media in self._file_ids or media.startswith('http'):
+            file_id = media
+        else:
+            return 400, {'ok': False, 'error_code': 400,
+                         'description': 'Bad Request: wrong file identifier/HTTP URL specified'}
+        return 200, [{'file_id': file_id + '-s', 'width': 90}, {'file_id': file_id, 'width': 1280}]
+
+    def max_por_segundo(self) -> int:
+        """Máximo de peticiones recibidas en cualquier ventana de un segundo"""
+        instantes = sorted(t for lista in self.envios_por_chat.values() for t in lista)
+        inicio, maximo = 0, 0
+        for fin, instante in enumerate(instantes):
+            while instante - instantes[inicio] >= 1:
+                inicio += 1
+            maximo = max(maximo, fin - inicio + 1)
+        return maximo
+
+    def olvidar_file_ids(self):
+        """Simula que Telegram dejó de reconocer los file_id emitidos"""
+        with self._lock:
+            self._file_ids.clear()
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def crear_telegram(servidor: ServidorTelegramFalso, **kwargs):
+    """Crea un TelegramBot apuntando a la Bot API falsa"""
+    from henko_bot import TelegramBot
+
+    bot = TelegramBot('123:ABC', '-1001', **kwargs)
+    bot.api_url = f"{servidor.url}/bot123:ABC"
+    return bot
+
+def crear_scraper(url_base: str, config: dict):
+    """Crea un HenkoScraper apuntando al servidor local"""
+    from henko_bot import HenkoScraper
+
+    config = dict({'cache_http': False}, **config)
+    scraper = HenkoScraper(config)
+    scraper.base_url = url_base
+    scraper.productos_url = f"{url_base}/productos/?mpage=200"
+    return scraper
+
+def benchmark_scraping(paginas: int, latencia: float, peticiones_por_segundo: float = 1.0, rafaga: int = 1):
+    """Compara el crawl secuencial contra el concurrente con el mismo límite de peticiones por host"""
+    print(f"🕸️  Crawl de {paginas} páginas con {latencia * 1000:.0f} ms de latencia por petición, "
+          f"ambos modos a {peticiones_por_segundo:g} req/s (ráfaga {rafaga})")
+    print("-" * 60)
+
+    limite = {'peticiones_por_segundo': peticiones_por_segundo, 'rafaga_peticiones': rafaga}
+    modos = [
+        ("Secuencial", dict(limite, scraping_concurrente=False)),
+        ("Concurrente (4 workers)", dict(limite, scraping_concurrente=True, max_workers_scraping=4)),
+    ]
+
+    duraciones = []
+    with ServidorTiendaLocal(latencia=latencia) as servidor:
+        for nombre, config in modos:
+            scraper = crear_scraper(servidor.url, config)
+            if config['scraping_concurrente'] and not scraper.scraping_concurrente:
+                nombre = "Concurrente (ignorado: límite 1/1)"
+            inicio = time.perf_counter()
+            resultados = scraper.scrapear_paginas(list(range(1, paginas + 1)))
+            duracion = time.perf_counter() - inicio
+            duraciones.append(duracion)
+            total = sum(len(r) for r in resultados)
+            print(f"{nombre:<34} {duracion:6.2f} s  ({total} productos)")
+
+    # Con el mismo límite la concurrencia solo solapa latencia y parseo con la espera del limitador
+    print(f"\nAceleración con la misma cortesía: {duraciones[0] / duraciones[1]:.2f}x")
+
+def benchmark_cache(paginas: int, latencia: float):
+    """Mide peticiones, bytes y tiempo con la caché HTTP fría, fresca y revalidando"""
+    print(f"💾 Caché HTTP sobre {paginas} páginas con {latencia * 1000:.0f} ms de latencia")
+    print("-" * 60)
+
+    with ServidorTiendaLocal(latencia=latencia) as servidor, tempfile.TemporaryDirectory() as directorio:
+        base = {'peticiones_por_segundo': 100.0, 'rafaga_peticiones': 100,
+                'cache_http_directorio': os.path.join(directorio, 'cache')}
+        modos = [
+            ("Sin caché", {'cache_http': False}),
+            ("Caché fría", {'cache_http': True}),
+            ("Caché fresca (dentro del TTL)", {'cache_http': True}),
+            ("Revalidación (304)", {'cache_http': True, 'cache_http_ttl_segundos': 0}),
+        ]
+
+        for nombre, config in modos:
+            scraper = crear_scraper(servidor.url, dict(base, **config))
+            peticiones, bytes_antes = servidor.peticiones, servidor.bytes_enviados
+            inicio = time.perf_counter()
+            scraper.scrapear_paginas(list(range(1, paginas + 1)))
+            duracion = time.perf_counter() - inicio
+            print(f"{nombre:<32} {duracion:6.2f} s  "
+                  f"{servidor.peticiones - peticiones:3d} peticiones  "
+                  f"{(servidor.bytes_enviados - bytes_antes) / 1024:8.1f} KB")
+
+def cargar_fixtures(directorio: str = None, cantidad: int = 5) -> list:
+    """Carga páginas HTML guardadas del catálogo o genera páginas sintéticas"""
+    if directorio:
+        fixtures = []
+        for ruta in sorted(glob.glob(os.path.join(directorio, '*.html'))):
+            with open(ruta, 'rb') as f:
+                fixtures.append(f.read())
+        if fixtures:
+            return fixtures
+        print(f"⚠️  No hay archivos .html en {directorio}, usando páginas sintéticas")
+
+    return [generar_pagina_catalogo(p).encode('utf-8') for p in range(1, cantidad + 1)]
+
+def benchmark_parseo(directorio_fixtures: str = None, repeticiones: int = 5):
+    """Compara tiempo de parseo y memoria pico de cada backend sobre páginas del catálogo"""
+    from henko_bot import resolver_parser_html
+
+    fixtures = cargar_fixtures(directorio_fixtures)
+    total_kb = sum(len(f) for f in fixtures) / 1024
+    print(f"🧩 Parseo de {len(fixtures)} páginas ({total_kb:.0f} KB), {repeticiones} repeticiones")
+    print("-" * 60)
+
+    parsers = ['html.parser'] + (['lxml'] if resolver_parser_html('lxml') == 'lxml' else [])
+    for parser in parsers:
+        for restringido in (False, True):
+            scraper = crear_scraper('http://localhost', {'parser_html': parser, 'parseo_restringido': restringido})
+
+            inicio = time.perf_counter()
+            for _ in range(repeticiones):
+                for contenido in fixtures:
+                    scraper._parsear_html(contenido)
+            duracion = (time.perf_counter() - inicio) / (repeticiones * len(fixtures))
+
+            tracemalloc.start()
+            soups = [scraper._parsear_html(contenido) for contenido in fixtures]
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            productos = sum(len(scraper.extraer_productos_pagina(i + 1, soup)) for i, soup in enumerate(soups))
+            nombre = f"{parser}{' + SoupStrainer' if restringido else ''}"
+            print(f"{nombre:<28} {duracion * 1000:7.1f} ms/página  pico {pico / 1024 / 1024:6.1f} MB  "
+                  f"({productos} productos)")
+
+    if 'lxml' not in parsers:
+        print("ℹ️  lxml no está instalado: pip install lxml para comparar ese backend")
+
+def benchmark_extraccion(directorio_fixtures: str = None, repeticiones: int = 5):
+    """Compara extracciones por página y tiempo entre el modo por enlace y por tarjeta"""
+    fixtures = cargar_fixtures(directorio_fixtures)
+    print(f"🃏 Extracción sobre {len(fixtures)} páginas, {repeticiones} repeticiones")
+    print("-" * 60)
+
+    for nombre, por_tarjeta in (("Por enlace", False), ("Por tarjeta", True)):
+        scraper = crear_scraper('http://localhost', {'extraccion_por_tarjeta': por_tarjeta})
+        soups = [scraper._parsear_html(contenido) for contenido in fixtures]
+
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            for i, soup in enumerate(soups):
+                scraper.extraer_productos_pagina(i + 1, soup)
+        duracion = (time.perf_counter() - inicio) / (repeticiones * len(soups))
+
+        extracciones = sum(e['extracciones'] for e in scraper.estadisticas_extraccion.values())
+        productos = sum(e['productos'] for e in scraper.estadisticas_extraccion.values())
+        print(f"{nombre:<14} {duracion * 1000:7.1f} ms/página  "
+              f"{extracciones / len(soups):6.1f} extracciones/página  ({productos / len(soups):.0f} productos/página)")
+
+def categoria_referencia(texto_completo: str) -> str:
+    """Clasificación original (seis búsquedas any() encadenadas), para verificar resultados"""
+    if any(cat in texto_completo for cat in ['soutien', 'corpiño', 'bra']):
+        return "Soutien"
+    elif any(cat in texto_completo for cat in ['body', 'bodysuit']):
+        return "Body"
+    elif any(cat in texto_completo for cat in ['conjunto', 'set']):
+        return "Conjunto"
+    elif any(cat in texto_completo for cat in ['bombacha', 'calzón']):
+        return "Bombacha"
+    elif any(cat in texto_completo for cat in ['media', 'calcetín']):
+        return "Medias"
+    elif any(cat in texto_completo for cat in ['camisón', 'pijama']):
+        return "Pijamas"
+    return "Lencería"
+
+def benchmark_clasificador(directorio_fixtures: str = None, repeticiones: int = 20):
+    """Verifica que el clasificador coincide con el original y mide el tiempo por tarjeta"""
+    from henko_bot import clasificar_texto
+
+    fixtures = cargar_fixtures(directorio_fixtures)
+    scraper = crear_scraper('http://localhost', {})
+    tarjetas = []
+    for contenido in fixtures:
+        soup = scraper._parsear_html(contenido)
+        tarjetas.extend(scraper._agrupar_enlaces_por_producto(soup.find_all('a', href=True)))
+
+    textos = [t.get_text().lower() for t in tarjetas]
+    rng = random.Random(0)
+    palabras = ['soutien', 'corpiño', 'bra', 'body', 'bodysuit', 'conjunto', 'set', 'bombacha',
+                'calzón', 'media', 'calcetín', 'camisón', 'pijama', 'sin stock', 'encaje', 'negro']
+    textos += [" ".join(rng.sample(palabras, rng.randint(0, 5))) for _ in range(2000)]
+
+    distintos = sum(clasificar_texto(t)[0] != categoria_referencia(t) for t in textos)
+    print(f"🏷️  Clasificación: {len(textos)} textos, {distintos} diferencias con la versión original")
+    print("-" * 60)
+
+    for nombre, funcion in (("Original (any encadenados)", categoria_referencia),
+                            ("Clasificador una pasada", clasificar_texto)):
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            for texto in textos:
+                funcion(texto)
+        duracion = (time.perf_counter() - inicio) / (repeticiones * len(textos))
+        print(f"{nombre:<28} {duracion * 1e6:7.2f} µs/texto")
+
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for tarjeta in tarjetas:
+            scraper._extraer_producto_desde_tarjeta(tarjeta)
+    duracion = (time.perf_counter() - inicio) / (repeticiones * max(len(tarjetas), 1))
+    print(f"{'Extracción completa':<28} {duracion * 1e6:7.1f} µs/tarjeta ({len(tarjetas)} tarjetas)")
+
+def benchmark_estructurado(directorio_fixtures: str = None, repeticiones: int = 5):
+    """Compara la extracción desde JSON embebido contra la heurística sobre el DOM"""
+    fixtures = cargar_fixtures(directorio_fixtures)
+    print(f"🧬 Datos estructurados vs DOM sobre {len(fixtures)} páginas, {repeticiones} repeticiones")
+    print("-" * 60)
+
+    for nombre, estructurada in (("DOM (heurística)", False), ("JSON embebido", True)):
+        scraper = crear_scraper('http://localhost', {'extraccion_estructurada': estructurada})
+        soups = [scraper._parsear_html(contenido) for contenido in fixtures]
+
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            productos = [p for i, soup in enumerate(soups) for p in scraper.extraer_productos_pagina(i + 1, soup)]
+        duracion = (time.perf_counter() - inicio) / (repeticiones * len(soups))
+
+        con_talles = sum(1 for p in productos if p.talles)
+        con_imagen = sum(1 for p in productos if p.imagen_url)
+        estructurados = sum(e['estructurados'] for e in scraper.estadisticas_extraccion.values())
+        print(f"{nombre:<18} {duracion * 1000:7.1f} ms/página  {len(productos)} productos  "
+              f"{con_talles} con talles  {con_imagen} con imagen  ({estructurados} desde JSON)")
+
+def benchmark_muestreo(latencia: float, ejecuciones: int = 5):
+    """Compara scrapear las 5 páginas y muestrear contra el muestreo en streaming con corte temprano"""
+    print(f"🎲 Selección de 5 candidatos, {ejecuciones} ejecuciones, {latencia * 1000:.0f} ms de latencia")
+    print("-" * 60)
+
+    base = {'peticiones_por_segundo': 100.0, 'rafaga_peticiones': 100}
+    with ServidorTiendaLocal(latencia=latencia) as servidor:
+        scraper = crear_scraper(servidor.url, base)
+        peticiones = servidor.peticiones
+        inicio = time.perf_counter()
+        for _ in range(ejecuciones):
+            total_paginas, soup = scraper.descubrir_paginacion()
+            paginas = random.sample(range(1, min(total_paginas + 1, 6)), min(5, total_paginas))
+            productos = [p for pagina in scraper.scrapear_paginas(paginas, {1: soup}) for p in pagina]
+            random.sample(productos, 5)
+        duracion = (time.perf_counter() - inicio) / ejecuciones
+        print(f"{'Todas las páginas':<20} {duracion:6.2f} s/ejecución  "
+              f"{(servidor.peticiones - peticiones) / ejecuciones:4.1f} peticiones  {len(productos)} tarjetas")
+
+        scraper = crear_scraper(servidor.url, base)
+        peticiones = servidor.peticiones
+        inicio = time.perf_counter()
+        for _ in range(ejecuciones):
+            scraper.obtener_productos_aleatorios(5)
+        duracion = (time.perf_counter() - inicio) / ejecuciones
+        estadisticas = scraper.estadisticas_streaming
+        print(f"{'Streaming':<20} {duracion:6.2f} s/ejecución  "
+              f"{(servidor.peticiones - peticiones) / ejecuciones:4.1f} peticiones  {estadisticas['tarjetas']} tarjetas "
+              f"({estadisticas['paginas']} páginas)")
+
+def benchmark_detalle(latencia: float, candidatos: int = 5):
+    """Mide la latencia por lote del enriquecimiento desde la página de detalle, sin y con caché"""
+    from henko_bot import EnriquecedorDetalle
+
+    print(f"🔎 Enriquecimiento de {candidatos} candidatos con {latencia * 1000:.0f} ms de latencia")
+    print("-" * 60)
+
+    with ServidorTiendaLocal(latencia=latencia) as servidor, tempfile.TemporaryDirectory() as directorio:
+        scraper = crear_scraper(servidor.url, {'peticiones_por_segundo': 100.0, 'rafaga_peticiones': 100})
+        productos = scraper.obtener_productos_aleatorios(candidatos)
+
+        for workers in (1, 4):
+            cache_file = os.path.join(directorio, f'detalles_{workers}.json')
+            enriquecedor = EnriquecedorDetalle(scraper, cache_file, ttl_horas=1, max_workers=workers)
+            for ronda in ("fría", "caliente"):
+                peticiones = servidor.peticiones
+                enriquecidos = enriquecedor.enriquecer(productos)
+                ejecucion = enriquecedor.ultima_ejecucion
+                print(f"{workers} worker(s), caché {ronda:<10} {ejecucion['latencia_segundos']:6.3f} s  "
+                      f"{servidor.peticiones - peticiones} peticiones")
+
+        ejemplo = enriquecidos[0]
+        print(f"\nEjemplo: {ejemplo.nombre} | stock: {ejemplo.stock} | "
+              f"colores: {', '.join(ejemplo.colores)} | talles: {', '.join(ejemplo.talles)}")
+
+def benchmark_imagenes(latencia: float, cantidad: int = 5):
+    """Compara bytes y latencia de enviar la foto original contra la validada, reducida y cacheada"""
+    from henko_bot import ProcesadorImagenes
+
+    print(f"🖼️  Preparación de {cantidad} imágenes con {latencia * 1000:.0f} ms de latencia")
+    print("-" * 60)
+
+    with ServidorTiendaLocal(latencia=latencia) as servidor, tempfile.TemporaryDirectory() as directorio:
+        urls = [f"{servidor.url}/imagenes/{i}-1600x1600.png" for i in range(cantidad)]
+        urls.append(f"{servidor.url}/imagenes/{cantidad}-40x40.png")  # Placeholder: se descarta
+
+        originales = sum(len(servidor._imagen(url[len(servidor.url):])) for url in urls)
+        print(f"{'Originales':<20} {originales / 1024:9.0f} KB a subir")
+
+        procesador = ProcesadorImagenes(directorio)
+        for ronda in ("fría", "caliente"):
+            peticiones = servidor.peticiones
+            inicio = time.perf_counter()
+            rutas = [procesador.preparar(url) for url in urls]
+            duracion = time.perf_counter() - inicio
+            finales = sum(os.path.getsize(r) for r in rutas if r)
+            print(f"{'Caché ' + ronda:<20} {finales / 1024:9.0f} KB a subir  {duracion:6.2f} s  "
+                  f"{servidor.peticiones - peticiones} descargas  {rutas.count(None)} descartadas")
+
+def benchmark_file_ids(envios: int = 5, latencia: float = 0.05):
+    """Compara reenvíos de la misma foto subiéndola cada vez contra reutilizar el file_id"""
+    print(f"📎 {envios} envíos de la misma foto (1600x1600) a la Bot API falsa")
+    print("-" * 60)
+
+    with ServidorTelegramFalso(latencia=latencia) as servidor, tempfile.TemporaryDirectory() as directorio:
+        foto = os.path.join(directorio, 'foto.png')
+        with open(foto, 'wb') as f:
+            f.write(generar_png(1600, 1600))
+
+        modos = [
+            ("Subiendo siempre", {}),
+            ("Con caché de file_id", {'file_ids_file': os.path.join(directorio, 'file_ids.json')}),
+        ]
+        for nombre, kwargs in modos:
+            bot = crear_telegram(servidor, **kwargs)
+            bot.limitador_chat.peticiones_por_segundo = 1000  # medir la subida, no el límite por chat
+            bot.limitador_grupo.peticiones_por_segundo = 1000
+            bytes_iniciales = servidor.bytes_recibidos
+            inicio = time.perf_counter()
+            exitos = sum(bot.enviar_foto_con_texto(foto, "Producto del día") for _ in range(envios))
+            duracion = time.perf_counter() - inicio
+            print(f"{nombre:<24} {duracion / envios * 1000:7.1f} ms/envío  "
+                  f"{(servidor.bytes_recibidos - bytes_iniciales) / 1024:8.0f} KB subidos  {exitos}/{envios} ok")
+
+        # Telegram rechaza los file_id: se invalidan y la foto se vuelve a subir una sola vez
+        servidor.olvidar_file_ids()
+        peticiones = servidor.peticiones
+        exitos = sum(bot.enviar_foto_con_texto(foto, "Producto del día") for _ in range(envios))
+        print(f"{'file_id rechazados':<24} {servidor.peticiones - peticiones} peticiones  {exitos}/{envios} ok")
+
+def benchmark_telegram(mensajes: int = 20, latencia: float = 0.02, probabilidad_429: float = 0.1,
+                       probabilidad_5xx: float = 0.1):
+    """Compara requests.post suelto contra el transporte con pool y reintentos, con y sin errores inyectados"""
+    import requests
+    from henko_bot import TransporteTelegram
+
+    print(f"📨 {mensajes} mensajes a la Bot API falsa ({latencia * 1000:.0f} ms de latencia)")
+    print("-" * 60)
+
+    escenarios = [
+        ("sin errores", {}),
+        (f"{probabilidad_429:.0%} 429 + {probabilidad_5xx:.0%} 5xx",
+         {'probabilidad_429': probabilidad_429, 'retry_after': 0.2, 'probabilidad_5xx': probabilidad_5xx}),
+    ]
+    for escenario, opciones in escenarios:
+        print(f"\nEscenario: {escenario}")
+        clientes = [
+            ("requests.post sin sesión", lambda url, data: requests.post(url, data=data)),
+            ("TransporteTelegram", TransporteTelegram(backoff_segundos=0.05).post),
+        ]
+        for nombre, post in clientes:
+            with ServidorTelegramFalso(latencia=latencia, **opciones) as servidor:
+                url = f"{servidor.url}/bot123:ABC/sendMessage"
+                inicio = time.perf_counter()
+                exitos = sum(post(url, {'chat_id': '-1001', 'text': f'Mensaje {i}'}).status_code == 200
+                             for i in range(mensajes))
+                duracion = time.perf_counter() - inicio
+                print(f"  {nombre:<26} {duracion / mensajes * 1000:6.1f} ms/mensaje  {exitos}/{mensajes} ok  "
+                      f"{servidor.conexiones} conexiones  {servidor.errores_inyectados} errores inyectados")
+
+def benchmark_difusion(destinos: int = 60, rondas: int = 1, latencia: float = 0.05):
+    """Mide throughput y latencia por destino de la difusión secuencial contra el pool con límites"""
+    print(f"📣 Difusión a {destinos} destinos x {rondas} ronda(s), {latencia * 1000:.0f} ms de latencia")
+    print("-" * 60)
+
+    # Un tercio grupos/canales (id negativo, 20/min) y el resto chats privados (1/s)
+    chats = [f"-100{i}" if i % 3 == 0 else str(10_000 + i) for i in range(destinos)]
+    for nombre, workers in (("Secuencial", 1), ("Pool de 8 workers", 8)):
+        with ServidorTelegramFalso(latencia=latencia) as servidor:
+            bot = crear_telegram(servidor, destinos=chats, max_workers=workers)
+            inicio = time.perf_counter()
+            latencias, exitos = [], 0
+            for ronda in range(rondas):
+                resultados = bot.difundir_mensaje(f"Producto del día #{ronda}")
+                latencias += [r['latencia_segundos'] for r in resultados]
+                exitos += sum(r['exito'] for r in resultados)
+            duracion = time.perf_counter() - inicio
+            latencias.sort()
+            p50 = latencias[len(latencias) // 2]
+            p95 = latencias[int(len(latencias) * 0.95) - 1]
+            print(f"{nombre:<20} {duracion:6.2f} s  {exitos / duracion:5.1f} msg/s  p50 {p50:5.2f} s  p95 {p95:5.2f} s  "
+                  f"{exitos}/{destinos * rondas} ok  pico {servidor.max_por_segundo()} msg/s")
+
+def benchmark_album(productos: int = 10, latencia: float = 0.1, repeticiones: int = 5):
+    """Compara un post por producto contra un álbum (sendMediaGroup) con un mensaje resumen
+
+    Los dos modos se alternan `repeticiones` veces. Se informa la mediana del total, del tiempo hasta
+    que llega la primera foto y las llamadas a la API.
+    """
+    import statistics
+    from henko_bot import CopyGenerator, HenkoBot, Producto, RenderizadorTelegram
+
+    print(f"🗂️  {productos} productos del día a la Bot API falsa ({latencia * 1000:.0f} ms de latencia, "
+          f"mediana de {repeticiones})")
+    print("-" * 60)
+
+    with ServidorTelegramFalso(latencia=latencia) as servidor, tempfile.TemporaryDirectory() as directorio:
+        seleccion = []
+        for i in range(productos):
+            foto = os.path.join(directorio, f'foto{i}.png')
+            with open(foto, 'wb') as f:
+                f.write(generar_png(400, 400, i))
+            seleccion.append(Producto(
+                id=str(1000 + i), nombre=f"{CATEGORIAS_FIXTURE[i % len(CATEGORIAS_FIXTURE)]} {i}",
+                marca=MARCAS_FIXTURE[i % len(MARCAS_FIXTURE)], precio_original="$20.000", precio_oferta="$15.000",
+                stock="En stock", link=f"https://henko.test/productos/producto-{i}/", imagen_url=foto,
+                colores=[], talles=[], categoria=CATEGORIAS_FIXTURE[i % len(CATEGORIAS_FIXTURE)]))
+
+        def enviar(album: bool):
+            bot = HenkoBot.__new__(HenkoBot)
+            bot.config = {'modo_album': album, 'productos_por_dia': productos}
+            bot.renderizador = RenderizadorTelegram()
+            bot.telegram_bot = crear_telegram(servidor, max_workers=1)
+            bot.telegram_bot.limitador_chat.peticiones_por_segundo = 1000  # medir la API, no el límite por chat
+            bot.telegram_bot.limitador_grupo.peticiones_por_segundo = 1000
+            bot.copy_generator = CopyGenerator()
+            bot.procesador_imagenes = None
+            bot.seleccionar_productos = lambda cantidad: seleccion[:cantidad]
+            bot.guardar_registro_producto = lambda *args: None
+            bot.guardar_envio_preparado = lambda envio: None
+
+            if album:
+                bot.enviar_preparado(bot.preparar_envio())
+            else:
+                for producto in seleccion:
+                    bot.telegram_bot.enviar_foto_con_texto(
+                        producto.imagen_url,
+                        bot.generar_mensaje_telegram(producto, bot.copy_generator.generar_copy_instagram(producto)))
+
+        modos = (("Un post por producto", False), ("Álbum + resumen", True))
+        resultados = {nombre: ([], []) for nombre, _ in modos}
+        for repeticion in range(repeticiones):
+            for nombre, album in (modos if repeticion % 2 == 0 else modos[::-1]):
+                servidor.envios_por_chat.clear()
+                inicio, inicio_monotonic = time.perf_counter(), time.monotonic()
+                enviar(album)
+                duracion = time.perf_counter() - inicio
+                # El servidor anota la llegada de cada petición; la respuesta a la primera foto llega después
+                primera = min(servidor.envios_por_chat['-1001']) - inicio_monotonic + latencia
+                resultados[nombre][0].append(duracion)
+                resultados[nombre][1].append(primera)
+
+        for nombre, album in modos:
+            duraciones, primeras = resultados[nombre]
+            print(f"{nombre:<22} {statistics.median(duraciones):6.2f} s  "
+                  f"(de {min(duraciones):.2f} a {max(duraciones):.2f} s)  "
+                  f"primera foto {statistics.median(primeras):5.2f} s")
+        for nombre, album in modos:
+            servidor.metodos.clear()
+            peticiones = servidor.peticiones
+            enviar(album)
+            print(f"{nombre:<22} {servidor.peticiones - peticiones:3d} llamadas a la API  {dict(servidor.metodos)}")
+
+def enviar_legacy(servidor: ServidorTelegramFalso, texto: str) -> bool:
+    """Envío previo a la capa de renderizado: Markdown, luego HTML y por último sin formato"""
+    import requests
+
+    url = f"{servidor.url}/bot123:ABC/sendMessage"
+    data = {'chat_id': '-1001', 'text': texto[:4000] + "..." if len(texto) > 4000 else texto, 'parse_mode': 'Markdown'}
+    response = requests.post(url, data=data)
+    if response.status_code != 200:
+        data['parse_mode'] = 'HTML'
+        response = requests.post(url, data=data)
+        if response.status_code != 200:
+            del data['parse_mode']
+            response = requests.post(url, data=data)
+    return response.status_code == 200
+
+def benchmark_render(latencia: float = 0.05):
+    """Cuenta peticiones por envío con nombres problemáticos y copies largos, antes y después del renderizado
+
+    Los mismos casos se verifican en tests/test_render.py; acá solo se informan.
+    """
+    from henko_bot import CopyGenerator, HenkoBot, Producto, RenderizadorTelegram
+
+    print(f"🧾 Peticiones por envío contra la Bot API falsa ({latencia * 1000:.0f} ms de latencia)")
+    print("-" * 60)
+
+    casos = {
+        "Nombre simple": "Conjunto Lody Encaje",
+        "Con _ * [": "Body_encaje *NUEVO* [promo 2x1]",
+        "Con < & >": "Conjunto <Lody> & Co. 50% off!",
+        "Nombre larguísimo": "Soutien Push-Up Encaje " * 60,
+    }
+    with ServidorTelegramFalso(latencia=latencia) as servidor, tempfile.TemporaryDirectory() as directorio:
+        foto = os.path.join(directorio, 'foto.png')
+        with open(foto, 'wb') as f:
+            f.write(generar_png(300, 300))
+
+        errores_legacy = 0
+        for parse_mode in ("HTML", "MarkdownV2"):
+            print(f"\nparse_mode={parse_mode}")
+            bot = HenkoBot.__new__(HenkoBot)
+            bot.renderizador = RenderizadorTelegram(parse_mode)
+            telegram = crear_telegram(servidor, renderizador=bot.renderizador)
+            telegram.limitador_grupo.peticiones_por_segundo = 1000  # medir la API, no el límite por chat
+            copies = CopyGenerator()
+
+            for caso, nombre in casos.items():
+                producto = Producto(id='1', nombre=nombre, marca='Lody', precio_original='$20.000',
+                                    precio_oferta='$15.000', stock='En stock',
+                                    link='https://henko.test/productos/body_encaje-1/', imagen_url=foto,
+                                    colores=[], talles=[], categoria='Body')
+                copy = copies.generar_copy_instagram(producto)
+                mensaje = bot.generar_mensaje_telegram(producto, copy)
+
+                peticiones, errores = servidor.peticiones, servidor.errores_formato
+                legacy = enviar_legacy(servidor, mensaje_legacy(producto, copy))
+                peticiones_legacy = servidor.peticiones - peticiones
+                errores_legacy += servidor.errores_formato - errores
+
+                peticiones = servidor.peticiones
+                ok_texto = telegram.enviar_mensaje(mensaje)
+                peticiones_texto = servidor.peticiones - peticiones
+                peticiones = servidor.peticiones
+                ok_foto = telegram.enviar_foto_con_texto(foto, mensaje)
+                peticiones_foto = servidor.peticiones - peticiones
+                print(f"  {caso:<18} antes: {peticiones_legacy} pet. ({'ok' if legacy else 'falló'})  "
+                      f"texto: {peticiones_texto} pet. ({'ok' if ok_texto else 'falló'})  "
+                      f"foto: {peticiones_foto} pet. ({'ok' if ok_foto else 'falló'})")
+
+        errores = servidor.errores_formato - errores_legacy
+        print(f"\nErrores de formato devueltos por la API: {errores_legacy} antes, {errores} después")
+        print(f"Largo máximo aceptado: caption {servidor.largo_maximo['caption']}/{RenderizadorTelegram.MAX_CAPTION}, "
+              f"mensaje {servidor.largo_maximo['text']}/{RenderizadorTelegram.MAX_MENSAJE}")
+
+def mensaje_legacy(producto, copy: str) -> str:
+    return f"""🛍️ **PRODUCTO DEL DÍA - HENKO LENCERÍA**
+
+{copy}
+
+🔗 **Link directo**: {producto.link}
+
+---
+*Copy listo para Instagram ⬆️*
+*¡Solo copiá y pegá!* 📋"""
+
+def benchmark_copies(productos: int = 10000, repeticiones: int = 5):
+    """Copies por segundo: uno a uno con random global, en lote con semilla (frío) y memorizado (caliente)"""
+    import statistics
+
+    from henko_bot import CopyGenerator, Producto
+
+    print(f"✍️  Generación de copies para {productos} productos (mediana de {repeticiones})")
+    print("-" * 60)
+
+    rng = random.Random(0)
+    catalogo = [Producto(
+        id=str(i), nombre=f"{rng.choice(CATEGORIAS_FIXTURE)} {rng.choice(MARCAS_FIXTURE)} {i}",
+        marca=rng.choice(MARCAS_FIXTURE), precio_original="$20.000", precio_oferta=f"${rng.randint(5, 40)}.000",
+        stock=rng.choice(["En stock", "Sin stock", "Últimas unidades"]), link=f"https://henko.test/productos/p-{i}/",
+        imagen_url="", colores=[], talles=[], categoria="") for i in range(productos)]
+
+    def medir(generar) -> float:
+        inicio = time.perf_counter()
+        generar()
+        return time.perf_counter() - inicio
+
+    # Mediana de varias corridas alternadas; el lote frío usa cada vez un generador sin memo
+    tiempos = {"Uno a uno (random global)": [], "Lote con semilla (frío)": [], "Lote con semilla (memo)": []}
+    for _ in range(repeticiones):
+        generador = CopyGenerator()
+        tiempos["Uno a uno (random global)"].append(
+            medir(lambda: [generador.generar_copy_instagram(p) for p in catalogo]))
+        tiempos["Lote con semilla (frío)"].append(medir(lambda: generador.generar_copies(catalogo, semilla=42)))
+        tiempos["Lote con semilla (memo)"].append(medir(lambda: generador.generar_copies(catalogo, semilla=42)))
+
+    medianas = {nombre: statistics.median(duraciones) for nombre, duraciones in tiempos.items()}
+    for nombre, duracion in medianas.items():
+        print(f"{nombre:<28} {productos / duracion:10.0f} copies/s  ({duracion:.3f} s)")
+    print(f"\nLote frío vs uno a uno: "
+          f"{medianas['Uno a uno (random global)'] / medianas['Lote con semilla (frío)']:.2f}x")
+    copies = generador.generar_copies(catalogo, semilla=42)
+
+    reproducible = CopyGenerator().generar_copies(catalogo[:100], semilla=42) == copies[:100]
+    print(f"\nMisma semilla en otra instancia da los mismos copies: {'sí' if reproducible else 'no'}")
+
+def benchmark_horarios(envios: int = 4, intervalo: float = 1.0, duracion_envio: float = 0.2):
+    """Desfase entre horario programado y envío real, con un envío lento que pisa al siguiente"""
+    from datetime import datetime, timedelta
+    from henko_bot import PlanificadorEnvios
+
+    print(f"⏰ Planificador: {envios} horarios cada {intervalo:.1f} s, envíos de {duracion_envio:.1f} s")
+    print("-" * 60)
+
+    # El segundo envío tarda más que el intervalo, así el tercero se omite
+    duraciones = iter([duracion_envio, intervalo * 1.5] + [duracion_envio] * envios)
+
+    def trabajo():
+        duracion = next(duraciones)
+        time.sleep(duracion / 2)
+        instante = time.time()
+        time.sleep(duracion / 2)
+        return instante
+
+    base = datetime.now().replace(microsecond=0) + timedelta(seconds=2)
+    horarios = [(base + timedelta(seconds=intervalo * i)).strftime("%H:%M:%S") for i in range(envios)]
+    planificador = PlanificadorEnvios(trabajo, horarios)
+    hilo = threading.Thread(target=planificador.ejecutar, daemon=True)
+    hilo.start()
+
+    fin = base + timedelta(seconds=intervalo * envios + intervalo * 1.5)
+    while datetime.now() < fin:
+        time.sleep(0.05)
+    planificador.detener()
+    hilo.join(timeout=5)
+
+    for metrica in planificador.metricas:
+        print(f"{metrica['programado']}  inicio +{metrica['desfase_inicio_segundos'] * 1000:6.1f} ms  "
+              f"envío +{metrica['desfase_envio_segundos'] * 1000:6.1f} ms")
+    print(f"\nEjecutados: {planificador.ejecuciones}, omitidos por solapamiento: {planificador.omitidos}")
+    print("Revisando cada 60 s (bucle anterior) el desfase de inicio es de 0 a 60 s, 30 s en promedio")
+
+def benchmark_preparacion(latencia: float = 0.2, latencia_telegram: float = 0.05):
+    """Demora entre el horario y el envío preparando en el momento vs por adelantado, y con la tienda caída"""
+    import logging
+    from dataclasses import replace
+    from henko_bot import HenkoBot
+
+    print(f"📦 Envío programado con la tienda a {latencia * 1000:.0f} ms y Telegram a {latencia_telegram * 1000:.0f} ms")
+    print("-" * 60)
+
+    with ServidorTiendaLocal(latencia=latencia) as tienda, \
+            ServidorTelegramFalso(latencia=latencia_telegram) as servidor, \
+            tempfile.TemporaryDirectory() as directorio:
+        config_file = os.path.join(directorio, 'config.json')
+        with open(config_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'catalogo': False, 'enriquecer_detalle': False, 'procesar_imagenes': True, 'dias_sin_repetir': 0,
+                'historial_db': os.path.join(directorio, 'historial.db'),
+                'imagenes_cache_directorio': os.path.join(directorio, 'imagenes'),
+                'telegram_file_ids_file': os.path.join(directorio, 'file_ids.json'),
+                'envio_preparado_file': os.path.join(directorio, 'envio_preparado.json'),
+                'log_archivo': os.path.join(directorio, 'henko_bot.log'),
+                'cache_http_directorio': os.path.join(directorio, 'cache_http'),
+            }, f)
+        bot = HenkoBot(config_file)
+        bot.scraper = crear_scraper(tienda.url, {'scraping_concurrente': True, 'peticiones_por_segundo': 20.0,
+                                                 'rafaga_peticiones': 4, 'max_paginas_sondeo': 3})
+        bot.telegram_bot = crear_telegram(servidor)
+        bot.telegram_bot.limitador_chat.peticiones_por_segundo = 1000  # medir la demora, no el límite por chat
+        bot.telegram_bot.limitador_grupo.peticiones_por_segundo = 1000
+
+        # Las fotos del listado apuntan al CDN real: se sirven desde la tienda local
+        preparar_foto = bot.preparar_foto
+        bot.preparar_foto = lambda producto: preparar_foto(replace(
+            producto, imagen_url=f"{tienda.url}/imagenes/{zlib.crc32(producto.id.encode()) % 1000}-1600x1600.png"))
+
+        def medir(nombre: str, preparar: bool):
+            if preparar:
+                bot.preparar_proximo_envio()
+            horario = time.time()
+            instante = bot.procesar_producto_diario()
+            fin = time.time()
+            demora = f"{(instante - horario) * 1000:7.0f} ms" if instante else "   sin envío"
+            print(f"{nombre:<34} horario → envío {demora}  (total {fin - horario:.2f} s)")
+
+        medir("Preparando en el horario", False)
+        medir("Preparado por adelantado", True)
+
+        # Tienda caída antes del horario: falla la preparación previa y en el horario se usa directamente
+        # el último envío preparado guardado, que nunca se envió
+        bot.preparar_envio()
+        bot.scraper = crear_scraper("http://127.0.0.1:9", {'timeout_peticiones': 1})
+        logging.disable(logging.ERROR)
+        medir("Tienda caída (último preparado)", True)
+        logging.disable(logging.INFO)
+        bot.historial.cerrar()
+
+def benchmark_arranque(repeticiones: int = 5):
+    """Tiempo de arranque de los comandos rápidos y módulos pesados cargados al importar henko_bot
+
+    Que no se carguen módulos pesados lo verifica tests/test_arranque.py; acá solo se informa.
+    """
+    import subprocess
+    import sys
+
+    print(f"🚀 Arranque de henko_bot (mediana de {repeticiones} ejecuciones)")
+    print("-" * 60)
+
+    raiz = os.path.dirname(os.path.abspath(__file__))
+    entorno = dict(os.environ, PYTHONPATH=raiz)
+    subprocess.run([sys.executable, '-m', 'compileall', '-q', raiz], check=True)  # medir con el .pyc ya generado
+
+    with tempfile.TemporaryDirectory() as directorio:
+        def mediana(argumentos):
+            tiempos = []
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                subprocess.run([sys.executable] + argumentos, cwd=directorio, env=entorno, capture_output=True)
+                tiempos.append(time.perf_counter() - inicio)
+            return sorted(tiempos)[len(tiempos) // 2] * 1000
+
+        base = mediana(['-c', 'pass'])
+        print(f"{'Intérprete vacío':<40} {base:7.0f} ms")
+        print(f"{'import requests, bs4 (antes, al importar)':<40} {mediana(['-c', 'import requests, bs4']):7.0f} ms")
+        comandos = [
+            ("henko_bot.py --verificar-config", [os.path.join(raiz, 'henko_bot.py'), '--verificar-config']),
+            ("-m henko_bot --verificar-config", ['-m', 'henko_bot', '--verificar-config']),
+            ("-m henko_bot --estadisticas", ['-m', 'henko_bot', '--estadisticas']),
+            ("-m henko_bot --ultimo", ['-m', 'henko_bot', '--ultimo']),
+        ]
+        for nombre, argumentos in comandos:
+            ms = mediana(argumentos)
+            print(f"{nombre:<40} {ms:7.0f} ms  (+{ms - base:.0f} ms sobre el intérprete)")
+
+        resultado = subprocess.run(
+            [sys.executable, '-c', "import sys, henko_bot; print(' '.join(m for m in "
+             "('requests', 'bs4', 'lxml', 'PIL', 'orjson') if m in sys.modules))"],
+            cwd=directorio, env=entorno, capture_output=True, text=True)
+        cargados = resultado.stdout.split()
+
+    print(f"\nMódulos pesados cargados al importar henko_bot: {', '.join(cargados) or 'ninguno'}")
+
+def benchmark_control(consultas: int = 20):
+    """Consultar estadísticas al bot en ejecución por el socket vs levantar un proceso nuevo"""
+    import subprocess
+    import sys
+    from henko_bot import HenkoBot
+    from control import enviar_comando
+
+    print(f"🔌 {consultas} consultas de estadísticas: socket de control vs proceso nuevo")
+    print("-" * 60)
+
+    raiz = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as directorio:
+        config_file = os.path.join(directorio, 'config.json')
+        socket_file = os.path.join(directorio, 'henko_bot.sock')
+        with open(config_file, 'w', encoding='utf-8') as f:
+            json.dump({'catalogo': False, 'enriquecer_detalle': False, 'anticipacion_minutos': 0,
+                       'horarios_envio': ['03:00'], 'socket_control': socket_file,
+                       'historial_db': os.path.join(directorio, 'historial.db'),
+                       'imagenes_cache_directorio': os.path.join(directorio, 'imagenes'),
+                       'telegram_file_ids_file': os.path.join(directorio, 'file_ids.json'),
+                       'log_archivo': os.path.join(directorio, 'henko_bot.log'),
+                       'cache_http_directorio': os.path.join(directorio, 'cache_http')}, f)
+        bot = HenkoBot(config_file)
+        hilo = threading.Thread(target=bot.iniciar_bot, daemon=True)
+        hilo.start()
+        while bot.control is None or not os.path.exists(socket_file):
+            time.sleep(0.01)
+
+        inicio = time.perf_counter()
+        for _ in range(consultas):
+            assert enviar_comando('estadisticas', socket_file)['ok']
+        por_socket = (time.perf_counter() - inicio) / consultas
+        print(f"{'Socket de control':<28} {por_socket * 1000:8.2f} ms/consulta")
+
+        inicio = time.perf_counter()
+        for _ in range(min(consultas, 5)):
+            subprocess.run([sys.executable, '-m', 'henko_bot', '--estadisticas', '--config', config_file],
+                           cwd=directorio, env=dict(os.environ, PYTHONPATH=raiz), capture_output=True, check=True)
+        por_proceso = (time.perf_counter() - inicio) / min(consultas, 5)
+        print(f"{'Proceso nuevo (-m henko_bot)':<28} {por_proceso * 1000:8.2f} ms/consulta")
+
+        bot.planificador.detener()
+        hilo.join(timeout=5)
+        bot.historial.cerrar()
+
+def benchmark_logging(paginas: int = 10, mensajes: int = 20000, repeticiones: int = 5):
+    """Scraping con log INFO: escritura sincrónica (basicConfig anterior) vs cola con hilo escritor
+
+    Los dos modos se alternan `repeticiones` veces y se informa la mediana, para que el orden y el ruido
+    de una sola corrida no decidan el resultado.
+    """
+    import logging
+    import statistics
+    from henko_bot import configurar_logging, detener_logging
+
+    print(f"📝 Logging a nivel INFO: scraping de {paginas} páginas y {mensajes} mensajes desde 4 hilos "
+          f"(mediana de {repeticiones})")
+    print("-" * 60)
+
+    logging.disable(logging.NOTSET)
+    raiz = logging.getLogger()
+    logger = logging.getLogger('henko_bot')
+
+    def sincronico(directorio, nulo):
+        # Lo que hacía el logging.basicConfig a nivel de módulo
+        formato = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+        handlers = [logging.FileHandler(os.path.join(directorio, 'sincronico.log')), logging.StreamHandler(nulo)]
+        for handler in handlers:
+            handler.setFormatter(formato)
+            raiz.addHandler(handler)
+        raiz.setLevel(logging.INFO)
+
+        def quitar():
+            for handler in handlers:
+                raiz.removeHandler(handler)
+                handler.close()
+        return quitar
+
+    def en_cola(directorio, nulo):
+        configurar_logging({'log_archivo': os.path.join(directorio, 'cola.log'), 'log_max_mb': 0.5}, stream=nulo)
+        return detener_logging
+
+    def mensajes_en_hilos():
+        def escribir():
+            for i in range(mensajes // 4):
+                logger.info(f"Página {i}: {i % 60} productos extraídos")
+        hilos = [threading.Thread(target=escribir) for _ in range(4)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+    with ServidorTiendaLocal(latencia=0) as servidor, tempfile.TemporaryDirectory() as directorio, \
+            open(os.devnull, 'w') as nulo:
+        scraper = crear_scraper(servidor.url, {'peticiones_por_segundo': 1000.0, 'rafaga_peticiones': 1000})
+        scraper.scrapear_paginas(list(range(1, paginas + 1)))  # Calentar el servidor local
+
+        modos = (("Sincrónico (antes)", sincronico), ("Cola + hilo escritor", en_cola))
+        resultados = {nombre: ([], []) for nombre, _ in modos}
+        for repeticion in range(repeticiones):
+            for nombre, configurar in (modos if repeticion % 2 == 0 else modos[::-1]):
+                quitar = configurar(directorio, nulo)
+                inicio = time.perf_counter()
+                scraper.scrapear_paginas(list(range(1, paginas + 1)))
+                duracion_scraping = time.perf_counter() - inicio
+                inicio = time.perf_counter()
+                mensajes_en_hilos()
+                duracion_mensajes = time.perf_counter() - inicio
+                quitar()
+                resultados[nombre][0].append(paginas / duracion_scraping)
+                resultados[nombre][1].append(duracion_mensajes / mensajes * 1e6)
+
+        for nombre, (paginas_por_segundo, microsegundos) in resultados.items():
+            print(f"{nombre:<22} {statistics.median(paginas_por_segundo):7.1f} páginas/s  "
+                  f"{statistics.median(microsegundos):6.1f} µs por mensaje en el hilo que loguea")
+
+        rotados = sorted(glob.glob(os.path.join(directorio, 'cola.log.*.gz')))
+        print(f"\nArchivos rotados y comprimidos: {len(rotados)} "
+              f"({sum(os.path.getsize(r) for r in rotados) // 1024} KB)")
+
+    logging.disable(logging.INFO)
+
+def main():
+    import logging
+    logging.disable(logging.INFO)
+
+    parser = argparse.ArgumentParser(description='Benchmarks de Henko Bot contra servidores locales')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    p_scraping = subparsers.add_parser('scraping', help='Crawl secuencial vs concurrente')
+    p_scraping.add_argument('--paginas', type=int, default=5)
+    p_scraping.add_argument('--latencia', type=float, default=0.3)
+    p_scraping.add_argument('--peticiones-por-segundo', type=float, default=1.0)
+    p_scraping.add_argument('--rafaga', type=int, default=1)
+
+    p_cache = subparsers.add_parser('cache', help='Caché HTTP fría vs fresca vs revalidada')
+    p_cache.add_argument('--paginas', type=int, default=5)
+    p_cache.add_argument('--latencia', type=float, default=0.1)
+
+    p_parseo = subparsers.add_parser('parseo', help='Tiempo y memoria de cada backend de parseo')
+    p_parseo.add_argument('--fixtures', help='Directorio con páginas .html guardadas del catálogo')
+    p_parseo.add_argument('--repeticiones', type=int, default=5)
+
+    p_extraccion = subparsers.add_parser('extraccion', help='Extracción por enlace vs por tarjeta')
+    p_extraccion.add_argument('--fixtures', help='Directorio con páginas .html guardadas del catálogo')
+    p_extraccion.add_argument('--repeticiones', type=int, default=5)
+
+    p_clasificador = subparsers.add_parser('clasificador', help='Clasificador de categorías y extracción por tarjeta')
+    p_clasificador.add_argument('--fixtures', help='Directorio con páginas .html guardadas del catálogo')
+    p_clasificador.add_argument('--repeticiones', type=int, default=20)
+
+    p_estructurado = subparsers.add_parser('estructurado', help='Extracción desde JSON embebido vs DOM')
+    p_estructurado.add_argument('--fixtures', help='Directorio con páginas .html guardadas del catálogo')
+    p_estructurado.add_argument('--repeticiones', type=int, default=5)
+
+    p_muestreo = subparsers.add_parser('muestreo', help='Selección diaria: todas las páginas vs streaming')
+    p_muestreo.add_argument('--latencia', type=float, default=0.2)
+    p_muestreo.add_argument('--ejecuciones', type=int, default=5)
+
+    p_detalle = subparsers.add_parser('detalle', help='Enriquecimiento desde la página de detalle')
+    p_detalle.add_argument('--latencia', type=float, default=0.2)
+    p_detalle.add_argument('--candidatos', type=int, default=5)
+
+    p_imagenes = subparsers.add_parser('imagenes', help='Preparación de imágenes: originales vs reducidas y cacheadas')
+    p_imagenes.add_argument('--latencia', type=float, default=0.1)
+    p_imagenes.add_argument('--cantidad', type=int, default=5)
+
+    p_file_ids = subparsers.add_parser('file-ids', help='Reenvío de fotos subiéndolas vs reutilizando file_id')
+    p_file_ids.add_argument('--envios', type=int, default=5)
+    p_file_ids.add_argument('--latencia', type=float, default=0.05)
+
+    p_telegram = subparsers.add_parser('telegram', help='Transporte de Telegram: pool, timeouts y reintentos')
+    p_telegram.add_argument('--mensajes', type=int, default=20)
+    p_telegram.add_argument('--latencia', type=float, default=0.02)
+    p_telegram.add_argument('--p429', type=float, default=0.1)
+    p_telegram.add_argument('--p5xx', type=float, default=0.1)
+
+    p_difusion = subparsers.add_parser('difusion', help='Difusión a varios chats respetando los límites de Telegram')
+    p_difusion.add_argument('--destinos', type=int, default=60)
+    p_difusion.add_argument('--rondas', type=int, default=1)
+    p_difusion.add_argument('--latencia', type=float, default=0.05)
+
+    p_album = subparsers.add_parser('album', help='Un post por producto vs álbum sendMediaGroup')
+    p_album.add_argument('--productos', type=int, default=10)
+    p_album.add_argument('--latencia', type=float, default=0.1)
+    p_album.add_argument('--repeticiones', type=int, default=5)
+
+    p_render = subparsers.add_parser('render', help='Peticiones por envío con el renderizado escapado')
+    p_render.add_argument('--latencia', type=float, default=0.05)
+
+    p_copies = subparsers.add_parser('copies', help='Generación de copies en lote con semilla y memoización')
+    p_copies.add_argument('--productos', type=int, default=10000)
+    p_copies.add_argument('--repeticiones', type=int, default=5)
+
+    p_preparacion = subparsers.add_parser('preparacion', help='Envío preparado por adelantado vs en el horario')
+    p_preparacion.add_argument('--latencia', type=float, default=0.2)
+
+    p_arranque = subparsers.add_parser('arranque', help='Tiempo de arranque de los comandos rápidos de henko_bot')
+    p_arranque.add_argument('--repeticiones', type=int, default=5)
+
+    p_control = subparsers.add_parser('control', help='Consultas al bot en ejecución por el socket de control')
+    p_control.add_argument('--consultas', type=int, default=20)
+
+    p_logging = subparsers.add_parser('logging', help='Scraping con log INFO: sincrónico vs cola con rotación')
+    p_logging.add_argument('--paginas', type=int, default=10)
+    p_logging.add_argument('--mensajes', type=int, default=20000)
+    p_logging.add_argument('--repeticiones', type=int, default=5)
+
+    p_horarios = subparsers.add_parser('horarios', help='Desfase del planificador entre horario y envío')
+    p_horarios.add_argument('--envios', type=int, default=4)
+    p_horarios.add_argument('--intervalo', type=float, default=1.0)
+
+    args = parser.parse_args()
+
+    if args.benchmark == 'scraping':
+        benchmark_scraping(args.paginas, args.latencia, args.peticiones_por_segundo, args.rafaga)
+    elif args.benchmark == 'cache':
+        benchmark_cache(args.paginas, args.latencia)
+    elif args.benchmark == 'parseo':
+        benchmark_parseo(args.fixtures, args.repeticiones)
+    elif args.benchmark == 'extraccion':
+        benchmark_extraccion(args.fixtures, args.repeticiones)
+    elif args.benchmark == 'clasificador':
+        benchmark_clasificador(args.fixtures, args.repeticiones)
+    elif args.benchmark == 'estructurado':
+        benchmark_estructurado(args.fixtures, args.repeticiones)
+    elif args.benchmark == 'muestreo':
+        benchmark_muestreo(args.latencia, args.ejecuciones)
+    elif args.benchmark == 'detalle':
+        benchmark_detalle(args.latencia, args.candidatos)
+    elif args.benchmark == 'imagenes':
+        benchmark_imagenes(args.latencia, args.cantidad)
+    elif args.benchmark == 'file-ids':
+        benchmark_file_ids(args.envios, args.latencia)
+    elif args.benchmark == 'telegram':
+        benchmark_telegram(args.mensajes, args.latencia, args.p429, args.p5xx)
+    elif args.benchmark == 'difusion':
+        benchmark_difusion(args.destinos, args.rondas, args.latencia)
+    elif args.benchmark == 'album':
+        benchmark_album(args.productos, args.latencia, args.repeticiones)
+    elif args.benchmark == 'render':
+        benchmark_render(args.latencia)
+    elif args.benchmark == 'copies':
+        benchmark_copies(args.productos, args.repeticiones)
+    elif args.benchmark == 'preparacion':
+        benchmark_preparacion(args.latencia)
+    elif args.benchmark == 'arranque':
+        benchmark_arranque(args.repeticiones)
+    elif args.benchmark == 'control':
+        benchmark_control(args.consultas)
+    elif args.benchmark == 'logging':
+        benchmark_logging(args.paginas, args.mensajes, args.repeticiones)
+    elif args.benchmark == 'horarios':
+        benchmark_horarios(args.envios, args.intervalo)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Socket de control de Henko Bot
+El bot en modo automático escucha en un socket UNIX local; start.py (u otro proceso) le pregunta
+el estado, el próximo envío o las estadísticas en vivo, o le pide un envío inmediato, sin levantar
+otro proceso ni releer archivos.
+
+Protocolo: una línea JSON por pedido ({"comando": "estado"}) y una línea JSON por respuesta
+({"ok": true, "resultado": ...} o {"ok": false, "error": "..."}).
+
+Uso: python control.py [estado|proximo|disparar|estadisticas|caches|ultimo] [--socket henko_bot.sock]
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+SOCKET_CONTROL = "henko_bot.sock"
+MAX_PEDIDO = 64 * 1024
+
+def disponible() -> bool:
+    """Los sockets UNIX no existen en todas las plataformas (Windows antiguos)"""
+    return hasattr(socket, 'AF_UNIX')
+
+def enviar_comando(comando: str, ruta: str = SOCKET_CONTROL, timeout: float = 5.0) -> Optional[Dict]:
+    """Manda un comando al bot en ejecución; None si no hay ningún bot escuchando en `ruta`"""
+    if not disponible() or not os.path.exists(ruta):
+        return None
+    
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conexion:
+            conexion.settimeout(timeout)
+            conexion.connect(ruta)
+            conexion.sendall(json.dumps({"comando": comando}).encode('utf-8') + b"\n")
+            with conexion.makefile('rb') as lector:
+                linea = lector.readline()
+        return json.loads(linea) if linea else None
+    except (OSError, ValueError) as e:
+        logger.debug(f"Bot no disponible en {ruta}: {e}")
+        return None
+
+class ServidorControl:
+    """Atiende comandos en un socket UNIX; cada comando es una función sin argumentos que devuelve algo serializable"""
+    
+    def __init__(self, ruta: str, comandos: Dict[str, Callable[[], object]]):
+        self.ruta = ruta
+        self.comandos = comandos
+        self._servidor: Optional[socketserver.ThreadingUnixStreamServer] = None
+    
+    def iniciar(self) -> bool:
+        """Empieza a escuchar en un hilo aparte; False si no se pudo (otro bot escuchando, sin AF_UNIX)"""
+        if not disponible():
+            logger.warning("Sockets UNIX no disponibles: socket de control desactivado")
+            return False
+        
+        if os.path.exists(self.ruta):
+            if enviar_comando("estado", self.ruta, timeout=1.0) is not None:
+                logger.error(f"Ya hay un bot escuchando en {self.ruta}: socket de control desactivado")
+                return False
+            os.unlink(self.ruta)  # Quedó de una ejecución que no terminó bien
+        
+        servidor = self
+        
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                linea = self.rfile.readline(MAX_PEDIDO)
+                if not linea:
+                    return
+                respuesta = servidor.atender(linea)
+                self.wfile.write(json.dumps(respuesta, ensure_ascii=False, default=str).encode('utf-8') + b"\n")
+        
+        try:
+            self._servidor = socketserver.ThreadingUnixStreamServer(self.ruta, Handler)
+            self._servidor.daemon_threads = True
+            os.chmod(self.ruta, 0o600)  # Solo el usuario que corre el bot
+        except OSError as e:
+            logger.error(f"No se pudo abrir el socket de control {self.ruta}: {e}")
+            return False
+        
+        threading.Thread(target=self._servidor.serve_forever, name="henko-control", daemon=True).start()
+        logger.info(f"Socket de control escuchando en {self.ruta}")
+        return True
+    
+    def atender(self, linea: bytes) -> Dict:
+        try:
+            comando = json.loads(linea).get('comando')
+        except (ValueError, AttributeError):
+            return {"ok": False, "error": "Pedido inválido: se espera una línea JSON con 'comando'"}
+        
+        funcion = self.comandos.get(comando)
+        if not funcion:
+            return {"ok": False, "error": f"Comando desconocido: {comando}. Disponibles: {', '.join(self.comandos)}"}
+        
+        try:
+            return {"ok": True, "resultado": funcion()}
+        except Exception as e:
+            logger.error(f"Error atendiendo el comando {comando}: {e}")
+            return {"ok": False, "error": str(e)}
+    
+    def detener(self):
+        if not self._servidor:
+            return
+        self._servidor.shutdown()
+        self._servidor.server_close()
+        self._servidor = None
+        try:
+            os.unlink(self.ruta)
+        except OSError:
+            pass
+
+def main():
+    parser = argparse.ArgumentParser(description='Consulta al bot en ejecución por el socket de control')
+    parser.add_argument('comando', nargs='?', default='estado')
+    parser.add_argument('--socket', default=SOCKET_CONTROL)
+    args = parser.parse_args()
+    
+    respuesta = enviar_comando(args.comando, args.socket)
+    if respuesta is None:
+        print(f"📭 No hay un bot en ejecución escuchando en {args.socket}")
+        raise SystemExit(1)
+    
+    print(json.dumps(respuesta, ensure_ascii=False, indent=2))
+    if not respuesta.get('ok'):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
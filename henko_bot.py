@@ -4,30 +4,254 @@ Henko Lencería - Bot Automatizado para Telegram e Instagram
 Aplicación que extrae productos de la tienda y envía notificaciones diarias.
 """
 
-import requests
 import random
-import schedule
 import time
 import logging
+import logging.handlers
 import json
-from datetime import datetime
-from bs4 import BeautifulSoup
-from typing import List, Dict, Optional
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Callable, List, Dict, Optional, Set, Tuple, Iterator
 import os
-from dataclasses import dataclass
+import queue
+import sys
+from dataclasses import asdict, dataclass, replace
 import re
+import atexit
+import hashlib
+import importlib
+import io
+import struct
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse, urlsplit, urlunsplit
+from collections import deque
+from itertools import islice
+
+from control import SOCKET_CONTROL, ServidorControl
+from historial import HistorialEnvios, clave_de
+
+# requests, bs4, Pillow y orjson se importan recién en el código que los usa, así los
+# comandos rápidos (estadísticas, último producto, configuración) arrancan sin cargarlos
+if TYPE_CHECKING:
+    import requests
+    from bs4 import BeautifulSoup
+
+_MODULOS_OPCIONALES: Dict[str, object] = {}
+
+def _importar_opcional(nombre: str):
+    """Importa un módulo opcional la primera vez que se pide; None si no está instalado"""
+    if nombre not in _MODULOS_OPCIONALES:
+        try:
+            _MODULOS_OPCIONALES[nombre] = importlib.import_module(nombre)
+        except ImportError:
+            _MODULOS_OPCIONALES[nombre] = None
+    return _MODULOS_OPCIONALES[nombre]
+
+def _json_loads(texto):
+    # orjson es opcional: decodificador más rápido para el JSON embebido
+    orjson = _importar_opcional('orjson')
+    return orjson.loads(texto) if orjson else json.loads(texto)
+
+class FormateadorJSON(logging.Formatter):
+    """Una línea JSON por registro, para procesar el log con otras herramientas"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        datos = {
+            "fecha": self.formatTime(record),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "hilo": record.threadName,
+            "mensaje": record.getMessage()
+        }
+        if record.exc_info:
+            datos["excepcion"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            datos["excepcion"] = record.exc_text
+        return json.dumps(datos, ensure_ascii=False)
+
+class HandlerCola(logging.handlers.QueueHandler):
+    """Encola el registro ya con el mensaje armado, y la traza aparte para que cada formateador la ubique
+    
+    Es el único handler de la raíz, así que modifica el registro en lugar de copiarlo: lo que no hace
+    falta para cruzar de hilo queda para el hilo escritor.
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Los mensajes del bot son f-strings: solo se formatea en este hilo si hay argumentos `%`
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def _rotar_comprimiendo(origen: str, destino: str):
+    """Rotador para los handlers de archivo: el log rotado queda comprimido con gzip"""
+    import gzip
+    import shutil
+    
+    with open(origen, 'rb') as entrada, gzip.open(destino, 'wb') as salida:
+        shutil.copyfileobj(entrada, salida)
+    os.remove(origen)
+
+_LISTENER_LOG = None
+
+def configurar_logging(config: Optional[Dict] = None, consola: bool = True, stream=None):
+    """Logging no bloqueante: los hilos del bot solo encolan y un hilo aparte escribe y rota el archivo
+    
+    Se configura al crear el bot, no al importar el módulo. Volver a llamarla reemplaza la configuración.
+    """
+    global _LISTENER_LOG
+    config = config or {}
+    raiz = logging.getLogger()
+    if _LISTENER_LOG:
+        detener_logging()
+    else:
+        atexit.register(detener_logging)
+    
+    nivel = logging.getLevelName(str(config.get('log_level', 'INFO')).upper())
+    if not isinstance(nivel, int):
+        nivel = logging.INFO
+    
+    formato = (FormateadorJSON() if config.get('log_json')
+               else logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    
+    archivo = config.get('log_archivo', 'henko_bot.log')
+    copias = config.get('log_copias', 5)
+    if config.get('log_rotacion', 'tamano') == 'diaria':
+        handler_archivo = logging.handlers.TimedRotatingFileHandler(archivo, when='midnight', backupCount=copias, encoding='utf-8')
+    else:
+        handler_archivo = logging.handlers.RotatingFileHandler(
+            archivo, maxBytes=int(config.get('log_max_mb', 10) * 1024 * 1024), backupCount=copias, encoding='utf-8')
+    if config.get('log_comprimir', True):
+        handler_archivo.namer = lambda nombre: f"{nombre}.gz"
+        handler_archivo.rotator = _rotar_comprimiendo
+    
+    handlers = [handler_archivo]
+    if consola:
+        handlers.append(logging.StreamHandler(stream))
+    for handler in handlers:
+        handler.setFormatter(formato)
+    
+    cola = queue.SimpleQueue()
+    handler_cola = HandlerCola(cola)
+    # Lo que ningún handler del hilo escritor va a escribir no se encola
+    handler_cola.setLevel(min(handler.level for handler in handlers))
+    raiz.addHandler(handler_cola)
+    raiz.setLevel(nivel)
+    _LISTENER_LOG = logging.handlers.QueueListener(cola, *handlers, respect_handler_level=True)
+    _LISTENER_LOG.start()
+
+def detener_logging():
+    """Vacía la cola de logs y cierra los archivos (se llama al salir)"""
+    global _LISTENER_LOG
+    if not _LISTENER_LOG:
+        return
+    _LISTENER_LOG.stop()
+    for handler in _LISTENER_LOG.handlers:
+        handler.close()
+    raiz = logging.getLogger()
+    for handler in list(raiz.handlers):
+        if isinstance(handler, HandlerCola):
+            raiz.removeHandler(handler)
+    _LISTENER_LOG = None
 
-# Configuración de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('henko_bot.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
+_RE_HREF_PRODUCTO = re.compile(r'/productos/[^/]+')
+_RE_NUMERO_PAGINA = re.compile(r'(?:/page/|[?&](?:mpage|page)=)(\d+)')
+
+_RE_CLASE_TARJETA = re.compile(r'^(?:js-item-product|item-product|product-item)$')
+_RE_CLASE_PAGINACION = re.compile(r'pagination|paginador')
+_RE_CLASE_FORMULARIO_PRODUCTO = re.compile(r'^(?:js-product-form|js-product-container|js-product-detail)$')
+
+# Datos estructurados embebidos (JSON-LD y variantes de Tienda Nube)
+_RE_JSON_LD = re.compile(rb'<script[^>]*application/ld\+json[^>]*>(.*?)</script>', re.S | re.I)
+_RE_ID_EN_NOMBRE = re.compile(r'^\s*(\d+)\s*\|\s*(.*)$')
+_RE_TALLE = re.compile(
+    r'^(?:xxs|xs|s|m|l|xl|xxl|xxxl|[2-6]xl|u|t\.?u\.?|[uú]nico|\d{1,3}(?:\s*[a-h])?(?:/\d{1,3})?)$', re.I
+)
+
+# Patrones de extracción de campos, compilados una sola vez
+_RE_CARACTERES_EXTRA = re.compile(r'[^\w\s|$.,\-áéíóúñ]+')
+_RE_ESPACIOS = re.compile(r'\s+')
+_RE_PRECIO = re.compile(r'\$[\d,.]+')
+_RE_STOCK = re.compile(r'(stock|quedan|último|agotado)', re.I)
+
+# Palabras clave por categoría, en orden de prioridad
+_CATEGORIAS_PALABRAS = [
+    ("Soutien", ['soutien', 'corpiño', 'bra']),
+    ("Body", ['body', 'bodysuit']),
+    ("Conjunto", ['conjunto', 'set']),
+    ("Bombacha", ['bombacha', 'calzón']),
+    ("Medias", ['media', 'calcetín']),
+    ("Pijamas", ['camisón', 'pijama']),
+]
+_SENAL_SIN_STOCK = 'sin stock'
+_PRIORIDAD_PALABRA = {
+    palabra: (prioridad, categoria)
+    for prioridad, (categoria, palabras) in enumerate(_CATEGORIAS_PALABRAS)
+    for palabra in palabras
+}
+# Una sola alternación (la más larga primero). Ninguna palabra termina con el comienzo
+# de otra, así que las coincidencias no solapadas dan el mismo resultado que buscar cada una
+_RE_CLASIFICADOR = re.compile('|'.join(
+    re.escape(p) for p in sorted(list(_PRIORIDAD_PALABRA) + [_SENAL_SIN_STOCK], key=len, reverse=True)
+))
+
+def clasificar_texto(texto: str) -> Tuple[str, bool]:
+    """Devuelve (categoría, sin_stock) recorriendo el texto en minúsculas una sola vez"""
+    mejor_prioridad, categoria = len(_CATEGORIAS_PALABRAS), "Lencería"
+    sin_stock = False
+    
+    for palabra in _RE_CLASIFICADOR.findall(texto):
+        if palabra == _SENAL_SIN_STOCK:
+            sin_stock = True
+            continue
+        prioridad, candidata = _PRIORIDAD_PALABRA[palabra]
+        if prioridad < mejor_prioridad:
+            mejor_prioridad, categoria = prioridad, candidata
+    
+    return categoria, sin_stock
+
+def _items_json_ld(datos) -> Iterator[Dict]:
+    """Recorre un bloque JSON-LD y devuelve los objetos de tipo Product (listas, @graph, ItemList)"""
+    if isinstance(datos, list):
+        for item in datos:
+            yield from _items_json_ld(item)
+    elif isinstance(datos, dict):
+        tipo = datos.get('@type')
+        if tipo == 'Product' or (isinstance(tipo, list) and 'Product' in tipo):
+            yield datos
+        for clave in ('@graph', 'itemListElement', 'item'):
+            if clave in datos:
+                yield from _items_json_ld(datos[clave])
+
+# Parseo restringido: solo tarjetas de producto y paginación, sin header/menú/footer/scripts
+_RE_CLASE_GRILLA = re.compile(r'item-product|product-item|js-product-container|pagination|paginador')
+_STRAINER_GRILLA = None
+
+def _strainer_grilla():
+    global _STRAINER_GRILLA
+    if _STRAINER_GRILLA is None:
+        from bs4 import SoupStrainer
+        _STRAINER_GRILLA = SoupStrainer(class_=_RE_CLASE_GRILLA)
+    return _STRAINER_GRILLA
+
+def resolver_parser_html(nombre: str = "auto") -> str:
+    """Devuelve el parser de BeautifulSoup a usar: lxml si está disponible, si no html.parser"""
+    from bs4.builder import builder_registry
+    
+    candidatos = ['lxml', 'html.parser'] if nombre == 'auto' else [nombre, 'html.parser']
+    for candidato in candidatos:
+        if builder_registry.lookup(candidato) is not None:
+            if candidato != candidatos[0] and nombre != 'auto':
+                logger.warning(f"Parser HTML '{nombre}' no disponible, usando '{candidato}'")
+            return candidato
+    return 'html.parser'
+
 @dataclass
 class Producto:
     """Clase para representar un producto de la tienda"""
@@ -43,94 +267,410 @@ class Producto:
     talles: List[str]
     categoria: str
 
+def clave_producto(producto: Producto) -> str:
+    """Clave estable de un producto: su ID si es real, si no el link (la misma que usa el historial)"""
+    return clave_de(producto.id, producto.link)
+
+class LimitadorTasa:
+    """Token bucket por clave (host de la tienda, chat de Telegram) para no superar una tasa dada"""
+    
+    def __init__(self, peticiones_por_segundo: float = 1.0, rafaga: int = 1):
+        self.peticiones_por_segundo = max(peticiones_por_segundo, 0.01)
+        self.rafaga = max(rafaga, 1)
+        self._buckets: Dict[str, tuple] = {}  # host -> (tokens, ultima_recarga)
+        self._lock = threading.Lock()
+    
+    def esperar(self, url: str):
+        """Bloquea hasta que haya un token disponible para el host de la URL"""
+        self.adquirir(urlparse(url).netloc)
+    
+    def adquirir(self, clave: str):
+        """Bloquea hasta que haya un token disponible para la clave"""
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                tokens, ultima_recarga = self._buckets.get(clave, (float(self.rafaga), ahora))
+                tokens = min(self.rafaga, tokens + (ahora - ultima_recarga) * self.peticiones_por_segundo)
+                
+                if tokens >= 1:
+                    self._buckets[clave] = (tokens - 1, ahora)
+                    return
+                
+                self._buckets[clave] = (tokens, ahora)
+                espera = (1 - tokens) / self.peticiones_por_segundo
+            
+            time.sleep(espera)
+
+class CacheHTTP:
+    """Caché en disco de respuestas HTTP con revalidación condicional y desalojo LRU"""
+    
+    def __init__(self, directorio: str = "cache_http", ttl_segundos: float = 3600, max_bytes: int = 50 * 1024 * 1024):
+        self.directorio = directorio
+        self.ttl_segundos = ttl_segundos
+        self.max_bytes = max_bytes
+        self.indice_file = os.path.join(directorio, "indice.json")
+        self._lock = threading.Lock()
+        self._indice: Dict[str, Dict] = {}
+        
+        try:
+            os.makedirs(directorio, exist_ok=True)
+            if os.path.exists(self.indice_file):
+                with open(self.indice_file, 'r', encoding='utf-8') as f:
+                    self._indice = json.load(f)
+        except Exception as e:
+            logger.warning(f"No se pudo cargar el índice de la caché HTTP: {e}")
+            self._indice = {}
+    
+    def _ruta(self, url: str) -> str:
+        return os.path.join(self.directorio, hashlib.sha256(url.encode('utf-8')).hexdigest() + ".cache")
+    
+    def obtener(self, url: str) -> Optional[Dict]:
+        """Devuelve la entrada guardada para la URL, si existe"""
+        with self._lock:
+            entrada = self._indice.get(url)
+            return dict(entrada) if entrada else None
+    
+    def es_fresca(self, entrada: Dict) -> bool:
+        """Indica si la entrada sigue dentro del TTL y se puede servir sin consultar"""
+        return time.time() - entrada.get('validado', 0) < self.ttl_segundos
+    
+    def cabeceras_condicionales(self, entrada: Dict) -> Dict[str, str]:
+        """Cabeceras para revalidar la entrada contra el servidor"""
+        cabeceras = {}
+        if entrada.get('etag'):
+            cabeceras['If-None-Match'] = entrada['etag']
+        if entrada.get('last_modified'):
+            cabeceras['If-Modified-Since'] = entrada['last_modified']
+        return cabeceras
+    
+    def leer(self, url: str) -> Optional[bytes]:
+        """Lee el cuerpo guardado y marca la entrada como usada recientemente"""
+        try:
+            with open(self._ruta(url), 'rb') as f:
+                contenido = f.read()
+        except OSError:
+            with self._lock:
+                self._indice.pop(url, None)
+            return None
+        
+        with self._lock:
+            if url in self._indice:
+                self._indice[url]['ultimo_acceso'] = time.time()
+        return contenido
+    
+    def revalidar(self, url: str):
+        """Renueva el TTL de una entrada tras un 304 Not Modified"""
+        with self._lock:
+            if url in self._indice:
+                self._indice[url]['validado'] = time.time()
+                self._guardar_indice()
+    
+    def guardar(self, url: str, contenido: bytes, cabeceras):
+        """Guarda una respuesta 200 y desaloja las entradas menos usadas si hace falta"""
+        try:
+            ruta = self._ruta(url)
+            with open(ruta + ".tmp", 'wb') as f:
+                f.write(contenido)
+            os.replace(ruta + ".tmp", ruta)
+            
+            ahora = time.time()
+            with self._lock:
+                self._indice[url] = {
+                    'etag': cabeceras.get('ETag'),
+                    'last_modified': cabeceras.get('Last-Modified'),
+                    'tamano': len(contenido),
+                    'validado': ahora,
+                    'ultimo_acceso': ahora
+                }
+                self._desalojar()
+                self._guardar_indice()
+        except Exception as e:
+            logger.warning(f"No se pudo guardar en caché {url}: {e}")
+    
+    def tamano_total(self) -> int:
+        with self._lock:
+            return sum(e.get('tamano', 0) for e in self._indice.values())
+    
+    def _desalojar(self):
+        """Elimina las entradas usadas hace más tiempo hasta respetar max_bytes"""
+        total = sum(e.get('tamano', 0) for e in self._indice.values())
+        if total <= self.max_bytes:
+            return
+        
+        for url, entrada in sorted(self._indice.items(), key=lambda item: item[1].get('ultimo_acceso', 0)):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._ruta(url))
+            except OSError:
+                pass
+            total -= entrada.get('tamano', 0)
+            del self._indice[url]
+            logger.debug(f"Caché HTTP: desalojada {url}")
+    
+    def _guardar_indice(self):
+        tmp = self.indice_file + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self._indice, f)
+        os.replace(tmp, self.indice_file)
+
 class HenkoScraper:
     """Scraper para extraer productos de Henko Lencería"""
     
-    def __init__(self):
+    def __init__(self, config: Optional[Dict] = None):
+        config = config or {}
         self.base_url = "https://henkolenceria.mitiendanube.com"
         self.productos_url = f"{self.base_url}/productos/?mpage=200"  # Página fija
+        import requests
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        
+        # Descarga concurrente de páginas con límite de tasa por host
+        self.scraping_concurrente = config.get('scraping_concurrente', False)
+        self.max_workers = max(int(config.get('max_workers_scraping', 4)), 1)
+        self.timeout = config.get('timeout_peticiones', 30)
+        self.max_paginas_sondeo = int(config.get('max_paginas_sondeo', 50))
+        
+        # Muestreo en streaming: cuándo dejar de descargar páginas
+        self.muestreo_min_candidatos = int(config.get('muestreo_min_candidatos', 40))
+        self.muestreo_min_paginas = int(config.get('muestreo_min_paginas', 2))
+        self.estadisticas_streaming: Dict[str, int] = {}
+        
+        # Backend de parseo HTML
+        self.parser_html = resolver_parser_html(config.get('parser_html', 'auto'))
+        self.parseo_restringido = config.get('parseo_restringido', True)
+        
+        # Extracción por tarjeta y contador de extracciones por página
+        self.extraccion_por_tarjeta = config.get('extraccion_por_tarjeta', True)
+        self.extraccion_estructurada = config.get('extraccion_estructurada', True)
+        self.imagen_ancho_minimo = int(config.get('imagen_ancho_minimo', 640))
+        self.estadisticas_extraccion: Dict[int, Dict[str, int]] = {}
+        self._lock_estadisticas = threading.Lock()
+        self.limitador = LimitadorTasa(
+            config.get('peticiones_por_segundo', 1.0),
+            config.get('rafaga_peticiones', 1)
+        )
+        # Con una petición por segundo y sin ráfaga el limitador serializa todo: el pool no acelera nada
+        if self.scraping_concurrente and self.limitador.rafaga < 2 and self.limitador.peticiones_por_segundo <= 1:
+            logger.warning("scraping_concurrente no acelera con peticiones_por_segundo <= 1 y rafaga_peticiones 1; "
+                           "se scrapea de a una página")
+            self.scraping_concurrente = False
+        
+        # Caché persistente de páginas con revalidación condicional
+        self.cache = None
+        if config.get('cache_http', True):
+            self.cache = CacheHTTP(
+                config.get('cache_http_directorio', 'cache_http'),
+                config.get('cache_http_ttl_segundos', 3600),
+                int(config.get('cache_http_max_mb', 50) * 1024 * 1024)
+            )
     
-    def obtener_total_paginas(self) -> int:
-        """Obtiene el número total de páginas de productos"""
+    def _descargar(self, url: str) -> bytes:
+        """Descarga una URL usando la caché HTTP y respetando el límite de tasa del host"""
+        entrada = self.cache.obtener(url) if self.cache else None
+        cabeceras = {}
+        
+        if entrada:
+            if self.cache.es_fresca(entrada):
+                contenido = self.cache.leer(url)
+                if contenido is not None:
+                    logger.debug(f"Caché HTTP (fresca): {url}")
+                    return contenido
+            else:
+                cabeceras = self.cache.cabeceras_condicionales(entrada)
+        
+        self.limitador.esperar(url)
+        response = self.session.get(url, headers=cabeceras, timeout=self.timeout)
+        
+        if response.status_code == 304 and entrada:
+            contenido = self.cache.leer(url)
+            if contenido is not None:
+                self.cache.revalidar(url)
+                logger.debug(f"Caché HTTP (304): {url}")
+                return contenido
+            # El cuerpo guardado desapareció: pedir la página completa
+            self.limitador.esperar(url)
+            response = self.session.get(url, timeout=self.timeout)
+        
+        response.raise_for_status()
+        if self.cache:
+            self.cache.guardar(url, response.content, response.headers)
+        return response.content
+    
+    def _parsear_html(self, contenido: bytes) -> "BeautifulSoup":
+        """Parsea una página del listado, limitándose a la grilla de productos si es posible"""
+        from bs4 import BeautifulSoup
+        
+        if self.parseo_restringido:
+            soup = BeautifulSoup(contenido, self.parser_html, parse_only=_strainer_grilla())
+            if soup.find('a', href=_RE_HREF_PRODUCTO):
+                # El strainer descarta el <head>: conservar los bloques JSON-LD
+                if self.extraccion_estructurada:
+                    for bloque in _RE_JSON_LD.findall(contenido):
+                        script = soup.new_tag('script', attrs={'type': 'application/ld+json'})
+                        script.string = bloque.decode('utf-8', errors='replace')
+                        soup.append(script)
+                return soup
+            logger.debug("Parseo restringido sin productos, parseando el documento completo")
+        
+        return BeautifulSoup(contenido, self.parser_html)
+    
+    def _url_pagina(self, pagina: int) -> str:
+        """URL de una página del listado, con el mismo esquema que los enlaces de paginación (/productos/page/N/)"""
+        if pagina <= 1:
+            return self.productos_url
+        partes = urlsplit(self.productos_url)
+        ruta = f"{partes.path.rstrip('/')}/page/{pagina}/"
+        return urlunsplit((partes.scheme, partes.netloc, ruta, partes.query, ''))
+    
+    def descubrir_paginacion(self) -> Tuple[int, Optional["BeautifulSoup"]]:
+        """Detecta el número real de páginas y devuelve la página 1 ya parseada para reutilizarla"""
         try:
-            response = self.session.get(self.productos_url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
+            contenido = self._descargar(self.productos_url)
+            soup = self._parsear_html(contenido)
+            
+            total_paginas = self._total_paginas_desde_markup(soup)
+            if total_paginas:
+                logger.info(f"Total de páginas según la paginación: {total_paginas}")
+                return total_paginas, soup
             
-            # Buscar indicadores de paginación
-            pagination_info = soup.find_all(['span', 'div'], class_=re.compile(r'pagination|page'))
+            # Sin paginación visible: sondear qué páginas tienen productos
+            if self.max_paginas_sondeo > 1:
+                total_paginas = self._sondear_total_paginas(self._hrefs_productos(soup))
+                logger.info(f"Total de páginas según sondeo: {total_paginas}")
+                return total_paginas, soup
             
-            # Por ahora asumimos 10 páginas basado en los 577 productos observados
-            # Esto se puede optimizar detectando la paginación real
+            # Último recurso: estimación basada en los 577 productos observados
             total_productos = 577
             productos_por_pagina = 60  # Estimación basada en observación
             total_paginas = (total_productos + productos_por_pagina - 1) // productos_por_pagina
             
             logger.info(f"Total estimado de páginas: {total_paginas}")
-            return total_paginas
+            return total_paginas, soup
             
         except Exception as e:
             logger.error(f"Error obteniendo total de páginas: {e}")
-            return 10  # Valor por defecto
+            return 10, None  # Valor por defecto
+    
+    def obtener_total_paginas(self) -> int:
+        """Obtiene el número total de páginas de productos"""
+        total_paginas, _ = self.descubrir_paginacion()
+        return total_paginas
+    
+    def _total_paginas_desde_markup(self, soup) -> int:
+        """Lee el número de la última página desde los enlaces de paginación"""
+        maximo = 0
+        
+        for elemento in soup.find_all(attrs={'data-total-pages': True}):
+            valor = str(elemento.get('data-total-pages', '')).strip()
+            if valor.isdigit():
+                maximo = max(maximo, int(valor))
+        
+        for contenedor in soup.find_all(class_=_RE_CLASE_PAGINACION):
+            for enlace in contenedor.find_all('a'):
+                match = _RE_NUMERO_PAGINA.search(enlace.get('href', ''))
+                if match:
+                    maximo = max(maximo, int(match.group(1)))
+                texto = enlace.get_text(strip=True)
+                if texto.isdigit():
+                    maximo = max(maximo, int(texto))
+        
+        return maximo
+    
+    def _hrefs_productos(self, soup) -> set:
+        """Conjunto de hrefs de producto de una página, para comparar páginas entre sí"""
+        return {
+            self._normalizar_href(enlace.get('href', ''))
+            for enlace in soup.find_all('a', href=_RE_HREF_PRODUCTO)
+        }
+    
+    def _pagina_tiene_productos(self, pagina: int, hrefs_pagina_1: set) -> bool:
+        """Una página existe si tiene productos distintos a los de la página 1"""
+        try:
+            soup = self._parsear_html(self._descargar(self._url_pagina(pagina)))
+            hrefs = self._hrefs_productos(soup)
+            return bool(hrefs) and hrefs != hrefs_pagina_1
+        except Exception as e:
+            logger.debug(f"Sondeo de página {pagina} fallido: {e}")
+            return False
+    
+    def _sondear_total_paginas(self, hrefs_pagina_1: set) -> int:
+        """Busca la última página con productos: crecimiento exponencial y luego búsqueda binaria"""
+        if not hrefs_pagina_1:
+            return 1
+        
+        # Duplicar hasta encontrar una página vacía o llegar al límite
+        existente, inexistente = 1, None
+        pagina = 2
+        while inexistente is None:
+            if pagina >= self.max_paginas_sondeo:
+                if self._pagina_tiene_productos(self.max_paginas_sondeo, hrefs_pagina_1):
+                    return self.max_paginas_sondeo
+                inexistente = self.max_paginas_sondeo
+            elif self._pagina_tiene_productos(pagina, hrefs_pagina_1):
+                existente = pagina
+                pagina *= 2
+            else:
+                inexistente = pagina
+        
+        # Búsqueda binaria entre la última página con productos y la primera sin ellos
+        while inexistente - existente > 1:
+            medio = (existente + inexistente) // 2
+            if self._pagina_tiene_productos(medio, hrefs_pagina_1):
+                existente = medio
+            else:
+                inexistente = medio
+        
+        return existente
     
-    def extraer_productos_pagina(self, pagina: int = 1) -> List[Producto]:
-        """Extrae productos de una página específica - TODOS los productos, no solo una marca"""
+    def extraer_productos_pagina(self, pagina: int = 1, soup: Optional["BeautifulSoup"] = None) -> List[Producto]:
+        """Extrae productos de una página específica - TODOS los productos, no solo una marca
+        
+        Si se recibe la página ya parseada (p. ej. la página 1 de descubrir_paginacion)
+        no se vuelve a descargar.
+        """
         productos = []
         
         try:
-            url = f"{self.productos_url}?mpage={pagina}" if pagina > 1 else self.productos_url
-            logger.info(f"Scrapeando página {pagina}: {url}")
-            
-            response = self.session.get(url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
+            if soup is None:
+                soup = self._obtener_soup_pagina(pagina)
+            else:
+                logger.info(f"Scrapeando página {pagina} (ya descargada)")
             
             # Buscar TODOS los enlaces de productos sin filtrar por marca
-            enlaces_productos = soup.find_all('a', href=re.compile(r'/productos/[^/]+'))
+            enlaces_productos = soup.find_all('a', href=_RE_HREF_PRODUCTO)
             
             logger.info(f"Encontrados {len(enlaces_productos)} enlaces de productos potenciales")
             
-            productos_validos = []
-            for enlace in enlaces_productos:
-                try:
-                    texto_enlace = enlace.get_text(strip=True)
-                    href = enlace.get('href', '')
-                    
-                    # Filtrar enlaces que no son productos reales
-                    if (not href or 
-                        '/productos/' not in href or
-                        'categoria' in href.lower() or
-                        'buscar' in href.lower() or
-                        len(texto_enlace.strip()) < 3):
-                        continue
-                    
-                    # Verificar que el texto tiene contenido real de producto
-                    if texto_enlace and len(texto_enlace.strip()) > 0:
-                        # Intentar extraer producto sin importar la marca
-                        producto = self._extraer_producto_desde_enlace(enlace, soup)
-                        if producto and self._es_producto_valido(producto):
-                            productos_validos.append(producto)
-                            logger.debug(f"Producto extraído: {producto.nombre}")
-                            
-                except Exception as e:
-                    logger.warning(f"Error extrayendo producto desde enlace: {e}")
-                    continue
+            if self.extraccion_por_tarjeta:
+                productos_validos, extracciones, estructurados = self._extraer_por_tarjetas(soup, enlaces_productos)
+            else:
+                productos_validos, extracciones, estructurados = self._extraer_por_enlaces(soup, enlaces_productos)
             
-            # Eliminar duplicados por ID o link
+            # Eliminar duplicados por href normalizado y por ID (o link si no hay ID válido)
             productos_unicos = {}
+            hrefs_vistos = set()
             for producto in productos_validos:
-                # Usar el link como clave única si no hay ID válido
-                clave = producto.id if producto.id.isdigit() else producto.link
-                if clave not in productos_unicos:
+                href = self._normalizar_href(producto.link)
+                clave = clave_producto(producto)
+                if href not in hrefs_vistos and clave not in productos_unicos:
+                    hrefs_vistos.add(href)
                     productos_unicos[clave] = producto
             
             productos = list(productos_unicos.values())
             logger.info(f"Extraídos {len(productos)} productos únicos de la página {pagina}")
             
+            with self._lock_estadisticas:
+                self.estadisticas_extraccion[pagina] = {
+                    'enlaces': len(enlaces_productos),
+                    'extracciones': extracciones,
+                    'estructurados': estructurados,
+                    'productos': len(productos)
+                }
+            logger.info(f"Página {pagina}: {extracciones} extracciones para {len(productos)} productos")
+            
             # Mostrar variedad de marcas encontradas para verificar
             marcas_encontradas = set(p.marca for p in productos if p.marca)
             if marcas_encontradas:
@@ -141,6 +681,319 @@ class HenkoScraper:
         
         return productos
     
+    def _obtener_soup_pagina(self, pagina: int) -> "BeautifulSoup":
+        """Descarga y parsea una página del listado"""
+        url = self._url_pagina(pagina)
+        logger.info(f"Scrapeando página {pagina}: {url}")
+        return self._parsear_html(self._descargar(url))
+    
+    def _es_enlace_descartable(self, href: str, texto_enlace: str) -> bool:
+        """Filtra enlaces que no son productos reales"""
+        return (not href or
+                '/productos/' not in href or
+                'categoria' in href.lower() or
+                'buscar' in href.lower() or
+                len(texto_enlace.strip()) < 3)
+    
+    def _normalizar_href(self, href: str) -> str:
+        """Href sin dominio, query, fragmento ni barra final, para comparar productos"""
+        return urlparse(href).path.rstrip('/')
+    
+    def _extraer_por_enlaces(self, soup, enlaces_productos) -> Tuple[List[Producto], int, int]:
+        """Modo clásico: extrae un enlace por producto, sin buscar las tarjetas
+        
+        Un producto suele tener varios enlaces (imagen, título, "Comprar"): se agrupan por href
+        normalizado y se extrae solo el de más texto, igual que en el modo por tarjeta. Si no, el
+        botón sin ID y el título con ID quedarían como dos productos distintos.
+        """
+        productos_validos = []
+        extracciones = 0
+        
+        por_href: Dict[str, Tuple[object, str]] = {}
+        for enlace in enlaces_productos:
+            texto_enlace = enlace.get_text(strip=True)
+            if self._es_enlace_descartable(enlace.get('href', ''), texto_enlace):
+                continue
+            href = self._normalizar_href(enlace['href'])
+            if href not in por_href or len(texto_enlace) > len(por_href[href][1]):
+                por_href[href] = (enlace, texto_enlace)
+        
+        for enlace, _ in por_href.values():
+            try:
+                # Intentar extraer producto sin importar la marca
+                extracciones += 1
+                producto = self._extraer_producto_desde_enlace(enlace, soup)
+                if producto and self._es_producto_valido(producto):
+                    productos_validos.append(producto)
+                    logger.debug(f"Producto extraído: {producto.nombre}")
+                    
+            except Exception as e:
+                logger.warning(f"Error extrayendo producto desde enlace: {e}")
+                continue
+        
+        return productos_validos, extracciones, 0
+    
+    def _extraer_por_tarjetas(self, soup, enlaces_productos) -> Tuple[List[Producto], int, int]:
+        """Recorre cada tarjeta de producto una sola vez, deduplicando por href antes de extraer"""
+        contadores = {'tarjetas': 0, 'estructurados': 0}
+        productos_validos = list(self._iterar_tarjetas(soup, enlaces_productos, contadores))
+        return productos_validos, contadores['tarjetas'], contadores['estructurados']
+    
+    def _iterar_tarjetas(self, soup, enlaces_productos, contadores: Dict[str, int]) -> Iterator[Producto]:
+        """Genera los productos válidos de la página a medida que se procesa cada tarjeta
+        
+        Primero intenta con los datos estructurados embebidos; el DOM queda como respaldo.
+        El JSON-LD de la página se parsea una sola vez y solo si alguna tarjeta lo necesita.
+        Suma en `contadores` las tarjetas procesadas y las resueltas desde JSON.
+        """
+        vistos = set()
+        json_ld_pagina: Optional[Dict[str, Dict]] = None
+        
+        def json_ld_de(href: str) -> Optional[Dict]:
+            nonlocal json_ld_pagina
+            if json_ld_pagina is None:
+                json_ld_pagina = self._productos_json_ld(soup)
+            return json_ld_pagina.get(href)
+        
+        tarjetas = soup.find_all(class_=_RE_CLASE_TARJETA)
+        if not tarjetas:
+            # Sin tarjetas reconocibles: agrupar los enlaces por producto
+            tarjetas = self._agrupar_enlaces_por_producto(enlaces_productos)
+        
+        for tarjeta in tarjetas:
+            try:
+                enlace = self._enlace_principal(tarjeta)
+                if enlace is None:
+                    continue
+                
+                href = self._normalizar_href(enlace.get('href', ''))
+                if href in vistos:
+                    continue
+                vistos.add(href)
+                
+                contadores['tarjetas'] += 1
+                producto = None
+                if self.extraccion_estructurada:
+                    producto = self._extraer_producto_estructurado(tarjeta, enlace, lambda: json_ld_de(href))
+                if producto:
+                    contadores['estructurados'] += 1
+                else:
+                    producto = self._extraer_producto_desde_tarjeta(tarjeta, enlace)
+                
+                if producto and self._es_producto_valido(producto):
+                    logger.debug(f"Producto extraído: {producto.nombre}")
+                    yield producto
+                    
+            except Exception as e:
+                logger.warning(f"Error extrayendo producto desde tarjeta: {e}")
+                continue
+    
+    def _productos_json_ld(self, soup) -> Dict[str, Dict]:
+        """Productos JSON-LD de la página indexados por href normalizado"""
+        productos = {}
+        for script in soup.find_all('script', attrs={'type': 'application/ld+json'}):
+            try:
+                datos = _json_loads(str(script.string or ''))
+            except ValueError:
+                continue
+            
+            for item in _items_json_ld(datos):
+                ofertas = item.get('offers')
+                if isinstance(ofertas, list):
+                    ofertas = ofertas[0] if ofertas else {}
+                url = item.get('url') or (ofertas or {}).get('url') or ''
+                if url:
+                    productos[self._normalizar_href(url)] = item
+        return productos
+    
+    def _extraer_producto_estructurado(self, tarjeta, enlace,
+                                       obtener_json_ld: Callable[[], Optional[Dict]]) -> Optional[Producto]:
+        """Construye el Producto desde las variantes embebidas y/o el bloque JSON-LD de la tarjeta
+        
+        Las variantes de la tarjeta se leen una vez. El JSON-LD solo se pide si no alcanzan: sin
+        variantes, sin imagen o sin la marca en el nombre ("ID | Marca").
+        """
+        variantes = self._variantes_desde_elemento(tarjeta)
+        texto_enlace = enlace.get_text(strip=True)
+        json_ld = None
+        if not variantes or not variantes[0].get('image_url') or not _RE_ID_EN_NOMBRE.match(texto_enlace):
+            json_ld = obtener_json_ld()
+        if not variantes and not json_ld:
+            return None
+        
+        json_ld = json_ld or {}
+        variante = variantes[0] if variantes else {}
+        
+        # Nombre, ID y marca
+        nombre = str(json_ld.get('name') or texto_enlace).strip()
+        if not nombre:
+            return None
+        
+        marca = json_ld.get('brand') or ""
+        if isinstance(marca, dict):
+            marca = marca.get('name') or ""
+        
+        match = _RE_ID_EN_NOMBRE.match(nombre)
+        if match:
+            producto_id = match.group(1)
+            marca = marca or match.group(2).strip()
+        else:
+            producto_id = str(
+                variante.get('product_id') or tarjeta.get('data-product-id') or json_ld.get('sku') or ""
+            ).strip() or "0"
+        marca = marca or "Henko Lencería"
+        
+        datos = self._datos_estructurados(variantes, json_ld)
+        
+        categoria, _ = clasificar_texto(f"{nombre} {json_ld.get('category', '')}".lower())
+        
+        return Producto(
+            id=producto_id,
+            nombre=nombre,
+            marca=marca,
+            link=self._url_absoluta(enlace.get('href', '')),
+            categoria=categoria,
+            **datos
+        )
+    
+    def _variantes_desde_elemento(self, elemento) -> List[Dict]:
+        """Lee el JSON de variantes del atributo data-variants del elemento o de un descendiente"""
+        if elemento is None:
+            return []
+        if not elemento.has_attr('data-variants'):
+            elemento = elemento.find(attrs={'data-variants': True})
+            if elemento is None:
+                return []
+        
+        try:
+            variantes = _json_loads(str(elemento['data-variants']))
+        except ValueError:
+            return []
+        if isinstance(variantes, dict):
+            variantes = list(variantes.values())
+        return variantes if isinstance(variantes, list) else []
+    
+    def _datos_estructurados(self, variantes: List[Dict], json_ld: Dict) -> Dict:
+        """Precios, stock real, imagen, colores y talles a partir de variantes y JSON-LD"""
+        variante = variantes[0] if variantes else {}
+        ofertas = json_ld.get('offers') or {}
+        if isinstance(ofertas, list):
+            ofertas = ofertas[0] if ofertas else {}
+        
+        # Precios
+        precio_oferta = variante.get('price_short') or self._formatear_precio(ofertas.get('price'))
+        precio_original = variante.get('compare_at_price_short') or precio_oferta
+        precio_oferta = precio_oferta or "Consultar"
+        precio_original = precio_original or precio_oferta
+        
+        # Stock real de las variantes (None = stock infinito en Tienda Nube)
+        stock = "Disponible"
+        if variantes:
+            disponibles = [v for v in variantes if v.get('available', True) and v.get('stock') != 0]
+            if not disponibles:
+                stock = "Sin stock"
+            elif all(isinstance(v.get('stock'), int) for v in disponibles):
+                unidades = sum(v['stock'] for v in disponibles)
+                if unidades <= 5:
+                    stock = f"¡Quedan {unidades} en stock!"
+        elif 'OutOfStock' in str(ofertas.get('availability', '')):
+            stock = "Sin stock"
+        
+        # Imagen
+        imagen = variante.get('image_url') or json_ld.get('image') or ""
+        if isinstance(imagen, list):
+            imagen = imagen[0] if imagen else ""
+        imagen_url = self._url_absoluta(str(imagen)) if imagen else ""
+        
+        # Colores y talles a partir de las opciones de las variantes
+        colores, talles = [], []
+        for v in variantes:
+            for opcion in ('option0', 'option1', 'option2'):
+                valor = str(v.get(opcion) or '').strip()
+                if not valor:
+                    continue
+                destino = talles if _RE_TALLE.match(valor) else colores
+                if valor not in destino:
+                    destino.append(valor)
+        
+        return {
+            'precio_original': precio_original,
+            'precio_oferta': precio_oferta,
+            'stock': stock,
+            'imagen_url': imagen_url,
+            'colores': colores,
+            'talles': talles
+        }
+    
+    def _elegir_imagen(self, img) -> str:
+        """Elige la variante más chica de srcset/data-srcset que cumpla el ancho mínimo
+        
+        Sin srcset usa data-src/data-original/src, ignorando los placeholders de lazy-load.
+        """
+        candidatos = []
+        for atributo in ('data-srcset', 'srcset'):
+            for parte in str(img.get(atributo, '')).split(','):
+                trozos = parte.strip().split()
+                if not trozos or trozos[0].startswith('data:'):
+                    continue
+                descriptor = trozos[1] if len(trozos) > 1 else ''
+                ancho = int(descriptor[:-1]) if descriptor.endswith('w') and descriptor[:-1].isdigit() else 0
+                candidatos.append((ancho, trozos[0]))
+        
+        if candidatos:
+            adecuados = [c for c in candidatos if c[0] >= self.imagen_ancho_minimo]
+            _, url = min(adecuados) if adecuados else max(candidatos)
+            return self._url_absoluta(url)
+        
+        for atributo in ('data-src', 'data-original', 'src'):
+            src = str(img.get(atributo, '') or '')
+            if src and not src.startswith('data:'):  # Ignorar placeholders
+                return self._url_absoluta(src)
+        return ""
+    
+    def _url_absoluta(self, url: str) -> str:
+        """Completa URLs relativas o sin esquema con el dominio de la tienda"""
+        if url.startswith('//'):
+            return f"https:{url}"
+        if url.startswith('/'):
+            return f"{self.base_url}{url}"
+        if url.startswith('http'):
+            return url
+        return f"{self.base_url}/productos/{url}"
+    
+    def _formatear_precio(self, precio) -> str:
+        """Formatea un precio numérico del JSON-LD como en la tienda ($12.345)"""
+        try:
+            return "$" + f"{float(precio):,.0f}".replace(',', '.')
+        except (TypeError, ValueError):
+            return ""
+    
+    def _agrupar_enlaces_por_producto(self, enlaces_productos) -> list:
+        """Usa como tarjeta el contenedor común de los enlaces que apuntan al mismo producto"""
+        contenedores = {}
+        for enlace in enlaces_productos:
+            href = self._normalizar_href(enlace.get('href', ''))
+            if href and href not in contenedores:
+                contenedores[href] = enlace.find_parent(['div', 'article', 'section', 'li']) or enlace
+        return list(contenedores.values())
+    
+    def _enlace_principal(self, tarjeta):
+        """Elige el enlace con más texto de la tarjeta (el título, no la imagen ni el botón)"""
+        if tarjeta.name == 'a':
+            candidatos = [tarjeta]
+        else:
+            candidatos = tarjeta.find_all('a', href=_RE_HREF_PRODUCTO)
+        
+        mejor, mejor_texto = None, ""
+        for enlace in candidatos:
+            texto = enlace.get_text(strip=True)
+            if len(texto) > len(mejor_texto):
+                mejor, mejor_texto = enlace, texto
+        
+        if mejor is None or self._es_enlace_descartable(mejor.get('href', ''), mejor_texto):
+            return None
+        return mejor
+    
     def _es_producto_valido(self, producto: Producto) -> bool:
         """Verifica si un producto es válido para enviar"""
         if not producto:
@@ -168,26 +1021,24 @@ class HenkoScraper:
         
         return True
     
-    def _extraer_producto_desde_enlace(self, enlace, soup_pagina) -> Optional[Producto]:
-        """Extrae información del producto desde un enlace - CUALQUIER marca"""
+    def _extraer_producto_desde_enlace(self, enlace, soup_pagina, contenedor=None) -> Optional[Producto]:
+        """Extrae información del producto desde un enlace - CUALQUIER marca
+        
+        Si no se indica `contenedor`, se usa el primer bloque padre del enlace.
+        """
         try:
             href = enlace.get('href', '')
             if not href:
                 return None
             
             # Construir link completo
-            if href.startswith('/'):
-                link_completo = f"{self.base_url}{href}"
-            elif href.startswith('http'):
-                link_completo = href
-            else:
-                link_completo = f"{self.base_url}/productos/{href}"
+            link_completo = self._url_absoluta(href)
             
             texto_enlace = enlace.get_text(strip=True)
             
             # Limpiar texto del enlace (remover caracteres extra que pueden venir del scraping)
-            texto_limpio = re.sub(r'[^\w\s|$.,\-áéíóúñ]+', ' ', texto_enlace)
-            texto_limpio = re.sub(r'\s+', ' ', texto_limpio).strip()
+            texto_limpio = _RE_CARACTERES_EXTRA.sub(' ', texto_enlace)
+            texto_limpio = _RE_ESPACIOS.sub(' ', texto_limpio).strip()
             
             # Extraer ID y marca de diferentes formatos posibles
             producto_id = "0"
@@ -207,14 +1058,8 @@ class HenkoScraper:
                     marca = texto_limpio.split('$')[0].strip()
                     texto_enlace = marca
             else:
-                # Intentar extraer ID del href o usar el nombre como está
-                match = re.search(r'(\d+)', href)
-                if match:
-                    producto_id = match.group(1)
-                else:
-                    # Generar ID único basado en el texto
-                    producto_id = str(hash(texto_limpio.lower()) % 10000)
-                
+                # Sin ID en el texto: los dígitos del slug (talles, modelos) o un hash del nombre no
+                # identifican al producto, así que queda "0" y la clave pasa a ser el link
                 marca = texto_limpio.split('$')[0].strip()
                 texto_enlace = marca if marca else "Producto sin nombre"
             
@@ -231,7 +1076,11 @@ class HenkoScraper:
                     marca = "Henko Lencería"
             
             # Buscar información adicional en el contexto del enlace
-            contenedor = enlace.find_parent(['div', 'article', 'section', 'li'])
+            if contenedor is None:
+                contenedor = enlace.find_parent(['div', 'article', 'section', 'li'])
+            
+            # Materializar los textos del contenedor una sola vez
+            textos_contenedor = list(contenedor.strings) if contenedor else []
             
             # Extraer precios - buscar en varios niveles
             precio_original = "Consultar"
@@ -240,7 +1089,7 @@ class HenkoScraper:
             # Buscar precios en el contenedor
             if contenedor:
                 # Buscar elementos que contengan signo de peso
-                elementos_precio = contenedor.find_all(string=re.compile(r'\$[\d,.]+'))
+                elementos_precio = [t for t in textos_contenedor if _RE_PRECIO.search(t)]
                 if elementos_precio:
                     precios_encontrados = [p.strip() for p in elementos_precio if '$' in p and len(p.strip()) > 1]
                     if len(precios_encontrados) >= 2:
@@ -254,40 +1103,22 @@ class HenkoScraper:
             imagen_url = ""
             img = enlace.find('img') or (contenedor.find('img') if contenedor else None)
             if img:
-                src = img.get('src', '') or img.get('data-src', '') or img.get('data-original', '')
-                if src and 'data:image/gif' not in src:  # Ignorar placeholders
-                    if src.startswith('http'):
-                        imagen_url = src
-                    elif src.startswith('/'):
-                        imagen_url = f"{self.base_url}{src}"
+                imagen_url = self._elegir_imagen(img)
+            
+            # Determinar categoría y señales de stock en una sola pasada sobre el texto
+            texto_completo = (texto_enlace + " " + "".join(textos_contenedor)).lower()
+            categoria, sin_stock = clasificar_texto(texto_completo)
             
             # Extraer información de stock
             stock = "Disponible"
             if contenedor:
                 # Buscar textos que indiquen stock
-                stock_texts = contenedor.find_all(string=re.compile(r'(stock|quedan|último|agotado)', re.I))
-                if stock_texts:
-                    stock = stock_texts[0].strip()
-                elif "sin stock" in contenedor.get_text().lower():
+                stock_text = next((t for t in textos_contenedor if _RE_STOCK.search(t)), None)
+                if stock_text:
+                    stock = stock_text.strip()
+                elif sin_stock:
                     stock = "Sin stock"
             
-            # Determinar categoría basada en el texto o contexto
-            categoria = "Lencería"
-            texto_completo = (texto_enlace + " " + (contenedor.get_text() if contenedor else "")).lower()
-            
-            if any(cat in texto_completo for cat in ['soutien', 'corpiño', 'bra']):
-                categoria = "Soutien"
-            elif any(cat in texto_completo for cat in ['body', 'bodysuit']):
-                categoria = "Body"
-            elif any(cat in texto_completo for cat in ['conjunto', 'set']):
-                categoria = "Conjunto"
-            elif any(cat in texto_completo for cat in ['bombacha', 'calzón']):
-                categoria = "Bombacha"
-            elif any(cat in texto_completo for cat in ['media', 'calcetín']):
-                categoria = "Medias"
-            elif any(cat in texto_completo for cat in ['camisón', 'pijama']):
-                categoria = "Pijamas"
-            
             return Producto(
                 id=producto_id,
                 nombre=texto_enlace,
@@ -303,78 +1134,992 @@ class HenkoScraper:
             )
             
         except Exception as e:
-            logger.warning(f"Error extrayendo producto desde enlace: {e}")
-            return None
+            logger.warning(f"Error extrayendo producto desde enlace: {e}")
+            return None
+    
+    def _extraer_producto_desde_tarjeta(self, tarjeta, enlace=None) -> Optional[Producto]:
+        """Extrae información del producto desde una tarjeta"""
+        try:
+            # Buscar enlace principal
+            if enlace is None:
+                enlace = self._enlace_principal(tarjeta)
+            if not enlace:
+                return None
+            
+            return self._extraer_producto_desde_enlace(enlace, tarjeta, contenedor=tarjeta)
+            
+        except Exception as e:
+            logger.warning(f"Error extrayendo producto desde tarjeta: {e}")
+            return None
+    
+    def iterar_paginas(self, paginas: List[int], soups: Optional[Dict[int, "BeautifulSoup"]] = None) -> Iterator[Tuple[int, List[Producto]]]:
+        """Genera (página, productos) a medida que se scrapea cada página
+        
+        En modo concurrente las páginas llegan en orden de finalización.
+        `soups` permite pasar páginas ya descargadas para no pedirlas de nuevo.
+        """
+        soups = soups or {}
+        
+        def scrapear(pagina: int) -> List[Producto]:
+            return self.extraer_productos_pagina(pagina, soups.get(pagina))
+        
+        if not self.scraping_concurrente or len(paginas) < 2:
+            for pagina in paginas:
+                yield pagina, scrapear(pagina)
+            return
+        
+        workers = min(self.max_workers, len(paginas))
+        logger.info(f"Scrapeando {len(paginas)} páginas en paralelo ({workers} workers)")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futuros = {executor.submit(scrapear, pagina): pagina for pagina in paginas}
+            for futuro in as_completed(futuros):
+                yield futuros[futuro], futuro.result()
+    
+    def scrapear_paginas(self, paginas: List[int], soups: Optional[Dict[int, "BeautifulSoup"]] = None) -> List[List[Producto]]:
+        """Scrapea varias páginas, en paralelo si está activado el modo concurrente"""
+        resultados = dict(self.iterar_paginas(paginas, soups))
+        return [resultados[pagina] for pagina in paginas]
+    
+    def actualizar_catalogo(self, catalogo: 'CatalogoProductos') -> Dict:
+        """Recorre todas las páginas y guarda los productos en el catálogo a medida que llegan"""
+        inicio = time.time()
+        total_paginas, soup_pagina_1 = self.descubrir_paginacion()
+        soups = {1: soup_pagina_1} if soup_pagina_1 is not None else {}
+        
+        paginas_ok = 0
+        productos_guardados = 0
+        for pagina, productos_pagina in self.iterar_paginas(list(range(1, total_paginas + 1)), soups):
+            if productos_pagina:
+                productos_guardados += catalogo.upsert(productos_pagina)
+                paginas_ok += 1
+        
+        duracion = time.time() - inicio
+        if paginas_ok:
+            catalogo.marcar_actualizacion(inicio)
+        
+        resumen = {
+            'paginas': total_paginas,
+            'paginas_con_productos': paginas_ok,
+            'productos_guardados': productos_guardados,
+            'productos_en_catalogo': catalogo.contar(),
+            'duracion_segundos': round(duracion, 2)
+        }
+        logger.info(f"Catálogo actualizado: {resumen}")
+        return resumen
+    
+    def _iterar_soups(self, paginas: List[int], soups: Dict[int, "BeautifulSoup"]) -> Iterator[Tuple[int, Optional["BeautifulSoup"]]]:
+        """Genera (página, soup) en orden; en modo concurrente descarga hasta max_workers páginas por adelantado"""
+        def obtener(pagina: int) -> Optional["BeautifulSoup"]:
+            if pagina in soups:
+                return soups[pagina]
+            try:
+                return self._obtener_soup_pagina(pagina)
+            except Exception as e:
+                logger.error(f"Error scrapeando página {pagina}: {e}")
+                return None
+        
+        if not self.scraping_concurrente or len(paginas) < 2:
+            for pagina in paginas:
+                yield pagina, obtener(pagina)
+            return
+        
+        workers = min(self.max_workers, len(paginas))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            restantes = iter(paginas)
+            pendientes = deque((p, executor.submit(obtener, p)) for p in islice(restantes, workers))
+            try:
+                while pendientes:
+                    pagina, futuro = pendientes.popleft()
+                    siguiente = next(restantes, None)
+                    if siguiente is not None:
+                        pendientes.append((siguiente, executor.submit(obtener, siguiente)))
+                    yield pagina, futuro.result()
+            finally:
+                # Si el consumidor cortó la iteración, no descargar el resto
+                for _, futuro in pendientes:
+                    futuro.cancel()
+    
+    def _iterar_productos_con_pagina(self, paginas: List[int], soups: Optional[Dict[int, "BeautifulSoup"]] = None) -> Iterator[Tuple[int, Producto]]:
+        """Genera (página, producto) sin repetir productos entre páginas"""
+        estadisticas = {'paginas': 0, 'tarjetas': 0, 'estructurados': 0, 'productos': 0}
+        self.estadisticas_streaming = estadisticas
+        vistos = set()
+        
+        for pagina, soup in self._iterar_soups(paginas, soups or {}):
+            estadisticas['paginas'] += 1
+            if soup is None:
+                continue
+            
+            enlaces_productos = soup.find_all('a', href=_RE_HREF_PRODUCTO)
+            if self.extraccion_por_tarjeta:
+                productos_pagina = self._iterar_tarjetas(soup, enlaces_productos, estadisticas)
+            else:
+                productos_pagina, extracciones, _ = self._extraer_por_enlaces(soup, enlaces_productos)
+                estadisticas['tarjetas'] += extracciones
+            
+            for producto in productos_pagina:
+                clave = clave_producto(producto)
+                if clave in vistos:
+                    continue
+                vistos.add(clave)
+                estadisticas['productos'] += 1
+                yield pagina, producto
+    
+    def iter_productos(self, paginas: Optional[List[int]] = None) -> Iterator[Producto]:
+        """Genera productos a medida que se parsean las tarjetas, página por página
+        
+        Sin `paginas` recorre todo el catálogo según la paginación detectada. Si el
+        consumidor deja de iterar no se descargan ni parsean más páginas; el resumen
+        de lo procesado queda en `estadisticas_streaming`.
+        """
+        soups = {}
+        if paginas is None:
+            total_paginas, soup_pagina_1 = self.descubrir_paginacion()
+            if soup_pagina_1 is not None:
+                soups[1] = soup_pagina_1
+            paginas = list(range(1, total_paginas + 1))
+        
+        for _, producto in self._iterar_productos_con_pagina(paginas, soups):
+            yield producto
+    
+    def obtener_productos_aleatorios(self, cantidad: int = 5, excluir: Optional[Set[str]] = None) -> List[Producto]:
+        """Obtiene una muestra aleatoria de productos de diferentes páginas
+        
+        Usa muestreo de reservorio sobre el flujo de productos y deja de descargar
+        en cuanto hay `muestreo_min_candidatos` candidatos de `muestreo_min_paginas` páginas.
+        Los productos cuya clave (ver `clave_producto`) está en `excluir` se descartan antes del muestreo.
+        """
+        total_paginas, soup_pagina_1 = self.descubrir_paginacion()
+        
+        # Seleccionar páginas aleatorias entre todas las del listado para obtener variedad
+        paginas_a_scrapear = random.sample(range(1, total_paginas + 1), min(5, total_paginas))
+        # La página 1 ya descargada por el sondeo solo se reutiliza si salió sorteada
+        soups = {1: soup_pagina_1} if soup_pagina_1 is not None and 1 in paginas_a_scrapear else {}
+        
+        muestra: List[Producto] = []
+        candidatos = 0
+        paginas_con_candidatos = set()
+        flujo = self._iterar_productos_con_pagina(paginas_a_scrapear, soups)
+        try:
+            for pagina, producto in flujo:
+                if excluir and clave_producto(producto) in excluir:
+                    continue
+                candidatos += 1
+                paginas_con_candidatos.add(pagina)
+                
+                if len(muestra) < cantidad:
+                    muestra.append(producto)
+                else:
+                    indice = random.randrange(candidatos)
+                    if indice < cantidad:
+                        muestra[indice] = producto
+                
+                if (candidatos >= self.muestreo_min_candidatos and
+                        len(paginas_con_candidatos) >= self.muestreo_min_paginas):
+                    break
+        finally:
+            flujo.close()
+        
+        estadisticas = self.estadisticas_streaming
+        logger.info(f"Muestreo: {estadisticas['paginas']}/{len(paginas_a_scrapear)} páginas, "
+                    f"{estadisticas['tarjetas']} tarjetas, {candidatos} candidatos")
+        
+        random.shuffle(muestra)
+        return muestra
+
+class EnriquecedorDetalle:
+    """Completa variantes, talles, colores y stock real desde la página de detalle de los candidatos"""
+    
+    def __init__(self, scraper: HenkoScraper, cache_file: str = "cache_detalles.json",
+                 ttl_horas: float = 24, max_workers: int = 4):
+        self.scraper = scraper
+        self.cache_file = cache_file
+        self.ttl_segundos = ttl_horas * 3600
+        self.max_workers = max(max_workers, 1)
+        self.ultima_ejecucion: Dict = {}
+        self._cache: Dict[str, Dict] = {}
+        
+        try:
+            if os.path.exists(cache_file):
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    self._cache = json.load(f)
+        except Exception as e:
+            logger.warning(f"No se pudo cargar la caché de detalles: {e}")
+    
+    def enriquecer(self, productos: List[Producto]) -> List[Producto]:
+        """Devuelve los productos con los datos de su página de detalle (desde caché si está fresca)"""
+        inicio = time.perf_counter()
+        ahora = time.time()
+        datos_por_clave: Dict[str, Dict] = {}
+        pendientes = {}
+        
+        for producto in productos:
+            clave = CatalogoProductos.clave_producto(producto)
+            entrada = self._cache.get(clave)
+            if entrada and ahora - entrada.get('fecha', 0) < self.ttl_segundos:
+                datos_por_clave[clave] = entrada['datos']
+            else:
+                pendientes.setdefault(clave, producto)
+        
+        desde_cache = len(datos_por_clave)
+        if pendientes:
+            workers = min(self.max_workers, len(pendientes))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for clave, datos in zip(pendientes, executor.map(self._obtener_detalle, pendientes.values())):
+                    if datos:
+                        datos_por_clave[clave] = datos
+                        self._cache[clave] = {'fecha': ahora, 'datos': datos}
+            self._guardar_cache()
+        
+        enriquecidos = []
+        for producto in productos:
+            datos = datos_por_clave.get(CatalogoProductos.clave_producto(producto))
+            enriquecidos.append(replace(producto, **datos) if datos else producto)
+        
+        self.ultima_ejecucion = {
+            'productos': len(productos),
+            'desde_cache': desde_cache,
+            'descargados': len(pendientes),
+            'latencia_segundos': round(time.perf_counter() - inicio, 3)
+        }
+        logger.info(f"Detalle de productos: {self.ultima_ejecucion}")
+        return enriquecidos
+    
+    def _obtener_detalle(self, producto: Producto) -> Optional[Dict]:
+        """Descarga y parsea la página de un producto; solo devuelve los campos encontrados"""
+        from bs4 import BeautifulSoup
+        
+        try:
+            soup = BeautifulSoup(self.scraper._descargar(producto.link), self.scraper.parser_html)
+            
+            # Las variantes del formulario de compra, no las de productos relacionados
+            formulario = soup.find(class_=_RE_CLASE_FORMULARIO_PRODUCTO)
+            variantes = self.scraper._variantes_desde_elemento(formulario) or self.scraper._variantes_desde_elemento(soup)
+            
+            productos_json_ld = self.scraper._productos_json_ld(soup)
+            json_ld = productos_json_ld.get(self.scraper._normalizar_href(producto.link))
+            if json_ld is None and productos_json_ld:
+                json_ld = next(iter(productos_json_ld.values()))
+            
+            if not variantes and not json_ld:
+                return None
+            
+            datos = self.scraper._datos_estructurados(variantes, json_ld or {})
+            return {campo: valor for campo, valor in datos.items() if valor and valor != "Consultar"}
+            
+        except Exception as e:
+            logger.warning(f"Error obteniendo detalle de {producto.link}: {e}")
+            return None
+    
+    def tamano_cache(self) -> int:
+        return len(self._cache)
+    
+    def _guardar_cache(self):
+        try:
+            ahora = time.time()
+            self._cache = {
+                clave: entrada for clave, entrada in self._cache.items()
+                if ahora - entrada.get('fecha', 0) < self.ttl_segundos
+            }
+            tmp = self.cache_file + ".tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._cache, f, ensure_ascii=False)
+            os.replace(tmp, self.cache_file)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar la caché de detalles: {e}")
+
+class CatalogoProductos:
+    """Catálogo local de productos en SQLite, actualizado de forma incremental por el scraper"""
+    
+    CAMPOS = ['id', 'nombre', 'marca', 'precio_original', 'precio_oferta', 'stock',
+              'link', 'imagen_url', 'colores', 'talles', 'categoria']
+    
+    def __init__(self, db_file: str = "catalogo.db"):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._crear_esquema()
+    
+    def _crear_esquema(self):
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS productos (
+                    clave TEXT PRIMARY KEY,
+                    id TEXT NOT NULL,
+                    nombre TEXT NOT NULL,
+                    marca TEXT,
+                    precio_original TEXT,
+                    precio_oferta TEXT,
+                    stock TEXT,
+                    link TEXT NOT NULL,
+                    imagen_url TEXT,
+                    colores TEXT,
+                    talles TEXT,
+                    categoria TEXT,
+                    primer_visto REAL NOT NULL,
+                    ultimo_visto REAL NOT NULL,
+                    precio_anterior TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_productos_id ON productos(id);
+                CREATE INDEX IF NOT EXISTS idx_productos_categoria ON productos(categoria);
+                CREATE INDEX IF NOT EXISTS idx_productos_marca ON productos(marca);
+                CREATE INDEX IF NOT EXISTS idx_productos_ultimo_visto ON productos(ultimo_visto);
+                CREATE TABLE IF NOT EXISTS meta (
+                    clave TEXT PRIMARY KEY,
+                    valor TEXT
+                );
+            """)
+            # Catálogos anteriores guardaban con clave "0" todos los productos sin ID: esa fila mezcla
+            # productos distintos, se descarta y la próxima actualización los guarda por link
+            self._conn.execute("DELETE FROM productos WHERE clave GLOB '[0-9]*' AND CAST(clave AS INTEGER) = 0")
+    
+    @staticmethod
+    def clave_producto(producto: Producto) -> str:
+        """Misma clave que usa el scraper para deduplicar: ID real o link"""
+        return clave_producto(producto)
+    
+    def upsert(self, productos: List[Producto]) -> int:
+        """Inserta o actualiza productos conservando primer_visto y el precio anterior"""
+        ahora = time.time()
+        filas = [
+            (
+                self.clave_producto(p), p.id, p.nombre, p.marca, p.precio_original, p.precio_oferta,
+                p.stock, p.link, p.imagen_url, json.dumps(p.colores, ensure_ascii=False),
+                json.dumps(p.talles, ensure_ascii=False), p.categoria, ahora, ahora
+            )
+            for p in productos
+        ]
+        
+        with self._lock, self._conn:
+            self._conn.executemany("""
+                INSERT INTO productos (clave, id, nombre, marca, precio_original, precio_oferta, stock,
+                                       link, imagen_url, colores, talles, categoria, primer_visto, ultimo_visto)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(clave) DO UPDATE SET
+                    id = excluded.id,
+                    nombre = excluded.nombre,
+                    marca = excluded.marca,
+                    precio_original = excluded.precio_original,
+                    precio_anterior = CASE
+                        WHEN productos.precio_oferta != excluded.precio_oferta THEN productos.precio_oferta
+                        ELSE productos.precio_anterior END,
+                    precio_oferta = excluded.precio_oferta,
+                    stock = excluded.stock,
+                    link = excluded.link,
+                    imagen_url = CASE WHEN excluded.imagen_url != '' THEN excluded.imagen_url ELSE productos.imagen_url END,
+                    colores = excluded.colores,
+                    talles = excluded.talles,
+                    categoria = excluded.categoria,
+                    ultimo_visto = excluded.ultimo_visto
+            """, filas)
+        
+        return len(filas)
+    
+    def marcar_actualizacion(self, inicio: float):
+        """Registra una actualización completa que empezó en `inicio`"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO meta (clave, valor) VALUES (?, ?)",
+                [('inicio_ultima_actualizacion', str(inicio)), ('ultima_actualizacion', str(time.time()))]
+            )
+    
+    def _meta_float(self, clave: str) -> Optional[float]:
+        with self._lock:
+            fila = self._conn.execute("SELECT valor FROM meta WHERE clave = ?", (clave,)).fetchone()
+        return float(fila['valor']) if fila else None
+    
+    def ultima_actualizacion(self) -> Optional[float]:
+        return self._meta_float('ultima_actualizacion')
+    
+    def esta_desactualizado(self, max_horas: float) -> bool:
+        """True si nunca se actualizó o la última actualización completa es más vieja que max_horas"""
+        ultima = self.ultima_actualizacion()
+        return ultima is None or time.time() - ultima > max_horas * 3600
+    
+    def contar(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM productos").fetchone()[0]
+    
+    def muestra_aleatoria(self, cantidad: int, categoria: Optional[str] = None, marca: Optional[str] = None,
+                          excluir: Optional[Set[str]] = None) -> List[Producto]:
+        """Productos al azar entre los vistos en la última actualización completa"""
+        condiciones = ["ultimo_visto >= ?"]
+        parametros: list = [self._meta_float('inicio_ultima_actualizacion') or 0]
+        if excluir:
+            condiciones.append(f"clave NOT IN ({', '.join('?' * len(excluir))})")
+            parametros.extend(excluir)
+        if categoria:
+            condiciones.append("categoria = ?")
+            parametros.append(categoria)
+        if marca:
+            condiciones.append("marca = ?")
+            parametros.append(marca)
+        parametros.append(cantidad)
+        
+        with self._lock:
+            filas = self._conn.execute(
+                f"SELECT * FROM productos WHERE {' AND '.join(condiciones)} ORDER BY RANDOM() LIMIT ?",
+                parametros
+            ).fetchall()
+        return [self._fila_a_producto(fila) for fila in filas]
+    
+    def obtener(self, producto_id: str) -> Optional[Producto]:
+        with self._lock:
+            fila = self._conn.execute("SELECT * FROM productos WHERE id = ? LIMIT 1", (producto_id,)).fetchone()
+        return self._fila_a_producto(fila) if fila else None
+    
+    def _fila_a_producto(self, fila) -> Producto:
+        datos = {campo: fila[campo] or "" for campo in self.CAMPOS}
+        datos['colores'] = json.loads(fila['colores'] or '[]')
+        datos['talles'] = json.loads(fila['talles'] or '[]')
+        return Producto(**datos)
+    
+    def cerrar(self):
+        with self._lock:
+            self._conn.close()
+
+def detectar_imagen(datos: bytes) -> Optional[Tuple[str, int, int]]:
+    """Devuelve (tipo, ancho, alto) leyendo solo la cabecera: JPEG, PNG, GIF o WebP"""
+    if datos.startswith(b'\x89PNG\r\n\x1a\n') and len(datos) >= 24:
+        ancho, alto = struct.unpack('>II', datos[16:24])
+        return 'png', ancho, alto
+    
+    if datos[:6] in (b'GIF87a', b'GIF89a') and len(datos) >= 10:
+        ancho, alto = struct.unpack('<HH', datos[6:10])
+        return 'gif', ancho, alto
+    
+    if datos[:4] == b'RIFF' and datos[8:12] == b'WEBP' and len(datos) >= 30:
+        bloque = datos[12:16]
+        if bloque == b'VP8 ':
+            ancho, alto = struct.unpack('<HH', datos[26:30])
+            return 'webp', ancho & 0x3FFF, alto & 0x3FFF
+        if bloque == b'VP8L':
+            bits = int.from_bytes(datos[21:25], 'little')
+            return 'webp', (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if bloque == b'VP8X':
+            return 'webp', int.from_bytes(datos[24:27], 'little') + 1, int.from_bytes(datos[27:30], 'little') + 1
+        return None
+    
+    if datos[:3] == b'\xff\xd8\xff':
+        # Recorrer los segmentos hasta el marcador SOF, que tiene las dimensiones
+        i = 2
+        while i + 9 < len(datos):
+            if datos[i] != 0xFF:
+                return None
+            marcador = datos[i + 1]
+            if marcador == 0xFF:
+                i += 1
+                continue
+            if marcador in (0xD8, 0x01) or 0xD0 <= marcador <= 0xD7:
+                i += 2
+                continue
+            longitud = struct.unpack('>H', datos[i + 2:i + 4])[0]
+            if 0xC0 <= marcador <= 0xCF and marcador not in (0xC4, 0xC8, 0xCC):
+                alto, ancho = struct.unpack('>HH', datos[i + 5:i + 9])
+                return 'jpeg', ancho, alto
+            i += 2 + longitud
+    
+    return None
+
+class ProcesadorImagenes:
+    """Descarga, valida, reduce y cachea en disco las fotos de producto antes de enviarlas"""
+    
+    # Límite de Telegram para sendPhoto subido como archivo
+    MAX_BYTES_TELEGRAM = 10 * 1024 * 1024
+    
+    def __init__(self, directorio: str = "cache_imagenes", max_bytes: int = 100 * 1024 * 1024,
+                 lado_minimo: int = 200, lado_maximo: int = 1280, bytes_objetivo: int = 300 * 1024,
+                 timeout: float = 30):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self.lado_minimo = lado_minimo
+        self.lado_maximo = lado_maximo
+        self.bytes_objetivo = bytes_objetivo
+        self.timeout = timeout
+        self.indice_file = os.path.join(directorio, "indice.json")
+        self.ultima_metrica: Dict = {}
+        import requests
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': 'Mozilla/5.0 (compatible; HenkoBot/1.0)'})
+        self._lock = threading.Lock()
+        
+        # urls: URL original -> hash del archivo; archivos: hash -> metadatos
+        self._urls: Dict[str, str] = {}
+        self._archivos: Dict[str, Dict] = {}
+        try:
+            os.makedirs(directorio, exist_ok=True)
+            if os.path.exists(self.indice_file):
+                with open(self.indice_file, 'r', encoding='utf-8') as f:
+                    indice = json.load(f)
+                self._urls = indice.get('urls', {})
+                self._archivos = indice.get('archivos', {})
+        except Exception as e:
+            logger.warning(f"No se pudo cargar el índice de imágenes: {e}")
+    
+    def ruta(self, hash_imagen: str) -> str:
+        return os.path.join(self.directorio, f"{hash_imagen}.{self._archivos.get(hash_imagen, {}).get('tipo', 'jpg')}")
+    
+    def preparar(self, url: str) -> Optional[str]:
+        """Devuelve la ruta local de una versión válida y liviana de la imagen, o None si no sirve"""
+        inicio = time.perf_counter()
+        metrica = {'url': url, 'desde_cache': False}
+        
+        with self._lock:
+            hash_imagen = self._urls.get(url)
+            if hash_imagen and hash_imagen in self._archivos and os.path.exists(self.ruta(hash_imagen)):
+                self._archivos[hash_imagen]['ultimo_acceso'] = time.time()
+                metrica.update(self._archivos[hash_imagen], desde_cache=True,
+                               latencia_segundos=round(time.perf_counter() - inicio, 4))
+                self.ultima_metrica = metrica
+                return self.ruta(hash_imagen)
+        
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            datos = response.content
+        except Exception as e:
+            logger.warning(f"No se pudo descargar la imagen {url}: {e}")
+            return None
+        metrica['bytes_descargados'] = len(datos)
+        metrica['latencia_descarga_segundos'] = round(time.perf_counter() - inicio, 4)
+        
+        info = detectar_imagen(datos)
+        if not info:
+            logger.warning(f"El contenido de {url} no es una imagen válida")
+            return None
+        
+        tipo, ancho, alto = info
+        if min(ancho, alto) < self.lado_minimo:
+            logger.warning(f"Imagen demasiado chica ({ancho}x{alto}), probablemente un placeholder: {url}")
+            return None
+        
+        datos, tipo, ancho, alto = self._reducir(datos, tipo, ancho, alto)
+        if len(datos) > self.MAX_BYTES_TELEGRAM:
+            logger.warning(f"Imagen demasiado pesada para Telegram ({len(datos)} bytes): {url}")
+            return None
+        
+        hash_imagen = hashlib.sha256(datos).hexdigest()
+        extension = 'jpg' if tipo == 'jpeg' else tipo
+        try:
+            with self._lock:
+                self._archivos[hash_imagen] = {
+                    'tipo': extension, 'tamano': len(datos), 'ancho': ancho, 'alto': alto,
+                    'ultimo_acceso': time.time()
+                }
+                ruta = self.ruta(hash_imagen)
+                if not os.path.exists(ruta):
+                    with open(ruta + ".tmp", 'wb') as f:
+                        f.write(datos)
+                    os.replace(ruta + ".tmp", ruta)
+                self._urls[url] = hash_imagen
+                self._desalojar()
+                self._guardar_indice()
+        except Exception as e:
+            logger.warning(f"No se pudo guardar la imagen en caché: {e}")
+            return None
+        
+        metrica.update(bytes_finales=len(datos), ancho=ancho, alto=alto,
+                       latencia_segundos=round(time.perf_counter() - inicio, 4))
+        self.ultima_metrica = metrica
+        logger.info(f"Imagen preparada: {metrica['bytes_descargados'] // 1024} KB -> {len(datos) // 1024} KB "
+                    f"({ancho}x{alto}) en {metrica['latencia_segundos']} s")
+        return ruta
+    
+    def _reducir(self, datos: bytes, tipo: str, ancho: int, alto: int) -> Tuple[bytes, str, int, int]:
+        """Reescala y recomprime a JPEG si la imagen supera el tamaño o lado objetivo"""
+        if len(datos) <= self.bytes_objetivo and max(ancho, alto) <= self.lado_maximo and tipo in ('jpeg', 'png'):
+            return datos, tipo, ancho, alto
+        # Pillow es opcional: sin él las imágenes válidas se envían sin recomprimir
+        Image = _importar_opcional('PIL.Image')
+        if Image is None:
+            return datos, tipo, ancho, alto
+        
+        try:
+            with Image.open(io.BytesIO(datos)) as original:
+                imagen = original.convert('RGB')
+            imagen.thumbnail((self.lado_maximo, self.lado_maximo))
+            
+            for calidad in (85, 75, 65, 55):
+                buffer = io.BytesIO()
+                imagen.save(buffer, 'JPEG', quality=calidad, optimize=True, progressive=True)
+                if buffer.tell() <= self.bytes_objetivo:
+                    break
+            return buffer.getvalue(), 'jpeg', imagen.width, imagen.height
+        except Exception as e:
+            logger.warning(f"No se pudo recomprimir la imagen: {e}")
+            return datos, tipo, ancho, alto
+    
+    def tamano_total(self) -> int:
+        with self._lock:
+            return sum(a.get('tamano', 0) for a in self._archivos.values())
+    
+    def _desalojar(self):
+        """Elimina las imágenes usadas hace más tiempo hasta respetar max_bytes"""
+        total = sum(a.get('tamano', 0) for a in self._archivos.values())
+        if total <= self.max_bytes:
+            return
+        
+        for hash_imagen, archivo in sorted(self._archivos.items(), key=lambda item: item[1].get('ultimo_acceso', 0)):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self.ruta(hash_imagen))
+            except OSError:
+                pass
+            total -= archivo.get('tamano', 0)
+            del self._archivos[hash_imagen]
+        
+        self._urls = {url: h for url, h in self._urls.items() if h in self._archivos}
+    
+    def _guardar_indice(self):
+        tmp = self.indice_file + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'urls': self._urls, 'archivos': self._archivos}, f)
+        os.replace(tmp, self.indice_file)
+
+_RE_ETIQUETA_HTML = re.compile(r'<[^>]+>')
+_RE_ESCAPE_MARKDOWN_V2 = re.compile(r'([_*\[\]()~`>#+\-=|{}.!\\])')
+
+class RenderizadorTelegram:
+    """Escapa texto para el parse_mode elegido y lo divide según los límites de Telegram
+    
+    Telegram mide los límites sobre el texto visible (sin marcas de formato) en unidades UTF-16.
+    """
+    
+    MAX_CAPTION = 1024
+    MAX_MENSAJE = 4096
+    
+    def __init__(self, parse_mode: str = "HTML"):
+        if parse_mode not in ("HTML", "MarkdownV2"):
+            logger.warning(f"parse_mode no soportado: {parse_mode}, se usa HTML")
+            parse_mode = "HTML"
+        self.parse_mode = parse_mode
+    
+    def escapar(self, texto: str) -> str:
+        if self.parse_mode == "HTML":
+            return texto.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+        return _RE_ESCAPE_MARKDOWN_V2.sub(r'\\\1', texto)
+    
+    def negrita(self, texto: str) -> str:
+        texto = self.escapar(texto)
+        return f"<b>{texto}</b>" if self.parse_mode == "HTML" else f"*{texto}*"
+    
+    def cursiva(self, texto: str) -> str:
+        texto = self.escapar(texto)
+        return f"<i>{texto}</i>" if self.parse_mode == "HTML" else f"_{texto}_"
+    
+    def texto_plano(self, renderizado: str) -> str:
+        """Texto visible de un mensaje ya renderizado"""
+        if self.parse_mode == "HTML":
+            texto = _RE_ETIQUETA_HTML.sub('', renderizado)
+            return texto.replace('&lt;', '<').replace('&gt;', '>').replace('&amp;', '&')
+        
+        visible = []
+        escapado = False
+        for caracter in renderizado:
+            if escapado:
+                visible.append(caracter)
+                escapado = False
+            elif caracter == '\\':
+                escapado = True
+            elif caracter not in '*_~|':
+                visible.append(caracter)
+        return ''.join(visible)
+    
+    @staticmethod
+    def _unidades(texto: str) -> int:
+        return len(texto.encode('utf-16-le')) // 2
+    
+    def longitud(self, renderizado: str) -> int:
+        return self._unidades(self.texto_plano(renderizado))
+    
+    def dividir(self, renderizado: str, limite: int = MAX_MENSAJE) -> List[str]:
+        """Parte el texto en bloques que respetan `limite`, cortando entre párrafos o líneas
+        
+        Las marcas de formato no cruzan líneas, así que cada línea se puede mover sola de bloque.
+        """
+        if self.longitud(renderizado) <= limite:
+            return [renderizado]
+        
+        partes = []
+        actual = ""
+        for parrafo in renderizado.split("\n\n"):
+            for trozo in self._trozos(parrafo, limite):
+                candidato = f"{actual}\n\n{trozo}" if actual else trozo
+                if actual and self.longitud(candidato) > limite:
+                    partes.append(actual)
+                    actual = trozo
+                else:
+                    actual = candidato
+        if actual:
+            partes.append(actual)
+        return partes
+    
+    def _trozos(self, parrafo: str, limite: int) -> List[str]:
+        """Un párrafo entero si entra; si no, sus líneas (y las líneas demasiado largas, cortadas)"""
+        if self.longitud(parrafo) <= limite:
+            return [parrafo]
+        
+        trozos = []
+        for linea in parrafo.split("\n"):
+            while self.longitud(linea) > limite:
+                corte = self._corte_seguro(linea, limite)
+                trozos.append(linea[:corte])
+                linea = linea[corte:]
+            trozos.append(linea)
+        return trozos
+    
+    def _corte_seguro(self, linea: str, limite: int) -> int:
+        """Posición de corte que no supera `limite` ni parte un escape, una entidad o una etiqueta"""
+        corte, unidades = 0, 0
+        for caracter in linea:
+            unidades += self._unidades(caracter)
+            if unidades > limite:
+                break
+            corte += 1
+        
+        if self.parse_mode == "HTML":
+            for apertura, cierre in (('&', ';'), ('<', '>')):
+                inicio = linea.rfind(apertura, 0, corte)
+                if inicio > 0 and linea.find(cierre, inicio, corte) == -1:
+                    corte = inicio
+        else:
+            while corte > 1 and linea[corte - 1] == '\\' and linea[corte - 2] != '\\':
+                corte -= 1
+        return max(corte, 1)
+    
+    def caption_y_resto(self, renderizado: str) -> Tuple[str, List[str]]:
+        """Caption que entra en una foto y mensajes adicionales con el resto del texto"""
+        if self.longitud(renderizado) <= self.MAX_CAPTION:
+            return renderizado, []
+        
+        partes = self.dividir(renderizado, self.MAX_CAPTION)
+        resto = "\n\n".join(partes[1:])
+        return partes[0], self.dividir(resto, self.MAX_MENSAJE)
+
+class CacheFileIds:
+    """Recuerda el file_id que Telegram asignó a cada foto para reenviarla sin volver a subirla"""
+    
+    def __init__(self, archivo: str = "telegram_file_ids.json"):
+        self.archivo = archivo
+        self._lock = threading.Lock()
+        self._ids: Dict[str, str] = {}
+        self.aciertos = 0
+        self.fallos = 0
+        
+        try:
+            if os.path.exists(archivo):
+                with open(archivo, 'r', encoding='utf-8') as f:
+                    self._ids = json.load(f)
+        except Exception as e:
+            logger.warning(f"No se pudo cargar la caché de file_id: {e}")
     
-    def _extraer_producto_desde_tarjeta(self, tarjeta) -> Optional[Producto]:
-        """Extrae información del producto desde una tarjeta"""
+    @staticmethod
+    def clave_foto(imagen: str) -> str:
+        """Hash del contenido para archivos locales; la URL para fotos remotas"""
+        if os.path.isfile(imagen):
+            with open(imagen, 'rb') as f:
+                return "sha256:" + hashlib.sha256(f.read()).hexdigest()
+        return "url:" + imagen
+    
+    def obtener(self, clave: str) -> Optional[str]:
+        with self._lock:
+            file_id = self._ids.get(clave)
+            if file_id:
+                self.aciertos += 1
+            else:
+                self.fallos += 1
+            return file_id
+    
+    def guardar(self, clave: str, file_id: str):
+        with self._lock:
+            if self._ids.get(clave) == file_id:
+                return
+            self._ids[clave] = file_id
+            self._guardar()
+    
+    def invalidar(self, clave: str):
+        with self._lock:
+            if self._ids.pop(clave, None) is not None:
+                self._guardar()
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    def _guardar(self):
         try:
-            # Buscar enlace principal
-            enlace = tarjeta.find('a', href=re.compile(r'/productos/'))
-            if not enlace:
-                return None
-            
-            return self._extraer_producto_desde_enlace(enlace, tarjeta)
-            
+            tmp = self.archivo + ".tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._ids, f)
+            os.replace(tmp, self.archivo)
         except Exception as e:
-            logger.warning(f"Error extrayendo producto desde tarjeta: {e}")
-            return None
+            logger.warning(f"No se pudo guardar la caché de file_id: {e}")
+
+class TransporteTelegram:
+    """Conexiones persistentes a la Bot API con timeouts y reintentos ante 429 y errores 5xx"""
     
-    def obtener_productos_aleatorios(self, cantidad: int = 5) -> List[Producto]:
-        """Obtiene una muestra aleatoria de productos de diferentes páginas"""
-        total_paginas = self.obtener_total_paginas()
-        productos_totales = []
-        
-        # Seleccionar páginas aleatorias para obtener variedad
-        paginas_a_scrapear = random.sample(range(1, min(total_paginas + 1, 6)), min(5, total_paginas))
+    def __init__(self, timeout_conexion: float = 5, timeout_lectura: float = 30, max_reintentos: int = 3,
+                 backoff_segundos: float = 1.0, max_espera_segundos: float = 60, conexiones: int = 10):
+        self.timeout = (timeout_conexion, timeout_lectura)
+        self.max_reintentos = max(max_reintentos, 0)
+        self.backoff_segundos = backoff_segundos
+        self.max_espera_segundos = max_espera_segundos
+        self.reintentos = 0
         
-        for pagina in paginas_a_scrapear:
-            productos_pagina = self.extraer_productos_pagina(pagina)
-            productos_totales.extend(productos_pagina)
-            time.sleep(1)  # Evitar sobrecarga del servidor
+        # Los reintentos los maneja post(); el adaptador solo mantiene el pool keep-alive
+        import requests
+        self.session = requests.Session()
+        adaptador = requests.adapters.HTTPAdapter(pool_connections=conexiones, pool_maxsize=conexiones, max_retries=0)
+        self.session.mount('https://', adaptador)
+        self.session.mount('http://', adaptador)
+    
+    def post(self, url: str, data: Dict, files: Optional[Dict] = None) -> "requests.Response":
+        """POST con reintentos; devuelve la última respuesta aunque sea un error"""
+        import requests
         
-        # Seleccionar productos aleatorios
-        if len(productos_totales) >= cantidad:
-            return random.sample(productos_totales, cantidad)
-        else:
-            return productos_totales
+        intento = 0
+        while True:
+            try:
+                response = self.session.post(url, data=data, files=files, timeout=self.timeout)
+            except requests.exceptions.ConnectionError as e:
+                # No se reintentan los timeouts de lectura: Telegram pudo haber enviado el mensaje
+                if intento >= self.max_reintentos:
+                    raise
+                espera = self._backoff(intento)
+                logger.warning(f"Error de conexión con Telegram ({e}), reintento en {espera:.1f}s")
+            else:
+                if response.status_code == 429:
+                    espera = self._retry_after(response)
+                    motivo = "límite de Telegram (429)"
+                elif response.status_code >= 500:
+                    espera = self._backoff(intento)
+                    motivo = f"error {response.status_code} de Telegram"
+                else:
+                    return response
+                
+                if intento >= self.max_reintentos or espera > self.max_espera_segundos:
+                    return response
+                logger.warning(f"{motivo}, reintento en {espera:.1f}s")
+            
+            intento += 1
+            self.reintentos += 1
+            time.sleep(espera)
+    
+    def _backoff(self, intento: int) -> float:
+        """Exponencial con jitter completo para no sincronizar reintentos"""
+        return random.uniform(0, self.backoff_segundos * (2 ** intento))
+    
+    def _retry_after(self, response: "requests.Response") -> float:
+        try:
+            return float(response.json().get('parameters', {}).get('retry_after', self.backoff_segundos))
+        except ValueError:
+            return self.backoff_segundos
 
 class TelegramBot:
     """Cliente para enviar mensajes a Telegram"""
     
-    def __init__(self, bot_token: str, chat_id: str):
+    def __init__(self, bot_token: str, chat_id: str, file_ids_file: Optional[str] = None,
+                 transporte: Optional[TransporteTelegram] = None, destinos: Optional[List[str]] = None,
+                 limite_global: float = 30, limite_por_chat: float = 1, limite_por_grupo_minuto: float = 20,
+                 max_workers: int = 8, renderizador: Optional[RenderizadorTelegram] = None):
         self.bot_token = bot_token
         self.chat_id = chat_id
+        self.destinos = list(dict.fromkeys(str(d) for d in (destinos or [chat_id])))
         self.api_url = f"https://api.telegram.org/bot{bot_token}"
+        self.file_ids = CacheFileIds(file_ids_file) if file_ids_file else None
+        self.transporte = transporte or TransporteTelegram()
+        self.renderizador = renderizador or RenderizadorTelegram()
+        self.max_workers = max(max_workers, 1)
+        self.ultima_difusion: List[Dict] = []
+        
+        # Límites de Telegram: ~30 mensajes/s en total, 1/s por chat y 20/min por grupo o canal
+        self.limitador_global = LimitadorTasa(limite_global, 1)
+        self.limitador_chat = LimitadorTasa(limite_por_chat, 1)
+        self.limitador_grupo = LimitadorTasa(limite_por_grupo_minuto / 60, 1)
+    
+    @staticmethod
+    def es_grupo(chat_id: str) -> bool:
+        """Los ids negativos (grupos, supergrupos, canales) y los @usuarios de canal usan el límite por minuto"""
+        chat_id = str(chat_id)
+        return chat_id.startswith('-') or not chat_id.isdigit()
+    
+    def _esperar_turno(self, chat_id: str):
+        """Bloquea hasta que el envío respete el límite del chat y el global"""
+        limitador = self.limitador_grupo if self.es_grupo(chat_id) else self.limitador_chat
+        limitador.adquirir(str(chat_id))
+        self.limitador_global.adquirir('global')
+    
+    def difundir(self, envio: Callable[[str], bool], destinos: Optional[List[str]] = None,
+                 primero_solo: bool = False) -> List[Dict]:
+        """Ejecuta `envio(chat_id)` para cada destino en un pool de hilos y reporta éxito y latencia
+        
+        Con `primero_solo` el primer destino se atiende antes que el resto (p. ej. para que suba la
+        foto una vez y los demás reutilicen el file_id).
+        """
+        destinos = list(destinos or self.destinos)
+        inicio = time.perf_counter()
+        
+        def entregar(chat_id: str) -> Dict:
+            try:
+                exito = bool(envio(chat_id))
+            except Exception as e:
+                logger.error(f"Error enviando a {chat_id}: {e}")
+                exito = False
+            return {'chat_id': chat_id, 'exito': exito, 'latencia_segundos': round(time.perf_counter() - inicio, 3)}
+        
+        resultados = []
+        if primero_solo and destinos:
+            resultados.append(entregar(destinos[0]))
+            destinos = destinos[1:]
+        
+        workers = min(self.max_workers, len(destinos))
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                resultados.extend(executor.map(entregar, destinos))
+        else:
+            resultados.extend(entregar(chat_id) for chat_id in destinos)
+        
+        exitos = sum(1 for r in resultados if r['exito'])
+        fallidos = [r['chat_id'] for r in resultados if not r['exito']]
+        logger.info(f"Difusión: {exitos}/{len(resultados)} destinos en {time.perf_counter() - inicio:.2f}s"
+                    f"{f' (fallaron: {fallidos})' if fallidos else ''}")
+        self.ultima_difusion = resultados
+        return resultados
+    
+    def difundir_mensaje(self, texto: str, destinos: Optional[List[str]] = None) -> List[Dict]:
+        return self.difundir(lambda chat_id: self.enviar_mensaje(texto, chat_id), destinos)
+    
+    def difundir_foto(self, imagen_url: str, caption: str, destinos: Optional[List[str]] = None) -> List[Dict]:
+        return self.difundir(lambda chat_id: self.enviar_foto_con_texto(imagen_url, caption, chat_id), destinos,
+                             primero_solo=self.file_ids is not None)
     
-    def enviar_mensaje(self, texto: str) -> bool:
-        """Envía un mensaje de texto a Telegram"""
+    def difundir_album(self, fotos: List[Tuple[str, str]], destinos: Optional[List[str]] = None) -> List[Dict]:
+        return self.difundir(lambda chat_id: self.enviar_album(fotos, chat_id), destinos,
+                             primero_solo=self.file_ids is not None)
+    
+    def enviar_mensaje(self, texto: str, chat_id: Optional[str] = None) -> bool:
+        """Envía un mensaje ya renderizado a Telegram, partido en varios si supera el límite"""
+        chat_id = chat_id or self.chat_id
         try:
-            # Telegram tiene límite de 4096 caracteres
-            if len(texto) > 4000:
-                texto = texto[:4000] + "..."
-            
             url = f"{self.api_url}/sendMessage"
-            data = {
-                'chat_id': self.chat_id,
-                'text': texto,
-                'parse_mode': 'Markdown'
-            }
-            
-            response = requests.post(url, data=data)
-            
-            if response.status_code != 200:
-                logger.error(f"Error Telegram {response.status_code}: {response.text}")
-                # Intentar sin Markdown si falla
-                data['parse_mode'] = 'HTML'
-                response = requests.post(url, data=data)
+            for parte in self.renderizador.dividir(texto, RenderizadorTelegram.MAX_MENSAJE):
+                self._esperar_turno(chat_id)
+                data = {
+                    'chat_id': chat_id,
+                    'text': parte,
+                    'parse_mode': self.renderizador.parse_mode
+                }
                 
-                if response.status_code != 200:
-                    # Último intento sin formato
-                    del data['parse_mode']
-                    response = requests.post(url, data=data)
+                response = self.transporte.post(url, data=data)
+                if response.status_code == 400 and "parse entities" in response.text:
+                    # No debería pasar con el texto escapado: mandar al menos el texto visible
+                    logger.error(f"Telegram rechazó el formato del mensaje: {response.text}")
+                    self._esperar_turno(chat_id)
+                    response = self.transporte.post(url, data={
+                        'chat_id': chat_id, 'text': self.renderizador.texto_plano(parte)})
+                response.raise_for_status()
             
-            response.raise_for_status()
             logger.info("Mensaje enviado exitosamente a Telegram")
             return True
             
@@ -382,32 +2127,161 @@ class TelegramBot:
             logger.error(f"Error enviando mensaje a Telegram: {e}")
             return False
     
-    def enviar_foto_con_texto(self, imagen_url: str, caption: str) -> bool:
-        """Envía una foto con descripción a Telegram"""
+    def enviar_foto_con_texto(self, imagen_url: str, caption: str, chat_id: Optional[str] = None) -> bool:
+        """Envía una foto con descripción a Telegram
+        
+        `imagen_url` puede ser una URL o la ruta de un archivo local, que se sube como multipart.
+        """
+        chat_id = chat_id or self.chat_id
+        # El texto que no entra en el caption va en mensajes aparte, después de la foto
+        caption_foto, resto = self.renderizador.caption_y_resto(caption)
         try:
+            self._esperar_turno(chat_id)
             url = f"{self.api_url}/sendPhoto"
             data = {
-                'chat_id': self.chat_id,
-                'photo': imagen_url,
-                'caption': caption,
-                'parse_mode': 'Markdown'
+                'chat_id': chat_id,
+                'caption': caption_foto,
+                'parse_mode': self.renderizador.parse_mode
             }
             
-            response = requests.post(url, data=data)
+            # Reusar el file_id de un envío anterior de la misma foto: no hay subida ni descarga
+            clave = CacheFileIds.clave_foto(imagen_url) if self.file_ids is not None else None
+            file_id = self.file_ids.obtener(clave) if clave else None
+            if file_id:
+                response = self.transporte.post(url, data=dict(data, photo=file_id))
+                if response.status_code == 400 and 'file' in response.text.lower():
+                    logger.warning(f"Telegram rechazó el file_id cacheado, se vuelve a subir la foto: {response.text}")
+                    self.file_ids.invalidar(clave)
+                    file_id = None
+                    # La subida es otra petición: también respeta el límite del chat
+                    self._esperar_turno(chat_id)
+            
+            if not file_id:
+                if os.path.isfile(imagen_url):
+                    # En memoria para que los reintentos vuelvan a mandar el archivo completo
+                    with open(imagen_url, 'rb') as foto:
+                        archivo = foto.read()
+                    response = self.transporte.post(url, data=data, files={'photo': (os.path.basename(imagen_url), archivo)})
+                else:
+                    data['photo'] = imagen_url
+                    response = self.transporte.post(url, data=data)
             response.raise_for_status()
             
-            logger.info("Foto enviada exitosamente a Telegram")
-            return True
+            if clave and not file_id:
+                # Telegram devuelve la foto en varios tamaños; el último es el original
+                fotos = response.json().get('result', {}).get('photo') or []
+                if fotos:
+                    self.file_ids.guardar(clave, fotos[-1]['file_id'])
+            
+            logger.info(f"Foto enviada exitosamente a Telegram{' (file_id reutilizado)' if file_id else ''}")
+            return all(self.enviar_mensaje(parte, chat_id) for parte in resto)
             
         except Exception as e:
             logger.error(f"Error enviando foto a Telegram: {e}")
-            # Fallback: enviar solo el texto
-            return self.enviar_mensaje(caption)
+            # Fallback: enviar solo el texto, partido en mensajes que entren en el límite
+            partes = self.renderizador.dividir(caption, RenderizadorTelegram.MAX_MENSAJE)
+            return all(self.enviar_mensaje(parte, chat_id) for parte in partes)
+
+    def enviar_album(self, fotos: List[Tuple[str, str]], chat_id: Optional[str] = None) -> bool:
+        """Envía hasta 10 fotos (imagen, caption) en un solo sendMediaGroup"""
+        chat_id = chat_id or self.chat_id
+        # Los álbumes no admiten mensajes de continuación: cada caption se recorta entre párrafos
+        fotos = [(imagen, self.renderizador.dividir(caption, RenderizadorTelegram.MAX_CAPTION)[0])
+                 for imagen, caption in fotos[:10]]
+        try:
+            self._esperar_turno(chat_id)
+            url = f"{self.api_url}/sendMediaGroup"
+            claves = [CacheFileIds.clave_foto(imagen) if self.file_ids is not None else None for imagen, _ in fotos]
+            file_ids = [self.file_ids.obtener(clave) if clave else None for clave in claves]
+            
+            parse_mode = self.renderizador.parse_mode
+            response = self.transporte.post(url, **self._datos_album(chat_id, fotos, file_ids, parse_mode))
+            if any(file_ids) and response.status_code == 400 and 'file' in response.text.lower():
+                logger.warning(f"Telegram rechazó un file_id del álbum, se vuelven a subir las fotos: {response.text}")
+                for clave, file_id in zip(claves, file_ids):
+                    if file_id:
+                        self.file_ids.invalidar(clave)
+                file_ids = [None] * len(fotos)
+                self._esperar_turno(chat_id)
+                response = self.transporte.post(url, **self._datos_album(chat_id, fotos, file_ids, parse_mode))
+            response.raise_for_status()
+            
+            # Un mensaje por foto, en el mismo orden del álbum
+            mensajes = response.json().get('result') or []
+            for clave, file_id, mensaje in zip(claves, file_ids, mensajes):
+                if clave and not file_id and mensaje.get('photo'):
+                    self.file_ids.guardar(clave, mensaje['photo'][-1]['file_id'])
+            
+            logger.info(f"Álbum de {len(fotos)} fotos enviado exitosamente a Telegram")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error enviando álbum a Telegram: {e}")
+            return False
+    
+    @staticmethod
+    def _datos_album(chat_id: str, fotos: List[Tuple[str, str]], file_ids: List[Optional[str]],
+                     parse_mode: str) -> Dict:
+        """Arma el cuerpo de sendMediaGroup: file_id, URL o archivo adjunto (attach://) por foto"""
+        media, archivos = [], {}
+        for i, ((imagen, caption), file_id) in enumerate(zip(fotos, file_ids)):
+            item = {'type': 'photo', 'caption': caption, 'parse_mode': parse_mode}
+            if file_id:
+                item['media'] = file_id
+            elif os.path.isfile(imagen):
+                with open(imagen, 'rb') as f:
+                    archivos[f'foto{i}'] = (os.path.basename(imagen), f.read())
+                item['media'] = f'attach://foto{i}'
+            else:
+                item['media'] = imagen
+            media.append(item)
+        return {'data': {'chat_id': chat_id, 'media': json.dumps(media, ensure_ascii=False)},
+                'files': archivos or None}
+
+class AzarReproducible:
+    """Azar reproducible para un solo copy: cada elección sale de los bits de un hash de `partes`
+    
+    Implementa lo que usa `generar_copy_instagram` (choice, sample, shuffle). Inicializar un
+    random.Random por producto, aun con semilla entera, cuesta casi tanto como generar el copy.
+    """
+    
+    def __init__(self, *partes: str):
+        resumen = hashlib.blake2b("\x1f".join(partes).encode('utf-8'), digest_size=16).digest()
+        self._bits = int.from_bytes(resumen, 'big')  # 128 bits: un copy consume unos 70
+    
+    def _debajo(self, n: int) -> int:
+        self._bits, valor = divmod(self._bits, n)
+        return valor
+    
+    def choice(self, secuencia):
+        return secuencia[self._debajo(len(secuencia))]
+    
+    def sample(self, poblacion, k: int) -> list:
+        elegidos, bits, n = list(poblacion), self._bits, len(poblacion)
+        for i in range(k):
+            bits, j = divmod(bits, n - i)
+            elegidos[i], elegidos[i + j] = elegidos[i + j], elegidos[i]
+        self._bits = bits
+        return elegidos[:k]
+    
+    def shuffle(self, lista: list):
+        bits = self._bits
+        for i in range(len(lista) - 1, 0, -1):
+            bits, j = divmod(bits, i + 1)
+            lista[i], lista[j] = lista[j], lista[i]
+        self._bits = bits
 
 class CopyGenerator:
     """Generador de copy viral para Instagram"""
     
-    def __init__(self):
+    # Máximo de copies memorizados por (huella del producto, semilla)
+    MAX_MEMO = 50000
+    
+    def __init__(self, rng: Optional[random.Random] = None):
+        # Sin rng propio se usa el módulo random, como antes
+        self.rng = rng or random
+        self._memo: Dict[Tuple, str] = {}
+        
         self.emojis_trending = ["🔥", "✨", "💖", "🤩", "😍", "💕", "🌟", "💎", "🦋", "🌸", "💫", "👑", "🔥🔥", "💋"]
         
         # Hashtags trending actualizados para 2025
@@ -433,12 +2307,9 @@ class CopyGenerator:
             "#fashion", "#style", "#outfit", "#ootd", "#shoponline",
             "#enviosatodoelpais", "#cuotas", "#descuentos"
         ]
-    
-    def generar_copy_instagram(self, producto: Producto) -> str:
-        """Genera copy viral y atractivo para Instagram"""
         
         # Hooks llamativos para captar atención
-        hooks_virales = [
+        self.hooks_virales = [
             "🚨 ESTO ES LO QUE NECESITABAS Y NO LO SABÍAS",
             "🔥 ATENCIÓN: Esto se está agotando rápido",
             "😍 OBSESIONADA con esta pieza nueva",
@@ -450,7 +2321,7 @@ class CopyGenerator:
         ]
         
         # Calls to action virales
-        ctas_virales = [
+        self.ctas_virales = [
             "💬 COMENTA tu emoji favorito",
             "❤️ DOBLE TAP si también te obsesionaste",
             "📲 COMPARTE con tu bestie que necesita esto",
@@ -459,46 +2330,61 @@ class CopyGenerator:
             "🔄 COMPARTE en tu story si te gustó"
         ]
         
-        hook = random.choice(hooks_virales)
-        cta = random.choice(ctas_virales)
+        # Beneficios destacados
+        self.beneficios = [
+            "💕 Comodidad TODO EL DÍA",
+            "🔥 Elegancia que se siente",
+            "✨ Calidad PREMIUM",
+            "👑 Te hace sentir REINA",
+            "💖 Perfecto para cualquier ocasión"
+        ]
+        
+        # Hashtags específicos según el tipo de prenda (se usa el primero que aparezca en el nombre)
+        self.hashtags_tipo = [
+            ("soutien", ["#soutien", "#bra"]),
+            ("body", ["#body", "#bodysuit"]),
+            ("conjunto", ["#conjunto", "#set"]),
+            ("bombacha", ["#bombacha"]),
+        ]
+    
+    @staticmethod
+    def huella(producto: Producto) -> Tuple[str, str, str, str]:
+        """Campos del producto que intervienen en el copy"""
+        return (producto.nombre, producto.marca, producto.stock, producto.precio_oferta)
+    
+    def generar_copy_instagram(self, producto: Producto, rng: Optional[random.Random] = None) -> str:
+        """Genera copy viral y atractivo para Instagram"""
+        rng = rng or self.rng
+        
+        hook = rng.choice(self.hooks_virales)
+        cta = rng.choice(self.ctas_virales)
         
         # Descripción del producto con énfasis
         nombre_destacado = f"✨ {producto.nombre.upper()} ✨"
         
         # Crear urgencia si hay stock limitado
-        mensaje_stock = ""
-        if "stock" in producto.stock.lower() or "queda" in producto.stock.lower():
+        stock = producto.stock.lower()
+        if "stock" in stock or "queda" in stock:
             mensaje_stock = f"\n⚡ {producto.stock} - ¡NO TE QUEDES SIN EL TUYO!"
         else:
             mensaje_stock = "\n✅ DISPONIBLE AHORA"
         
-        # Beneficios destacados
-        beneficios = [
-            "💕 Comodidad TODO EL DÍA",
-            "🔥 Elegancia que se siente",
-            "✨ Calidad PREMIUM",
-            "👑 Te hace sentir REINA",
-            "💖 Perfecto para cualquier ocasión"
-        ]
-        beneficio_random = random.choice(beneficios)
+        beneficio_random = rng.choice(self.beneficios)
         
         # Crear mix de hashtags estratégicos (reducido para evitar límites)
         hashtags_seleccionados = (
-            random.sample(self.hashtags_trending, 3) +
-            random.sample(self.hashtags_lenceria, 2) +
-            random.sample(self.hashtags_marca, 2) +
-            random.sample(self.hashtags_shopping, 2)
+            rng.sample(self.hashtags_trending, 3) +
+            rng.sample(self.hashtags_lenceria, 2) +
+            rng.sample(self.hashtags_marca, 2) +
+            rng.sample(self.hashtags_shopping, 2)
         )
         
         # Agregar hashtags específicos del producto y marca
-        if "soutien" in producto.nombre.lower():
-            hashtags_seleccionados.extend(["#soutien", "#bra"])
-        elif "body" in producto.nombre.lower():
-            hashtags_seleccionados.extend(["#body", "#bodysuit"])
-        elif "conjunto" in producto.nombre.lower():
-            hashtags_seleccionados.extend(["#conjunto", "#set"])
-        elif "bombacha" in producto.nombre.lower():
-            hashtags_seleccionados.extend(["#bombacha"])
+        nombre = producto.nombre.lower()
+        for palabra, hashtags in self.hashtags_tipo:
+            if palabra in nombre:
+                hashtags_seleccionados.extend(hashtags)
+                break
         
         # Agregar hashtag de la marca específica si es diferente a las genéricas
         if producto.marca and len(producto.marca) > 3:
@@ -507,12 +2393,11 @@ class CopyGenerator:
                 hashtags_seleccionados.append(f"#{marca_hash}")
         
         # Tomar los primeros 15 hashtags para mantener el mensaje conciso
-        random.shuffle(hashtags_seleccionados)
-        hashtags_finales = hashtags_seleccionados[:15]
-        hashtags_texto = " ".join(hashtags_finales)
+        rng.shuffle(hashtags_seleccionados)
+        hashtags_texto = " ".join(hashtags_seleccionados[:15])
         
         # Construir copy viral más conciso
-        copy = f"""{hook}
+        return f"""{hook}
 
 {nombre_destacado}
 
@@ -527,36 +2412,338 @@ class CopyGenerator:
 {hashtags_texto}
 
 #henkolenceria #tiendaonline"""
+    
+    def generar_copies(self, productos: List[Producto], semilla: Optional[int] = None) -> List[str]:
+        """Genera el copy de cada producto (p. ej. todo el catálogo para planificar la semana)
+        
+        Con `semilla` el resultado es reproducible: el azar de cada producto sale de un hash de
+        (semilla, huella) (ver `AzarReproducible`), así que su copy no depende del orden del lote
+        y se memoriza.
+        """
+        if semilla is None:
+            return [self.generar_copy_instagram(producto) for producto in productos]
+        
+        copies = []
+        for producto in productos:
+            clave = (self.huella(producto), semilla)
+            copy = self._memo.get(clave)
+            if copy is None:
+                copy = self.generar_copy_instagram(producto, AzarReproducible(str(semilla), *clave[0]))
+                if len(self._memo) >= self.MAX_MEMO:
+                    del self._memo[next(iter(self._memo))]
+                self._memo[clave] = copy
+            copies.append(copy)
+        return copies
+    
+    def tamano_memo(self) -> int:
+        return len(self._memo)
+
+class PlanificadorEnvios:
+    """Duerme hasta el próximo horario y ejecuta el trabajo en un hilo aparte, sin solapamientos
+    
+    Registra por ejecución el desfase entre el horario programado y el inicio real, y entre el
+    horario y el envío si el trabajo devuelve el instante en que envió.
+    """
+    
+    def __init__(self, trabajo: Callable[[], Optional[float]], horarios: List[str], max_metricas: int = 100,
+                 preparacion: Optional[Callable[[], None]] = None, anticipacion_segundos: float = 0):
+        self.trabajo = trabajo
+        self.preparacion = preparacion
+        self.anticipacion_segundos = max(anticipacion_segundos, 0)
+        self.horarios = sorted({self._parsear_horario(h) for h in horarios})
+        self.metricas: deque = deque(maxlen=max_metricas)
+        self.ejecuciones = 0
+        self.omitidos = 0
+        self.proximo: Optional[datetime] = None
+        self._en_curso = threading.Lock()
+        self._preparando = threading.Lock()
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+    
+    @staticmethod
+    def _parsear_horario(horario: str) -> Tuple[int, int, int]:
+        for formato in ("%H:%M:%S", "%H:%M"):
+            try:
+                hora = datetime.strptime(horario.strip(), formato)
+                return hora.hour, hora.minute, hora.second
+            except ValueError:
+                continue
+        raise ValueError(f"Horario inválido: {horario}")
+    
+    @staticmethod
+    def horarios_repartidos(inicio: str, fin: str, cantidad: int) -> List[str]:
+        """`cantidad` horarios equiespaciados entre `inicio` y `fin` (ambos incluidos)"""
+        h_inicio = PlanificadorEnvios._parsear_horario(inicio)
+        h_fin = PlanificadorEnvios._parsear_horario(fin)
+        segundos_inicio = h_inicio[0] * 3600 + h_inicio[1] * 60 + h_inicio[2]
+        segundos_fin = h_fin[0] * 3600 + h_fin[1] * 60 + h_fin[2]
+        if cantidad <= 1 or segundos_fin <= segundos_inicio:
+            return [inicio]
         
-        return copy
+        paso = (segundos_fin - segundos_inicio) / (cantidad - 1)
+        horarios = []
+        for i in range(cantidad):
+            segundos = round(segundos_inicio + i * paso)
+            horarios.append(f"{segundos // 3600:02d}:{segundos % 3600 // 60:02d}:{segundos % 60:02d}")
+        return horarios
+    
+    def proximo_horario(self, desde: datetime) -> datetime:
+        """Primer horario estrictamente posterior a `desde`"""
+        for dias in (0, 1):
+            dia = desde.date() + timedelta(days=dias)
+            for hora, minuto, segundo in self.horarios:
+                candidato = datetime(dia.year, dia.month, dia.day, hora, minuto, segundo)
+                if candidato > desde:
+                    return candidato
+        raise ValueError("No hay horarios configurados")
+    
+    def ejecutar(self):
+        """Bucle principal: bloquea hasta que se llame a detener()"""
+        ultimo: Optional[datetime] = None
+        while not self._detener.is_set():
+            ahora = datetime.now()
+            programado = self.proximo_horario(max(ahora, ultimo) if ultimo else ahora)
+            self.proximo = programado
+            logger.info(f"Próximo envío programado: {programado:%Y-%m-%d %H:%M:%S}")
+            
+            # La preparación corre `anticipacion_segundos` antes; en el horario solo queda enviar
+            if self.preparacion:
+                if not self._esperar_hasta(programado - timedelta(seconds=self.anticipacion_segundos)):
+                    break
+                self._lanzar_preparacion(programado)
+            
+            if not self._esperar_hasta(programado):
+                break
+            ultimo = programado
+            self._lanzar(programado)
+    
+    def _esperar_hasta(self, instante: datetime) -> bool:
+        """Duerme hasta `instante`; False si se pidió detener"""
+        # Esperas acotadas para no depender de un solo timeout largo (suspensión, cambio de hora)
+        while not self._detener.is_set():
+            restante = (instante - datetime.now()).total_seconds()
+            if restante <= 0:
+                return True
+            self._despertar.wait(min(restante, 300))
+            self._despertar.clear()
+        return False
+    
+    def disparar(self) -> bool:
+        """Ejecuta el trabajo ya, con la misma protección contra solapamientos"""
+        return self._lanzar(datetime.now())
+    
+    def en_curso(self) -> bool:
+        return self._en_curso.locked()
+    
+    def detener(self):
+        self._detener.set()
+        self._despertar.set()
+    
+    def _lanzar(self, programado: datetime) -> bool:
+        if not self._en_curso.acquire(blocking=False):
+            self.omitidos += 1
+            logger.warning(f"Envío de las {programado:%H:%M:%S} omitido: el anterior todavía está en curso")
+            return False
+        threading.Thread(target=self._correr, args=(programado,), name="henko-envio", daemon=True).start()
+        return True
+    
+    def _lanzar_preparacion(self, programado: datetime):
+        if not self._preparando.acquire(blocking=False):
+            logger.warning(f"Preparación para las {programado:%H:%M:%S} omitida: la anterior todavía está en curso")
+            return
+        threading.Thread(target=self._correr_preparacion, args=(programado,), name="henko-preparacion",
+                         daemon=True).start()
+    
+    def _correr_preparacion(self, programado: datetime):
+        inicio = time.perf_counter()
+        try:
+            self.preparacion()
+            logger.info(f"Envío de las {programado:%H:%M:%S} preparado en {time.perf_counter() - inicio:.1f}s")
+        except Exception as e:
+            logger.error(f"Error preparando el envío programado: {e}")
+        finally:
+            self._preparando.release()
+    
+    def _correr(self, programado: datetime):
+        inicio = datetime.now()
+        instante_envio = None
+        try:
+            instante_envio = self.trabajo()
+        except Exception as e:
+            logger.error(f"Error en el envío programado: {e}")
+        finally:
+            fin = datetime.now()
+            metrica = {
+                'programado': programado.isoformat(timespec='seconds'),
+                'desfase_inicio_segundos': round((inicio - programado).total_seconds(), 3),
+                'desfase_envio_segundos': (round(instante_envio - programado.timestamp(), 3)
+                                           if instante_envio else None),
+                'duracion_segundos': round((fin - inicio).total_seconds(), 3)
+            }
+            self.metricas.append(metrica)
+            self.ejecuciones += 1
+            self._en_curso.release()
+            logger.info(f"Envío programado: {metrica}")
 
 class HenkoBot:
     """Aplicación principal que coordina todas las funciones"""
     
     def __init__(self, config_file: str = "config.json"):
         self.config = self.cargar_configuracion(config_file)
-        self.scraper = HenkoScraper()
+        configurar_logging(self.config)
+        self.scraper = HenkoScraper(self.config)
+        
+        # Catálogo local para no scrapear en cada envío
+        self.catalogo = None
+        if self.config.get('catalogo'):
+            try:
+                self.catalogo = CatalogoProductos(self.config.get('catalogo_db', 'catalogo.db'))
+            except Exception as e:
+                logger.error(f"No se pudo abrir el catálogo local: {e}")
+        self._lock_catalogo = threading.Lock()
+        
+        # Envío preparado por adelantado (ver preparar_proximo_envio)
+        self._envio_preparado: Optional[Dict] = None
+        self._preparacion_fallida = False
+        self._lock_preparacion = threading.Lock()
+        
+        # Historial completo de envíos (migra productos_enviados.json la primera vez)
+        self.historial = None
+        try:
+            self.historial = HistorialEnvios(self.config.get('historial_db', 'historial.db'),
+                                             dias_sin_repetir=self.config.get('dias_sin_repetir', 7))
+        except Exception as e:
+            logger.error(f"No se pudo abrir el historial de envíos: {e}")
+        
+        # Datos completos desde la página de detalle de los candidatos
+        self.enriquecedor = None
+        if self.config.get('enriquecer_detalle'):
+            self.enriquecedor = EnriquecedorDetalle(
+                self.scraper,
+                self.config.get('detalle_cache_file', 'cache_detalles.json'),
+                self.config.get('detalle_ttl_horas', 24),
+                self.config.get('detalle_max_workers', 4)
+            )
         
         # Inicializar bot de Telegram si está configurado
-        if self.config.get('telegram_token') and self.config.get('chat_id'):
+        # Escapado y límites de longitud según el parse_mode de los mensajes
+        self.renderizador = RenderizadorTelegram(self.config.get('telegram_parse_mode', 'HTML'))
+        
+        if self.config.get('telegram_token') and (self.config.get('chat_id') or self.config.get('chat_ids')):
+            destinos = [self.config['chat_id']] if self.config.get('chat_id') else []
+            destinos += self.config.get('chat_ids') or []
             self.telegram_bot = TelegramBot(
                 self.config['telegram_token'],
-                self.config['chat_id']
+                destinos[0],
+                self.config.get('telegram_file_ids_file'),
+                TransporteTelegram(
+                    self.config.get('telegram_timeout_conexion', 5),
+                    self.config.get('telegram_timeout_lectura', 30),
+                    self.config.get('telegram_max_reintentos', 3),
+                    self.config.get('telegram_backoff_segundos', 1.0),
+                    self.config.get('telegram_max_espera_segundos', 60),
+                    self.config.get('telegram_workers_difusion', 8)
+                ),
+                destinos,
+                self.config.get('telegram_limite_global', 30),
+                self.config.get('telegram_limite_por_chat', 1),
+                self.config.get('telegram_limite_por_grupo_minuto', 20),
+                self.config.get('telegram_workers_difusion', 8),
+                self.renderizador
             )
         else:
             self.telegram_bot = None
             logger.warning("Bot de Telegram no configurado")
         
         self.copy_generator = CopyGenerator()
+        
+        # Fotos validadas y livianas, cacheadas en disco
+        self.procesador_imagenes = None
+        if self.config.get('procesar_imagenes'):
+            self.procesador_imagenes = ProcesadorImagenes(
+                self.config.get('imagenes_cache_directorio', 'cache_imagenes'),
+                int(self.config.get('imagenes_cache_max_mb', 100) * 1024 * 1024),
+                self.config.get('imagen_lado_minimo', 200),
+                self.config.get('imagen_lado_maximo', 1280),
+                int(self.config.get('imagen_bytes_objetivo_kb', 300) * 1024),
+                self.config.get('timeout_peticiones', 30)
+            )
+        self.modo_automatico = False
+        self.iniciado = datetime.now()
+        self.planificador: Optional[PlanificadorEnvios] = None
+        self.control: Optional[ServidorControl] = None
     
-    def cargar_configuracion(self, config_file: str) -> Dict:
-        """Carga la configuración desde archivo JSON"""
+    @staticmethod
+    def cargar_configuracion(config_file: str, crear_si_falta: bool = True) -> Dict:
+        """Carga la configuración desde archivo JSON
+        
+        Sin el archivo se usan los valores por defecto y, con `crear_si_falta`, se escriben en `config_file`.
+        Los comandos rápidos pasan False: solo leen.
+        """
         config_default = {
             "telegram_token": "TU_BOT_TOKEN_AQUI",
             "chat_id": "TU_CHAT_ID_AQUI",
             "horario_envio": "09:00",
+            "horarios_envio": [],
+            "horario_fin_envio": "21:00",
+            "socket_control": SOCKET_CONTROL,
+            "anticipacion_minutos": 10,
+            "envio_preparado_file": "envio_preparado.json",
+            "envio_preparado_max_horas": 48,
             "productos_por_dia": 1,
-            "log_level": "INFO"
+            "modo_album": False,
+            "telegram_parse_mode": "HTML",
+            "log_level": "INFO",
+            "log_archivo": "henko_bot.log",
+            "log_rotacion": "tamano",
+            "log_max_mb": 10,
+            "log_copias": 5,
+            "log_comprimir": True,
+            "log_json": False,
+            "scraping_concurrente": False,
+            "max_workers_scraping": 4,
+            "peticiones_por_segundo": 1.0,
+            "rafaga_peticiones": 1,
+            "timeout_peticiones": 30,
+            "max_paginas_sondeo": 50,
+            "muestreo_min_candidatos": 40,
+            "muestreo_min_paginas": 2,
+            "parser_html": "auto",
+            "parseo_restringido": True,
+            "extraccion_por_tarjeta": True,
+            "extraccion_estructurada": True,
+            "imagen_ancho_minimo": 640,
+            "procesar_imagenes": False,
+            "imagenes_cache_directorio": "cache_imagenes",
+            "imagenes_cache_max_mb": 100,
+            "imagen_lado_minimo": 200,
+            "imagen_lado_maximo": 1280,
+            "imagen_bytes_objetivo_kb": 300,
+            "catalogo": False,
+            "catalogo_db": "catalogo.db",
+            "catalogo_max_horas": 24,
+            "historial_db": "historial.db",
+            "dias_sin_repetir": 7,
+            "catalogo_actualizacion_fondo": True,
+            "enriquecer_detalle": False,
+            "detalle_cache_file": "cache_detalles.json",
+            "detalle_ttl_horas": 24,
+            "detalle_max_workers": 4,
+            "telegram_file_ids_file": "telegram_file_ids.json",
+            "telegram_timeout_conexion": 5,
+            "telegram_timeout_lectura": 30,
+            "telegram_max_reintentos": 3,
+            "telegram_backoff_segundos": 1.0,
+            "telegram_max_espera_segundos": 60,
+            "chat_ids": [],
+            "telegram_workers_difusion": 8,
+            "telegram_limite_global": 30,
+            "telegram_limite_por_chat": 1,
+            "telegram_limite_por_grupo_minuto": 20,
+            "cache_http": True,
+            "cache_http_directorio": "cache_http",
+            "cache_http_ttl_segundos": 3600,
+            "cache_http_max_mb": 50
         }
         
         try:
@@ -565,7 +2752,7 @@ class HenkoBot:
                     config = json.load(f)
                     # Merge con config por defecto
                     config_default.update(config)
-            else:
+            elif crear_si_falta:
                 # Crear archivo de configuración por defecto
                 with open(config_file, 'w', encoding='utf-8') as f:
                     json.dump(config_default, f, indent=2, ensure_ascii=False)
@@ -575,116 +2762,376 @@ class HenkoBot:
         
         return config_default
     
-    def procesar_producto_diario(self):
-        """Función principal que se ejecuta diariamente"""
+    def procesar_producto_diario(self) -> Optional[float]:
+        """Función principal que se ejecuta diariamente; devuelve el instante del envío a Telegram"""
         try:
             logger.info("Iniciando proceso diario de selección de producto...")
+            envio = self.tomar_envio_preparado()
+            if not envio:
+                return None
+            return self.enviar_preparado(envio)
             
-            # Obtener productos aleatorios
-            productos = self.scraper.obtener_productos_aleatorios(5)
-            
-            if not productos:
-                logger.error("No se pudieron obtener productos")
-                return
+        except Exception as e:
+            logger.error(f"Error en proceso diario: {e}")
+            return None
+    
+    def preparar_envio(self) -> Optional[Dict]:
+        """Elige los productos, genera copies y mensajes y deja las fotos listas, sin enviar nada
+        
+        El resultado se guarda en `envio_preparado_file` como último envío preparado válido.
+        """
+        try:
+            # Varios productos en un solo álbum (sendMediaGroup admite hasta 10)
+            cantidad = min(max(int(self.config.get('productos_por_dia', 1)), 1), 10)
+            album = bool(self.config.get('modo_album')) and cantidad > 1
             
-            # Filtrar productos válidos (más flexible para todas las marcas)
-            productos_validos = [
-                p for p in productos 
-                if (p.id and len(p.nombre) > 3 and 
-                    "categoria" not in p.nombre.lower() and
-                    "buscar" not in p.nombre.lower() and
-                    "filtro" not in p.nombre.lower() and
-                    p.link and "/productos/" in p.link)
-            ]
-            
-            if not productos_validos:
-                logger.error("No se encontraron productos válidos")
-                return
+            seleccionados = self.seleccionar_productos(cantidad if album else 1)
+            if not seleccionados:
+                return None
             
-            # Seleccionar un producto al azar
-            producto_seleccionado = random.choice(productos_validos)
-            logger.info(f"Producto seleccionado: {producto_seleccionado.nombre}")
+            # Generar copies para Instagram y mensajes para Telegram
+            if album:
+                copies = self.copy_generator.generar_copies(seleccionados)
+            else:
+                copies = [self.copy_generator.generar_copy_instagram(seleccionados[0])]
+            mensajes = [self.generar_mensaje_telegram(p, c) for p, c in zip(seleccionados, copies)]
             
-            # Generar copy para Instagram
-            copy_instagram = self.copy_generator.generar_copy_instagram(producto_seleccionado)
+            # Validar y achicar las fotos ahora, así en el horario no se descarga nada
+            fotos = [self.preparar_foto(p) if self.telegram_bot else None for p in seleccionados]
             
-            # Preparar mensaje para Telegram
-            mensaje_telegram = f"""🛍️ **PRODUCTO DEL DÍA - HENKO LENCERÍA**
-
-{copy_instagram}
-
-🔗 **Link directo**: {producto_seleccionado.link}
-
----
-*Copy listo para Instagram ⬆️*
-*¡Solo copiá y pegá!* 📋"""
+            envio = {
+                "preparado": datetime.now().isoformat(),
+                "album": album,
+                "productos": [asdict(p) for p in seleccionados],
+                "copies": copies,
+                "mensajes": mensajes,
+                "fotos": fotos,
+                "resumen": self.generar_resumen_album(seleccionados) if album else None
+            }
+            self.guardar_envio_preparado(envio)
+            return envio
             
-            # Enviar por Telegram
-            if self.telegram_bot:
-                if producto_seleccionado.imagen_url:
-                    exito = self.telegram_bot.enviar_foto_con_texto(
-                        producto_seleccionado.imagen_url,
-                        mensaje_telegram
-                    )
-                else:
-                    exito = self.telegram_bot.enviar_mensaje(mensaje_telegram)
-                
-                if exito:
-                    logger.info("Producto del día enviado exitosamente")
-                else:
-                    logger.error("Error enviando producto del día")
-            else:
-                logger.warning("Telegram bot no configurado - mostrando mensaje:")
-                print(mensaje_telegram)
+        except Exception as e:
+            logger.error(f"Error preparando envío: {e}")
+            return None
+    
+    def preparar_proximo_envio(self):
+        """Fase previa al horario: deja el envío listo en memoria para que en el horario solo se envíe"""
+        with self._lock_preparacion:
+            envio = self.preparar_envio()
+            self._envio_preparado = envio
+            self._preparacion_fallida = envio is None
+    
+    def tomar_envio_preparado(self) -> Optional[Dict]:
+        """El envío preparado por adelantado; si no hay, lo prepara ahora y, si falla, usa el último guardado
+        
+        Si la fase previa ya falló (tienda caída), se usa directamente el último guardado: repetir la
+        preparación en el horario demoraría el envío lo que tarden en vencer los timeouts.
+        """
+        # Si la preparación sigue en curso se espera a que termine en lugar de repetirla
+        with self._lock_preparacion:
+            envio, self._envio_preparado = self._envio_preparado, None
+            fallida, self._preparacion_fallida = self._preparacion_fallida, False
+            if envio:
+                return envio
             
-            # Guardar registro del producto enviado
-            self.guardar_registro_producto(producto_seleccionado, copy_instagram)
+            if fallida:
+                envio = self.cargar_envio_preparado()
+                if envio:
+                    logger.warning(f"La preparación previa falló, se usa el envío preparado el {envio['preparado']}")
+                    return envio
+                logger.warning("La preparación previa falló y no hay envío guardado, se reintenta en el horario")
             
+            envio = self.preparar_envio()
+            if envio or fallida:
+                return envio
+        
+        envio = self.cargar_envio_preparado()
+        if envio:
+            logger.warning(f"No se pudo preparar un envío nuevo, se usa el preparado el {envio['preparado']}")
+        return envio
+    
+    def guardar_envio_preparado(self, envio: Dict):
+        archivo = self.config.get('envio_preparado_file', 'envio_preparado.json')
+        try:
+            temporal = f"{archivo}.tmp"
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(envio, f, ensure_ascii=False, indent=2)
+            os.replace(temporal, archivo)
         except Exception as e:
-            logger.error(f"Error en proceso diario: {e}")
+            logger.error(f"Error guardando envío preparado: {e}")
     
-    def guardar_registro_producto(self, producto: Producto, copy: str):
-        """Guarda un registro del producto enviado"""
+    def marcar_envio_preparado_enviado(self, envio: Dict):
+        """Anota en `envio_preparado_file` que ese envío ya salió, para que el respaldo no lo repita"""
+        archivo = self.config.get('envio_preparado_file', 'envio_preparado.json')
         try:
-            registro = {
-                "fecha": datetime.now().isoformat(),
-                "producto": {
-                    "id": producto.id,
-                    "nombre": producto.nombre,
-                    "link": producto.link,
-                    "precio": producto.precio_oferta
-                },
-                "copy_generado": copy
-            }
+            if not os.path.exists(archivo):
+                return
+            with open(archivo, 'r', encoding='utf-8') as f:
+                guardado = json.load(f)
             
-            # Cargar registros existentes
-            registros_file = "productos_enviados.json"
-            registros = []
+            # Si mientras tanto se guardó otro envío preparado, ese todavía no se envió
+            if guardado.get('preparado') != envio.get('preparado'):
+                return
+            guardado['enviado'] = datetime.now().isoformat()
+            self.guardar_envio_preparado(guardado)
+        except Exception as e:
+            logger.error(f"Error marcando envío preparado como enviado: {e}")
+    
+    def cargar_envio_preparado(self) -> Optional[Dict]:
+        """Último envío preparado guardado, si nunca se envió y no es más viejo que `envio_preparado_max_horas`
+        
+        Los productos que se enviaron hace poco (ver `dias_sin_repetir`) se quitan del envío.
+        """
+        archivo = self.config.get('envio_preparado_file', 'envio_preparado.json')
+        try:
+            if not os.path.exists(archivo):
+                return None
+            with open(archivo, 'r', encoding='utf-8') as f:
+                envio = json.load(f)
             
-            if os.path.exists(registros_file):
-                with open(registros_file, 'r', encoding='utf-8') as f:
-                    registros = json.load(f)
+            if envio.get('enviado'):
+                logger.warning(f"El último envío preparado ya se envió el {envio['enviado']}, no se repite")
+                return None
+            antiguedad = datetime.now() - datetime.fromisoformat(envio['preparado'])
+            if antiguedad > timedelta(hours=self.config.get('envio_preparado_max_horas', 48)):
+                logger.warning(f"El último envío preparado es del {envio['preparado']}, demasiado viejo para usarlo")
+                return None
+            return self._quitar_recientes(envio)
+        except Exception as e:
+            logger.error(f"Error cargando envío preparado: {e}")
+            return None
+    
+    def _quitar_recientes(self, envio: Dict) -> Optional[Dict]:
+        """El envío sin los productos en enfriamiento; None si no queda ninguno"""
+        recientes = self.historial.ids_recientes() if self.historial else set()
+        productos = [Producto(**datos) for datos in envio['productos']]
+        quedan = [i for i, producto in enumerate(productos) if clave_producto(producto) not in recientes]
+        if len(quedan) == len(productos):
+            return envio
+        if not quedan:
+            logger.warning("Todos los productos del envío preparado se enviaron hace poco, no se usa")
+            return None
+        
+        logger.warning(f"Se quitan {len(productos) - len(quedan)} productos enviados hace poco del envío preparado")
+        envio = dict(envio)
+        for campo in ('productos', 'copies', 'mensajes', 'fotos'):
+            envio[campo] = [envio[campo][i] for i in quedan]
+        # Un álbum necesita al menos 2 productos; con uno solo se manda como post normal
+        envio['album'] = envio['album'] and len(quedan) > 1
+        envio['resumen'] = self.generar_resumen_album([productos[i] for i in quedan]) if envio['album'] else None
+        return envio
+    
+    def enviar_preparado(self, envio: Dict) -> Optional[float]:
+        """Envía un envío preparado y lo registra en el historial; devuelve el instante del envío"""
+        productos = [Producto(**datos) for datos in envio['productos']]
+        copies, mensajes = envio['copies'], envio['mensajes']
+        
+        exito, latencia, instante_envio = None, None, None
+        if self.telegram_bot:
+            # Una foto local pudo salir de la caché de imágenes desde que se preparó
+            fotos = []
+            for producto, foto, mensaje in zip(productos, envio['fotos'], mensajes):
+                if foto and not foto.startswith(('http://', 'https://')) and not os.path.exists(foto):
+                    foto = self.preparar_foto(producto)
+                fotos.append((foto, mensaje))
             
-            registros.append(registro)
+            instante_envio = time.time()
+            inicio = time.perf_counter()
+            if envio['album']:
+                # Un álbum necesita al menos 2 fotos; con menos se manda como post normal
+                con_foto = [(foto, mensaje) for foto, mensaje in fotos if foto]
+                if len(con_foto) >= 2:
+                    resultados = self.telegram_bot.difundir_album(con_foto)
+                elif con_foto:
+                    resultados = self.telegram_bot.difundir_foto(*con_foto[0])
+                else:
+                    resultados = []
+                resultados += self.telegram_bot.difundir_mensaje(envio['resumen'])
+            else:
+                # Si la foto no sirve, mandar solo el texto
+                foto, mensaje = fotos[0]
+                if foto:
+                    resultados = self.telegram_bot.difundir_foto(foto, mensaje)
+                else:
+                    resultados = self.telegram_bot.difundir_mensaje(mensaje)
+            latencia = round(time.perf_counter() - inicio, 3)
+            exito = any(r['exito'] for r in resultados)
             
-            # Mantener solo los últimos 100 registros
-            if len(registros) > 100:
-                registros = registros[-100:]
+            if exito and envio['album']:
+                logger.info(f"Álbum de {len(productos)} productos enviado exitosamente")
+            elif exito:
+                logger.info("Producto del día enviado exitosamente")
+            else:
+                logger.error("Error enviando producto del día")
+        else:
+            logger.warning("Telegram bot no configurado - mostrando mensaje:")
+            print(self.renderizador.texto_plano(envio['resumen'] if envio['album'] else mensajes[0]))
+        
+        # Guardar registro de los productos enviados
+        for producto, copy in zip(productos, copies):
+            self.guardar_registro_producto(producto, copy, exito, latencia)
+        # Un envío fallido queda disponible como respaldo, igual que no cuenta para el enfriamiento
+        if exito is not False:
+            self.marcar_envio_preparado_enviado(envio)
+        return instante_envio
+    
+    def seleccionar_productos(self, cantidad: int = 1) -> List[Producto]:
+        """Obtiene candidatos, descarta los inválidos y elige `cantidad` productos al azar"""
+        # Lo enviado dentro de `dias_sin_repetir` se excluye antes de muestrear
+        recientes = self.historial.ids_recientes() if self.historial else set()
+        
+        # Obtener productos aleatorios (del catálogo si está al día)
+        productos = self.obtener_candidatos(max(5, cantidad * 2), recientes)
+        if not productos and recientes:
+            logger.warning("Todos los candidatos se enviaron hace poco, se permite repetir")
+            productos = self.obtener_candidatos(max(5, cantidad * 2))
+        
+        if not productos:
+            logger.error("No se pudieron obtener productos")
+            return []
+        
+        # Filtrar productos válidos (más flexible para todas las marcas)
+        productos_validos = [
+            p for p in productos 
+            if (p.id and len(p.nombre) > 3 and 
+                "categoria" not in p.nombre.lower() and
+                "buscar" not in p.nombre.lower() and
+                "filtro" not in p.nombre.lower() and
+                p.link and "/productos/" in p.link)
+        ]
+        
+        if not productos_validos:
+            logger.error("No se encontraron productos válidos")
+            return []
+        
+        # Completar talles, colores y stock real de los candidatos
+        if self.enriquecedor:
+            productos_validos = self.enriquecedor.enriquecer(productos_validos)
+            con_stock = [p for p in productos_validos if p.stock != "Sin stock"]
+            productos_validos = con_stock or productos_validos
+        
+        # Seleccionar productos al azar
+        seleccionados = random.sample(productos_validos, min(cantidad, len(productos_validos)))
+        for producto in seleccionados:
+            logger.info(f"Producto seleccionado: {producto.nombre}")
+        return seleccionados
+    
+    def preparar_foto(self, producto: Producto) -> Optional[str]:
+        """Ruta local de la foto validada (o la URL si el procesamiento está desactivado)"""
+        foto = producto.imagen_url
+        if foto and self.procesador_imagenes:
+            foto = self.procesador_imagenes.preparar(foto)
+        return foto or None
+    
+    def generar_mensaje_telegram(self, producto: Producto, copy_instagram: str) -> str:
+        """Mensaje renderizado para el parse_mode configurado; el copy y el link van escapados"""
+        r = self.renderizador
+        return f"""🛍️ {r.negrita('PRODUCTO DEL DÍA - HENKO LENCERÍA')}
+
+{r.escapar(copy_instagram)}
+
+🔗 {r.negrita('Link directo:')} {r.escapar(producto.link)}
+
+{r.escapar('---')}
+{r.cursiva('Copy listo para Instagram ⬆️')}
+{r.cursiva('¡Solo copiá y pegá!')} 📋"""
+    
+    def generar_resumen_album(self, productos: List[Producto]) -> str:
+        r = self.renderizador
+        lineas = [f"🛍️ {r.negrita(f'PRODUCTOS DEL DÍA - HENKO LENCERÍA ({len(productos)})')}", ""]
+        for i, producto in enumerate(productos, 1):
+            precio = f" - {producto.precio_oferta}" if producto.precio_oferta else ""
+            lineas.append(r.escapar(f"{i}. {producto.nombre}{precio}") + f"\n🔗 {r.escapar(producto.link)}")
+        lineas += ["", f"{r.cursiva('Cada foto del álbum trae su copy listo para Instagram')} 📋"]
+        return "\n".join(lineas)
+    
+    def obtener_candidatos(self, cantidad: int = 5, excluir: Optional[Set[str]] = None) -> List[Producto]:
+        """Toma candidatos del catálogo local; si está desactualizado, scrapea la tienda"""
+        max_horas = self.config.get('catalogo_max_horas', 24)
+        
+        if self.catalogo and not self.catalogo.esta_desactualizado(max_horas):
+            productos = self.catalogo.muestra_aleatoria(cantidad, excluir=excluir)
+            if productos:
+                logger.info(f"{len(productos)} candidatos tomados del catálogo local")
+                return productos
+        
+        productos = self.scraper.obtener_productos_aleatorios(cantidad, excluir)
+        
+        if self.catalogo:
+            if productos:
+                self.catalogo.upsert(productos)
+            if self.config.get('catalogo_actualizacion_fondo', True):
+                self.actualizar_catalogo_en_fondo()
+        
+        return productos
+    
+    def actualizar_catalogo(self) -> Optional[Dict]:
+        """Actualiza el catálogo local completo (una sola actualización a la vez)"""
+        if not self.catalogo:
+            logger.warning("Catálogo local desactivado en la configuración")
+            return None
+        
+        if not self._lock_catalogo.acquire(blocking=False):
+            logger.info("Ya hay una actualización del catálogo en curso")
+            return None
+        
+        try:
+            return self.scraper.actualizar_catalogo(self.catalogo)
+        except Exception as e:
+            logger.error(f"Error actualizando catálogo: {e}")
+            return None
+        finally:
+            self._lock_catalogo.release()
+    
+    def actualizar_catalogo_en_fondo(self):
+        """Lanza la actualización del catálogo en un hilo aparte (solo en modo automático)"""
+        if not self.modo_automatico:
+            return
+        threading.Thread(target=self.actualizar_catalogo, name="actualizar-catalogo", daemon=True).start()
+    
+    def guardar_registro_producto(self, producto: Producto, copy: str, exito: Optional[bool] = None,
+                                  latencia_segundos: Optional[float] = None):
+        """Guarda un registro del producto enviado"""
+        try:
+            if not self.historial:
+                logger.warning("Historial de envíos no disponible, no se guarda el registro")
+                return
             
-            # Guardar registros actualizados
-            with open(registros_file, 'w', encoding='utf-8') as f:
-                json.dump(registros, f, indent=2, ensure_ascii=False)
+            self.historial.registrar({
+                "id": producto.id,
+                "clave": clave_producto(producto),
+                "nombre": producto.nombre,
+                "marca": producto.marca,
+                "categoria": producto.categoria,
+                "link": producto.link,
+                "precio": producto.precio_oferta
+            }, copy, exito=exito, latencia_segundos=latencia_segundos)
             
             logger.info("Registro de producto guardado")
             
         except Exception as e:
             logger.error(f"Error guardando registro: {e}")
     
+    def horarios_envio(self) -> List[str]:
+        """`horarios_envio` si está definido; si no, `productos_por_dia` posts repartidos en el día"""
+        horarios = self.config.get('horarios_envio') or []
+        if horarios:
+            return horarios
+        
+        inicio = self.config.get('horario_envio', '09:00')
+        # En modo álbum productos_por_dia es el tamaño del álbum, que sale en un solo envío
+        cantidad = 1 if self.config.get('modo_album') else int(self.config.get('productos_por_dia', 1))
+        return PlanificadorEnvios.horarios_repartidos(inicio, self.config.get('horario_fin_envio', '21:00'), cantidad)
+    
     def configurar_horario(self):
         """Configura el horario de ejecución automática"""
-        horario = self.config.get('horario_envio', '09:00')
-        schedule.every().day.at(horario).do(self.procesar_producto_diario)
-        logger.info(f"Horario configurado: todos los días a las {horario}")
+        horarios = self.horarios_envio()
+        anticipacion = self.config.get('anticipacion_minutos', 10) * 60
+        self.planificador = PlanificadorEnvios(self.procesar_producto_diario, horarios,
+                                               preparacion=self.preparar_proximo_envio if anticipacion > 0 else None,
+                                               anticipacion_segundos=anticipacion)
+        logger.info(f"Horario configurado: todos los días a las {', '.join(horarios)}")
     
     def ejecutar_inmediatamente(self):
         """Ejecuta el proceso inmediatamente (para testing)"""
@@ -694,17 +3141,151 @@ class HenkoBot:
     def iniciar_bot(self):
         """Inicia el bot en modo automático"""
         logger.info("Iniciando Henko Bot...")
+        self.modo_automatico = True
         self.configurar_horario()
         
+        # start.py y control.py consultan al bot en ejecución por este socket
+        if self.config.get('socket_control'):
+            self.control = ServidorControl(self.config['socket_control'], self.comandos_control())
+            if not self.control.iniciar():
+                self.control = None
+        
         logger.info("Bot configurado. Esperando horario programado...")
         logger.info("Presiona Ctrl+C para detener el bot")
         
         try:
-            while True:
-                schedule.run_pending()
-                time.sleep(60)  # Revisar cada minuto
+            self.planificador.ejecutar()
         except KeyboardInterrupt:
+            self.planificador.detener()
             logger.info("Bot detenido por el usuario")
+        finally:
+            if self.control:
+                self.control.detener()
+    
+    def comandos_control(self) -> Dict[str, Callable[[], object]]:
+        """Comandos que atiende el socket de control"""
+        return {
+            'estado': self.estado,
+            'proximo': self.proximo_envio,
+            'disparar': self.disparar_envio,
+            'estadisticas': self.estadisticas_en_vivo,
+            'caches': self.tamanos_caches,
+            'ultimo': lambda: self.historial.ultimo() if self.historial else None,
+        }
+    
+    def estado(self) -> Dict:
+        planificador = self.planificador
+        return {
+            "pid": os.getpid(),
+            "iniciado": self.iniciado.isoformat(timespec='seconds'),
+            "modo_automatico": self.modo_automatico,
+            "proximo_envio": self.proximo_envio()['proximo_envio'],
+            "envio_en_curso": planificador.en_curso() if planificador else False,
+            "envio_preparado": self._envio_preparado is not None,
+            "ejecuciones": planificador.ejecuciones if planificador else 0,
+            "omitidos": planificador.omitidos if planificador else 0,
+            "ultima_ejecucion": planificador.metricas[-1] if planificador and planificador.metricas else None
+        }
+    
+    def proximo_envio(self) -> Dict:
+        proximo = self.planificador.proximo if self.planificador else None
+        return {
+            "proximo_envio": proximo.isoformat(timespec='seconds') if proximo else None,
+            "horarios": self.horarios_envio(),
+            "anticipacion_minutos": self.config.get('anticipacion_minutos', 10)
+        }
+    
+    def disparar_envio(self) -> Dict:
+        """Envío inmediato en el bot en ejecución, con la sesión y las cachés ya calientes"""
+        if not self.planificador:
+            raise RuntimeError("El planificador no está activo")
+        lanzado = self.planificador.disparar()
+        return {"lanzado": lanzado, "motivo": None if lanzado else "Ya hay un envío en curso"}
+    
+    def estadisticas_en_vivo(self) -> Dict:
+        """Estadísticas del historial más las métricas que solo tiene el proceso en ejecución"""
+        estadisticas = {
+            "historial": self.historial.estadisticas() if self.historial else None,
+            "envios_programados": list(self.planificador.metricas)[-10:] if self.planificador else [],
+        }
+        if self.telegram_bot:
+            file_ids = self.telegram_bot.file_ids
+            estadisticas["telegram"] = {
+                "reintentos": self.telegram_bot.transporte.reintentos,
+                "file_ids_aciertos": file_ids.aciertos if file_ids is not None else 0,
+                "file_ids_fallos": file_ids.fallos if file_ids is not None else 0,
+                "ultima_difusion": self.telegram_bot.ultima_difusion
+            }
+        if self.enriquecedor:
+            estadisticas["detalle"] = self.enriquecedor.ultima_ejecucion
+        if self.procesador_imagenes:
+            estadisticas["imagenes"] = self.procesador_imagenes.ultima_metrica
+        return estadisticas
+    
+    def tamanos_caches(self) -> Dict:
+        file_ids = self.telegram_bot.file_ids if self.telegram_bot else None
+        return {
+            "http_bytes": self.scraper.cache.tamano_total() if self.scraper.cache else None,
+            "imagenes_bytes": self.procesador_imagenes.tamano_total() if self.procesador_imagenes else None,
+            "detalles": self.enriquecedor.tamano_cache() if self.enriquecedor else None,
+            "file_ids": len(file_ids) if file_ids is not None else None,
+            "copies_memorizados": self.copy_generator.tamano_memo(),
+            "productos_en_catalogo": self.catalogo.contar() if self.catalogo else None,
+            "recientes_sin_repetir": len(self.historial.ids_recientes()) if self.historial else None
+        }
+
+def verificar_configuracion(config: Dict) -> List[str]:
+    """Problemas de la configuración que impiden enviar; lista vacía si está completa"""
+    problemas = []
+    if str(config.get('telegram_token', '')).startswith('TU_BOT_TOKEN'):
+        problemas.append("Token de Telegram no configurado")
+    if str(config.get('chat_id', '')).startswith('TU_CHAT_ID') and not config.get('chat_ids'):
+        problemas.append("Chat ID no configurado")
+    for horario in config.get('horarios_envio') or [config.get('horario_envio', '09:00')]:
+        try:
+            PlanificadorEnvios._parsear_horario(str(horario))
+        except ValueError as e:
+            problemas.append(str(e))
+    if config.get('telegram_parse_mode', 'HTML') not in ('HTML', 'MarkdownV2'):
+        problemas.append(f"telegram_parse_mode inválido: {config.get('telegram_parse_mode')}")
+    return problemas
+
+def perfil_arranque():
+    """Costo de importar henko_bot y cada dependencia, incluidas las que se cargan bajo demanda"""
+    import subprocess
+    
+    bajo_demanda = ['requests', 'bs4', 'lxml.etree', 'PIL.Image', 'orjson']
+    codigo = "import henko_bot\nfor m in %r:\n    try:\n        __import__(m)\n    except ImportError:\n        pass" % bajo_demanda
+    inicio = time.perf_counter()
+    resultado = subprocess.run([sys.executable, '-X', 'importtime', '-c', codigo], capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+    total = time.perf_counter() - inicio
+    
+    # Formato de -X importtime: "import time: propio | acumulado | <sangría>módulo", en microsegundos
+    primer_nivel, de_henko_bot, pendientes = [], [], []
+    for linea in resultado.stderr.splitlines():
+        partes = linea.split('|')
+        if len(partes) != 3 or not partes[1].strip().isdigit():
+            continue
+        nombre = partes[2].rstrip()
+        nivel = (len(nombre) - len(nombre.lstrip())) // 2
+        acumulado = int(partes[1]) / 1000
+        if nivel == 0:
+            primer_nivel.append((nombre.strip(), acumulado))
+            if nombre.strip() == 'henko_bot':
+                de_henko_bot, pendientes = pendientes, []
+            else:
+                pendientes = []
+        elif nivel == 1:
+            pendientes.append((nombre.strip(), acumulado))
+    
+    print(f"⏱️  Proceso completo: {total * 1000:.0f} ms")
+    print("\nImportados por henko_bot:")
+    for nombre, ms in sorted(de_henko_bot, key=lambda x: -x[1]):
+        print(f"  {nombre:<28} {ms:8.1f} ms")
+    print("\nPrimer nivel (henko_bot y lo que se carga bajo demanda):")
+    for nombre, ms in sorted(primer_nivel, key=lambda x: -x[1]):
+        print(f"  {nombre:<28} {ms:8.1f} ms")
 
 def main():
     """Función principal"""
@@ -713,13 +3294,56 @@ def main():
     parser = argparse.ArgumentParser(description='Henko Lencería Bot para Telegram e Instagram')
     parser.add_argument('--test', action='store_true', help='Ejecutar una vez inmediatamente para testing')
     parser.add_argument('--config', default='config.json', help='Archivo de configuración')
+    parser.add_argument('--actualizar-catalogo', action='store_true', help='Actualizar el catálogo local y salir')
+    parser.add_argument('--estadisticas', action='store_true', help='Mostrar estadísticas del historial y salir')
+    parser.add_argument('--ultimo', action='store_true', help='Mostrar el último producto enviado y salir')
+    parser.add_argument('--verificar-config', action='store_true', help='Verificar la configuración y salir')
+    parser.add_argument('--startup-profile', action='store_true', help='Mostrar el costo de arranque por import')
     
     args = parser.parse_args()
     
+    # Comandos rápidos: no crean el bot, así no se cargan requests, bs4 ni Pillow
+    if args.startup_profile:
+        perfil_arranque()
+        return
+    
+    if args.verificar_config:
+        problemas = verificar_configuracion(HenkoBot.cargar_configuracion(args.config, crear_si_falta=False))
+        if not os.path.exists(args.config):
+            problemas.insert(0, f"Archivo {args.config} no encontrado")
+        for problema in problemas:
+            print(f"❌ {problema}")
+        if problemas:
+            sys.exit(1)
+        print("✅ Configuración completa")
+        return
+    
+    if args.estadisticas or args.ultimo:
+        config = HenkoBot.cargar_configuracion(args.config, crear_si_falta=False)
+        historial = HistorialEnvios(config.get('historial_db', 'historial.db'),
+                                    dias_sin_repetir=config.get('dias_sin_repetir', 7))
+        try:
+            if args.estadisticas:
+                print(json.dumps(historial.estadisticas(), ensure_ascii=False, indent=2))
+            else:
+                ultimo = historial.ultimo()
+                print(json.dumps(ultimo, ensure_ascii=False, indent=2) if ultimo else "📭 No hay productos enviados aún.")
+        finally:
+            historial.cerrar()
+        return
+    
     # Crear instancia del bot
     bot = HenkoBot(args.config)
     
-    if args.test:
+    if args.actualizar_catalogo:
+        resumen = bot.actualizar_catalogo()
+        if not resumen:
+            sys.exit(1)
+        print(f"📦 Catálogo actualizado en {resumen['duracion_segundos']} s")
+        print(f"📄 Páginas: {resumen['paginas_con_productos']}/{resumen['paginas']}")
+        print(f"🛍️ Productos guardados: {resumen['productos_guardados']} "
+              f"(total en catálogo: {resumen['productos_en_catalogo']})")
+    elif args.test:
         bot.ejecutar_inmediatamente()
     else:
         bot.iniciar_bot()
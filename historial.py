@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Historial de productos enviados por Henko Bot
+Cada envío es un INSERT en SQLite (modo WAL): no se reescribe el archivo ni se pierde historia.
+Las estadísticas se actualizan en la misma transacción, así que leerlas no recorre el historial.
+
+Uso: python historial.py [--reconstruir-estadisticas]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+HISTORIAL_DB = "historial.db"
+REGISTROS_LEGACY = "productos_enviados.json"
+
+def id_real(producto_id: Optional[str]) -> bool:
+    """False para los ids de relleno ("0", vacío) que pone el scraper cuando la tienda no da uno"""
+    return bool(producto_id) and producto_id.isdigit() and int(producto_id) > 0
+
+def clave_de(producto_id: Optional[str], link: Optional[str]) -> str:
+    """Clave estable de un producto: su ID si es real, si no el link"""
+    return producto_id if id_real(producto_id) else (link or '')
+
+class IndiceRecientes:
+    """Productos enviados dentro de la ventana de enfriamiento, consultables en O(1) por su clave"""
+    
+    def __init__(self, dias: float = 7):
+        self.ventana = timedelta(days=dias)
+        self._ultimo_envio: Dict[str, datetime] = {}
+    
+    def agregar(self, clave: str, fecha: datetime):
+        if clave and fecha > self._ultimo_envio.get(clave, datetime.min):
+            self._ultimo_envio[clave] = fecha
+    
+    def __contains__(self, clave: str) -> bool:
+        fecha = self._ultimo_envio.get(clave)
+        return fecha is not None and datetime.now() - fecha < self.ventana
+    
+    def __len__(self) -> int:
+        return len(self._ultimo_envio)
+    
+    def ids(self) -> Set[str]:
+        """Claves todavía en enfriamiento; de paso descarta las que ya salieron de la ventana"""
+        limite = datetime.now() - self.ventana
+        self._ultimo_envio = {clave: fecha for clave, fecha in self._ultimo_envio.items() if fecha > limite}
+        return set(self._ultimo_envio)
+
+class HistorialEnvios:
+    """Historial completo de envíos con búsquedas indexadas por producto y por fecha"""
+    
+    def __init__(self, db_file: str = HISTORIAL_DB, legacy_file: Optional[str] = REGISTROS_LEGACY,
+                 dias_sin_repetir: float = 7):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        # WAL: las escrituras no bloquean a los lectores (start.py) y un corte no corrompe la base
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.create_function("clave_de", 2, clave_de, deterministic=True)
+        self._conn.execute("PRAGMA synchronous=FULL")
+        claves_nuevas = self._crear_esquema()
+        
+        if legacy_file and os.path.exists(legacy_file):
+            self._migrar_legacy(legacy_file)
+        
+        # Bases creadas antes de las estadísticas incrementales
+        with self._lock:
+            sin_estadisticas = self._conn.execute(
+                "SELECT 1 FROM estadisticas WHERE clave = 'total'").fetchone() is None
+        # También las de antes de la columna clave: envios_por_producto estaba agrupado por producto_id
+        if sin_estadisticas or claves_nuevas:
+            self.reconstruir_estadisticas()
+        
+        # Índice en memoria de lo enviado hace poco, para que el selector no repita productos
+        self.recientes = IndiceRecientes(dias_sin_repetir)
+        limite = (datetime.now() - self.recientes.ventana).isoformat()
+        with self._lock:
+            for fila in self._conn.execute(
+                    """SELECT clave, MAX(fecha) AS fecha FROM envios
+                       WHERE fecha >= ? AND (exito IS NULL OR exito = 1) GROUP BY clave""", (limite,)):
+                self.recientes.agregar(fila['clave'], self._fecha(fila['fecha']))
+    
+    def _crear_esquema(self) -> bool:
+        """Crea las tablas y agrega las columnas nuevas; True si hubo que calcular la clave de envíos viejos"""
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS envios (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    fecha TEXT NOT NULL,
+                    producto_id TEXT,
+                    nombre TEXT,
+                    marca TEXT,
+                    categoria TEXT,
+                    link TEXT,
+                    precio TEXT,
+                    copy_generado TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_envios_producto_id ON envios(producto_id);
+                CREATE INDEX IF NOT EXISTS idx_envios_fecha ON envios(fecha);
+                
+                -- Agregados mantenidos en cada registro
+                CREATE TABLE IF NOT EXISTS estadisticas (
+                    clave TEXT PRIMARY KEY,
+                    valor
+                );
+                CREATE TABLE IF NOT EXISTS envios_por_producto (
+                    producto_id TEXT PRIMARY KEY,  -- clave del producto (ver clave_de)
+                    envios INTEGER NOT NULL,
+                    ultimo_envio TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS envios_por_categoria (
+                    categoria TEXT PRIMARY KEY,
+                    envios INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS envios_por_marca (
+                    marca TEXT PRIMARY KEY,
+                    envios INTEGER NOT NULL
+                );
+            """)
+            
+            # Columnas agregadas después de la primera versión del historial
+            columnas = {fila['name'] for fila in self._conn.execute("PRAGMA table_info(envios)")}
+            if 'exito' not in columnas:
+                self._conn.execute("ALTER TABLE envios ADD COLUMN exito INTEGER")
+            if 'latencia_segundos' not in columnas:
+                self._conn.execute("ALTER TABLE envios ADD COLUMN latencia_segundos REAL")
+            # Clave del producto (ID real o link): producto_id no es único cuando la tienda no da ID
+            claves_nuevas = 'clave' not in columnas
+            if claves_nuevas:
+                self._conn.execute("ALTER TABLE envios ADD COLUMN clave TEXT")
+                self._conn.execute("UPDATE envios SET clave = clave_de(producto_id, link)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_envios_clave ON envios(clave)")
+        return claves_nuevas
+    
+    def _migrar_legacy(self, legacy_file: str):
+        """Importa el productos_enviados.json anterior una sola vez y lo renombra"""
+        try:
+            with open(legacy_file, 'r', encoding='utf-8') as f:
+                registros = json.load(f)
+            
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    """INSERT INTO envios (fecha, producto_id, clave, nombre, link, precio, copy_generado)
+                       VALUES (?, ?, clave_de(?, ?), ?, ?, ?, ?)""",
+                    [
+                        (r.get('fecha', ''), r.get('producto', {}).get('id'),
+                         r.get('producto', {}).get('id'), r.get('producto', {}).get('link'),
+                         r.get('producto', {}).get('nombre'), r.get('producto', {}).get('link'),
+                         r.get('producto', {}).get('precio'), r.get('copy_generado'))
+                        for r in registros
+                    ]
+                )
+            os.replace(legacy_file, legacy_file + ".migrado")
+            logger.info(f"Historial migrado desde {legacy_file}: {len(registros)} registros")
+            self.reconstruir_estadisticas()
+        except Exception as e:
+            logger.error(f"No se pudo migrar {legacy_file}: {e}")
+    
+    def registrar(self, producto: Dict, copy: str, fecha: Optional[str] = None,
+                  exito: Optional[bool] = None, latencia_segundos: Optional[float] = None) -> int:
+        """Agrega un envío y actualiza las estadísticas en la misma transacción
+        
+        `producto` tiene id, nombre, link, precio y opcionalmente clave, marca y categoría; sin clave se
+        calcula con `clave_de`. `exito` es None cuando no hubo envío real (Telegram sin configurar).
+        """
+        fecha = fecha or datetime.now().isoformat()
+        clave = producto.get('clave') or clave_de(producto.get('id'), producto.get('link'))
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                """INSERT INTO envios (fecha, producto_id, clave, nombre, marca, categoria, link, precio,
+                                       copy_generado, exito, latencia_segundos)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (fecha, producto.get('id'), clave, producto.get('nombre'), producto.get('marca'),
+                 producto.get('categoria'), producto.get('link'), producto.get('precio'), copy,
+                 None if exito is None else int(exito), latencia_segundos)
+            )
+            self._acumular(fecha, clave, producto.get('categoria'), producto.get('marca'),
+                           exito, latencia_segundos)
+            # Bajo el mismo lock que la escritura: nadie ve el envío en la base sin verlo en el índice.
+            # Un envío fallido no cuenta para el enfriamiento.
+            if exito is not False:
+                self.recientes.agregar(clave, self._fecha(fecha))
+            return cursor.lastrowid
+    
+    @staticmethod
+    def _fecha(texto: str) -> datetime:
+        try:
+            return datetime.fromisoformat(texto)
+        except (TypeError, ValueError):
+            return datetime.min
+    
+    def enviado_recientemente(self, clave: str) -> bool:
+        with self._lock:
+            return clave in self.recientes
+    
+    def ids_recientes(self) -> Set[str]:
+        """Claves (ver `clave_de`) de los productos en enfriamiento"""
+        with self._lock:
+            return self.recientes.ids()
+    
+    def _acumular(self, fecha: str, clave: Optional[str], categoria: Optional[str], marca: Optional[str],
+                  exito: Optional[bool], latencia_segundos: Optional[float]):
+        """Suma un envío a los agregados (se llama dentro de la transacción del INSERT)"""
+        incrementos = {'total': 1}
+        if exito is not None:
+            incrementos['exitosos' if exito else 'fallidos'] = 1
+        if latencia_segundos is not None:
+            incrementos['envios_con_latencia'] = 1
+            incrementos['latencia_total'] = latencia_segundos
+        
+        if clave:
+            self._conn.execute(
+                """INSERT INTO envios_por_producto (producto_id, envios, ultimo_envio) VALUES (?, 1, ?)
+                   ON CONFLICT(producto_id) DO UPDATE SET
+                       envios = envios + 1,
+                       ultimo_envio = MAX(ultimo_envio, excluded.ultimo_envio)""",
+                (clave, fecha)
+            )
+            if self._conn.execute("SELECT envios FROM envios_por_producto WHERE producto_id = ?",
+                                  (clave,)).fetchone()[0] == 1:
+                incrementos['productos_unicos'] = 1
+        
+        self._conn.executemany(
+            """INSERT INTO estadisticas (clave, valor) VALUES (?, ?)
+               ON CONFLICT(clave) DO UPDATE SET valor = valor + excluded.valor""",
+            list(incrementos.items())
+        )
+        self._conn.execute(
+            """INSERT INTO estadisticas (clave, valor) VALUES ('ultimo_envio', ?)
+               ON CONFLICT(clave) DO UPDATE SET valor = MAX(valor, excluded.valor)""",
+            (fecha,)
+        )
+        for tabla, columna, valor in (('envios_por_categoria', 'categoria', categoria),
+                                      ('envios_por_marca', 'marca', marca)):
+            if valor:
+                self._conn.execute(
+                    f"""INSERT INTO {tabla} ({columna}, envios) VALUES (?, 1)
+                        ON CONFLICT({columna}) DO UPDATE SET envios = envios + 1""",
+                    (valor,)
+                )
+    
+    def estadisticas(self, top: int = 5) -> Dict:
+        """Agregados leídos de las tablas de estadísticas, sin recorrer el historial"""
+        with self._lock:
+            valores = {fila['clave']: fila['valor'] for fila in self._conn.execute("SELECT * FROM estadisticas")}
+            categorias = self._conn.execute(
+                "SELECT categoria, envios FROM envios_por_categoria ORDER BY envios DESC LIMIT ?", (top,)
+            ).fetchall()
+            marcas = self._conn.execute(
+                "SELECT marca, envios FROM envios_por_marca ORDER BY envios DESC LIMIT ?", (top,)
+            ).fetchall()
+        
+        con_latencia = valores.get('envios_con_latencia', 0)
+        return {
+            'total_enviados': int(valores.get('total', 0)),
+            'productos_unicos': int(valores.get('productos_unicos', 0)),
+            'ultimo_envio': valores.get('ultimo_envio'),
+            'exitosos': int(valores.get('exitosos', 0)),
+            'fallidos': int(valores.get('fallidos', 0)),
+            'latencia_promedio_segundos': (
+                round(valores.get('latencia_total', 0) / con_latencia, 3) if con_latencia else None),
+            'por_categoria': {fila['categoria']: fila['envios'] for fila in categorias},
+            'por_marca': {fila['marca']: fila['envios'] for fila in marcas},
+        }
+    
+    def reconstruir_estadisticas(self) -> Dict:
+        """Recalcula todos los agregados desde el historial completo"""
+        with self._lock, self._conn:
+            for tabla in ('estadisticas', 'envios_por_producto', 'envios_por_categoria', 'envios_por_marca'):
+                self._conn.execute(f"DELETE FROM {tabla}")
+            
+            # Sentencia por sentencia: executescript haría COMMIT a mitad de la reconstrucción
+            for sentencia in (
+                """INSERT INTO envios_por_producto (producto_id, envios, ultimo_envio)
+                   SELECT clave, COUNT(*), MAX(fecha) FROM envios
+                   WHERE clave IS NOT NULL AND clave != '' GROUP BY clave""",
+                """INSERT INTO envios_por_categoria (categoria, envios)
+                   SELECT categoria, COUNT(*) FROM envios
+                   WHERE categoria IS NOT NULL AND categoria != '' GROUP BY categoria""",
+                """INSERT INTO envios_por_marca (marca, envios)
+                   SELECT marca, COUNT(*) FROM envios
+                   WHERE marca IS NOT NULL AND marca != '' GROUP BY marca""",
+                """INSERT INTO estadisticas (clave, valor)
+                   SELECT 'total', COUNT(*) FROM envios
+                   UNION ALL SELECT 'exitosos', COUNT(*) FROM envios WHERE exito = 1
+                   UNION ALL SELECT 'fallidos', COUNT(*) FROM envios WHERE exito = 0
+                   UNION ALL SELECT 'envios_con_latencia', COUNT(latencia_segundos) FROM envios
+                   UNION ALL SELECT 'latencia_total', COALESCE(SUM(latencia_segundos), 0) FROM envios
+                   UNION ALL SELECT 'productos_unicos', COUNT(*) FROM envios_por_producto""",
+                """INSERT INTO estadisticas (clave, valor)
+                   SELECT 'ultimo_envio', MAX(fecha) FROM envios HAVING COUNT(*) > 0""",
+            ):
+                self._conn.execute(sentencia)
+        
+        logger.info("Estadísticas del historial reconstruidas")
+        return self.estadisticas()
+    
+    @staticmethod
+    def _registro(fila: sqlite3.Row) -> Dict:
+        """Fila en el mismo formato que usaba productos_enviados.json"""
+        return {
+            "fecha": fila['fecha'],
+            "producto": {
+                "id": fila['producto_id'],
+                "nombre": fila['nombre'],
+                "marca": fila['marca'],
+                "categoria": fila['categoria'],
+                "link": fila['link'],
+                "precio": fila['precio']
+            },
+            "copy_generado": fila['copy_generado']
+        }
+    
+    def ultimo(self) -> Optional[Dict]:
+        with self._lock:
+            fila = self._conn.execute("SELECT * FROM envios ORDER BY id DESC LIMIT 1").fetchone()
+        return self._registro(fila) if fila else None
+    
+    def contar(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM envios").fetchone()[0]
+    
+    def productos_unicos(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(DISTINCT clave) FROM envios WHERE clave IS NOT NULL AND clave != ''").fetchone()[0]
+    
+    def por_producto(self, clave: str) -> List[Dict]:
+        """Envíos de un producto por su clave (el ID si es real, si no el link)"""
+        with self._lock:
+            filas = self._conn.execute(
+                "SELECT * FROM envios WHERE clave = ? ORDER BY id", (clave,)
+            ).fetchall()
+        return [self._registro(f) for f in filas]
+    
+    def entre_fechas(self, desde: str, hasta: Optional[str] = None) -> List[Dict]:
+        """Envíos con fecha ISO en [desde, hasta)"""
+        with self._lock:
+            filas = self._conn.execute(
+                "SELECT * FROM envios WHERE fecha >= ? AND fecha < ? ORDER BY fecha",
+                (desde, hasta or "9999")
+            ).fetchall()
+        return [self._registro(f) for f in filas]
+    
+    def cerrar(self):
+        with self._lock:
+            self._conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Historial de envíos de Henko Bot')
+    parser.add_argument('--db', default=HISTORIAL_DB, help='Base de datos del historial')
+    parser.add_argument('--reconstruir-estadisticas', action='store_true',
+                        help='Recalcular las estadísticas desde el historial completo')
+    args = parser.parse_args()
+    
+    historial = HistorialEnvios(args.db)
+    if args.reconstruir_estadisticas:
+        estadisticas = historial.reconstruir_estadisticas()
+    else:
+        estadisticas = historial.estadisticas()
+    print(json.dumps(estadisticas, indent=2, ensure_ascii=False))
+    historial.cerrar()
+
+if __name__ == "__main__":
+    main()
@@ -75,7 +75,7 @@ def probar_configuracion():
     """Prueba la configuración ejecutando el bot en modo test"""
     print("\n🧪 Probando configuración...")
     try:
-        resultado = subprocess.run([sys.executable, "henko_bot.py", "--test"], 
+        resultado = subprocess.run([sys.executable, "-m", "henko_bot", "--test"], 
                                  capture_output=True, text=True, timeout=30)
         
         if resultado.returncode == 0:
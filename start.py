@@ -4,12 +4,16 @@ Script de inicio rápido para Henko Bot
 Proporciona una interfaz simple para usar el bot
 """
 
+import glob
 import os
 import sys
 import json
 import subprocess
 from datetime import datetime
 
+from control import SOCKET_CONTROL, enviar_comando
+from historial import HISTORIAL_DB, REGISTROS_LEGACY, HistorialEnvios
+
 def mostrar_banner():
     """Muestra el banner de inicio"""
     print("🛍️" + "="*60 + "🛍️")
@@ -37,6 +41,22 @@ def verificar_configuracion():
     except Exception as e:
         return False, f"Error leyendo configuración: {e}"
 
+def leer_config():
+    """Contenido de config.json, o un diccionario vacío si no existe o no se puede leer"""
+    try:
+        with open('config.json', 'r') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def consultar_bot(comando):
+    """Respuesta del bot en ejecución por el socket de control; None si no hay un bot corriendo"""
+    ruta = leer_config().get('socket_control', SOCKET_CONTROL)
+    if not ruta:
+        return None
+    respuesta = enviar_comando(comando, ruta)
+    return respuesta if respuesta and respuesta.get('ok') else None
+
 def mostrar_menu():
     """Muestra el menú principal"""
     print("📋 MENÚ PRINCIPAL")
@@ -53,11 +73,21 @@ def mostrar_menu():
 
 def ejecutar_test():
     """Ejecuta el bot en modo test"""
+    # Con el bot corriendo, el envío lo hace ese proceso con la sesión y las cachés ya calientes
+    respuesta = consultar_bot("disparar")
+    if respuesta:
+        if respuesta['resultado']['lanzado']:
+            print("✅ Envío lanzado en el bot en ejecución.")
+            print("📋 Revisa tu chat para confirmar.")
+        else:
+            print(f"⏳ {respuesta['resultado']['motivo']}")
+        return respuesta['resultado']['lanzado']
+    
     print("🧪 Ejecutando prueba del bot...")
     print("⏱️  Esto puede tomar unos segundos...\n")
     
     try:
-        resultado = subprocess.run([sys.executable, "henko_bot.py", "--test"], 
+        resultado = subprocess.run([sys.executable, "-m", "henko_bot", "--test"], 
                                  capture_output=True, text=True, timeout=60)
         
         if resultado.returncode == 0:
@@ -79,12 +109,18 @@ def ejecutar_test():
 
 def iniciar_automatico():
     """Inicia el bot en modo automático"""
+    estado = consultar_bot("estado")
+    if estado:
+        print(f"🤖 El bot ya está en ejecución (pid {estado['resultado']['pid']}).")
+        print(f"⏰ Próximo envío: {estado['resultado']['proximo_envio'] or 'sin programar'}")
+        return
+    
     print("🤖 Iniciando bot en modo automático...")
     print("⏰ El bot enviará productos según el horario configurado.")
     print("🛑 Presiona Ctrl+C para detener\n")
     
     try:
-        subprocess.run([sys.executable, "henko_bot.py"])
+        subprocess.run([sys.executable, "-m", "henko_bot"])
     except KeyboardInterrupt:
         print("\n🛑 Bot detenido por el usuario.")
     except Exception as e:
@@ -108,21 +144,35 @@ def ejecutar_setup():
     except Exception as e:
         print(f"❌ Error en configuración: {e}")
 
+def abrir_historial():
+    """Abre el historial de envíos de config.json si existe (o si hay un productos_enviados.json para migrar)
+
+    Quien lo abre lo cierra con `cerrar()`.
+    """
+    db_file = leer_config().get('historial_db', HISTORIAL_DB)
+    if not os.path.exists(db_file) and not os.path.exists(REGISTROS_LEGACY):
+        return None
+    return HistorialEnvios(db_file)
+
 def ver_ultimo_producto():
     """Muestra información del último producto enviado"""
     try:
-        if not os.path.exists('productos_enviados.json'):
-            print("📭 No hay productos enviados aún.")
-            return
-        
-        with open('productos_enviados.json', 'r', encoding='utf-8') as f:
-            registros = json.load(f)
+        respuesta = consultar_bot("ultimo")
+        if respuesta:
+            ultimo = respuesta['resultado']
+        else:
+            historial = abrir_historial()
+            ultimo = None
+            if historial:
+                try:
+                    ultimo = historial.ultimo()
+                finally:
+                    historial.cerrar()
         
-        if not registros:
+        if not ultimo:
             print("📭 No hay productos enviados aún.")
             return
         
-        ultimo = registros[-1]
         print("📱 ÚLTIMO PRODUCTO ENVIADO")
         print("-" * 40)
         print(f"📅 Fecha: {ultimo['fecha']}")
@@ -141,19 +191,22 @@ def ver_estadisticas():
     try:
         stats = {
             'total_enviados': 0,
-            'ultimo_envio': 'Nunca',
+            'ultimo_envio': None,
             'productos_unicos': 0
         }
         
-        if os.path.exists('productos_enviados.json'):
-            with open('productos_enviados.json', 'r', encoding='utf-8') as f:
-                registros = json.load(f)
-            
-            stats['total_enviados'] = len(registros)
-            if registros:
-                stats['ultimo_envio'] = registros[-1]['fecha']
-                productos_ids = set(r['producto']['id'] for r in registros)
-                stats['productos_unicos'] = len(productos_ids)
+        # Con el bot corriendo, las estadísticas vienen del proceso en ejecución
+        en_vivo = consultar_bot("estadisticas")
+        if en_vivo and en_vivo['resultado']['historial']:
+            stats = en_vivo['resultado']['historial']
+        else:
+            # Agregados ya calculados en el historial: no se recorren los registros
+            historial = abrir_historial()
+            if historial:
+                try:
+                    stats = historial.estadisticas()
+                finally:
+                    historial.cerrar()
         
         # Verificar configuración
         config_ok, config_msg = verificar_configuracion()
@@ -163,11 +216,38 @@ def ver_estadisticas():
         print(f"✅ Configuración: {'OK' if config_ok else 'PENDIENTE'}")
         print(f"📤 Productos enviados: {stats['total_enviados']}")
         print(f"🔢 Productos únicos: {stats['productos_unicos']}")
-        print(f"⏰ Último envío: {stats['ultimo_envio']}")
+        print(f"⏰ Último envío: {stats['ultimo_envio'] or 'Nunca'}")
+        
+        if stats.get('exitosos') or stats.get('fallidos'):
+            print(f"📬 Envíos a Telegram: {stats['exitosos']} ok, {stats['fallidos']} fallidos")
+        if stats.get('latencia_promedio_segundos') is not None:
+            print(f"⚡ Latencia promedio de envío: {stats['latencia_promedio_segundos']} s")
+        if stats.get('por_categoria'):
+            print("🏷️ Categorías: " + ", ".join(f"{c} ({n})" for c, n in stats['por_categoria'].items()))
+        if stats.get('por_marca'):
+            print("🏭 Marcas: " + ", ".join(f"{m} ({n})" for m, n in stats['por_marca'].items()))
+        
+        estado = consultar_bot("estado")
+        if estado:
+            print(f"🤖 Bot en ejecución (pid {estado['resultado']['pid']}) desde {estado['resultado']['iniciado']}")
+            print(f"⏰ Próximo envío: {estado['resultado']['proximo_envio'] or 'sin programar'}")
+            ultima = estado['resultado']['ultima_ejecucion']
+            if ultima:
+                print(f"🎯 Último envío programado: {ultima['programado']} "
+                      f"(desfase de envío {ultima['desfase_envio_segundos']} s)")
+            caches = consultar_bot("caches")
+            if caches:
+                tamanos = {k: v for k, v in caches['resultado'].items() if v is not None}
+                print("🗄️ Cachés: " + ", ".join(f"{k} {v}" for k, v in tamanos.items()))
         
-        if os.path.exists('henko_bot.log'):
-            size = os.path.getsize('henko_bot.log')
-            print(f"📝 Tamaño del log: {size} bytes")
+        # Rotados: henko_bot.log.1.gz, henko_bot.log.2026-01-31.gz o sin .gz si log_comprimir es false
+        log_archivo = leer_config().get('log_archivo', 'henko_bot.log')
+        if log_archivo and os.path.exists(log_archivo):
+            size = os.path.getsize(log_archivo)
+            rotados = glob.glob(glob.escape(log_archivo) + '.*')
+            print(f"📝 Tamaño del log: {size} bytes"
+                  + (f" (+{len(rotados)} rotados, {sum(os.path.getsize(r) for r in rotados)} bytes)"
+                     if rotados else ""))
         
     except Exception as e:
         print(f"❌ Error obteniendo estadísticas: {e}")
@@ -184,8 +264,8 @@ def mostrar_ayuda():
     print()
     print("📁 Archivos importantes:")
     print("   config.json                   (configuración)")
-    print("   productos_enviados.json       (historial)")
-    print("   henko_bot.log                 (logs del sistema)")
+    print("   historial.db                  (historial de envíos)")
+    print("   henko_bot.log                 (logs del sistema, rotados en .gz)")
     print()
     print("🆘 Solución de problemas:")
     print("   1. Verificar configuración con opción 3")
@@ -0,0 +1,41 @@
+"""Arranque: importar henko_bot no carga módulos pesados y los comandos rápidos no crean config.json"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PESADOS = ('requests', 'bs4', 'lxml', 'PIL', 'orjson')
+
+def ejecutar(argumentos, cwd):
+    return subprocess.run([sys.executable] + argumentos, cwd=cwd, env=dict(os.environ, PYTHONPATH=RAIZ),
+                          capture_output=True, text=True, timeout=60)
+
+def test_importar_no_carga_modulos_pesados(tmp_path):
+    resultado = ejecutar(['-c', f"import sys, henko_bot; print(' '.join(m for m in {PESADOS!r} if m in sys.modules))"],
+                         tmp_path)
+    assert resultado.returncode == 0, resultado.stderr
+    assert resultado.stdout.split() == []
+
+def test_verificar_config_sin_archivo_no_lo_crea(tmp_path):
+    resultado = ejecutar(['-m', 'henko_bot', '--verificar-config'], tmp_path)
+    assert resultado.returncode == 1
+    assert "config.json no encontrado" in resultado.stdout
+    assert os.listdir(tmp_path) == []
+
+def test_verificar_config_completa(tmp_path):
+    (tmp_path / 'config.json').write_text(json.dumps({'telegram_token': '123:ABC', 'chat_id': '-1001'}))
+    resultado = ejecutar(['-m', 'henko_bot', '--verificar-config'], tmp_path)
+    assert resultado.returncode == 0, resultado.stdout
+    assert os.listdir(tmp_path) == ['config.json']
+
+@pytest.mark.parametrize('comando', ['--estadisticas', '--ultimo'])
+def test_consultas_no_crean_config(tmp_path, comando):
+    resultado = ejecutar(['-m', 'henko_bot', comando], tmp_path)
+    assert resultado.returncode == 0, resultado.stderr
+    # Solo leen la configuración y el historial: no escriben config.json ni abren el log
+    assert not (tmp_path / 'config.json').exists()
+    assert not (tmp_path / 'henko_bot.log').exists()
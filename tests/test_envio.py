@@ -0,0 +1,68 @@
+"""Envíos a Telegram: cada petición respeta el límite y el texto de respaldo entra en los mensajes"""
+
+import json
+
+from henko_bot import CacheFileIds, RenderizadorTelegram, TelegramBot
+
+class RespuestaFalsa:
+    def __init__(self, status_code: int, cuerpo: dict):
+        self.status_code = status_code
+        self.text = json.dumps(cuerpo)
+        self._cuerpo = cuerpo
+    
+    def json(self):
+        return self._cuerpo
+    
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+class TransporteFalso:
+    """Rechaza los file_id cacheados y, con `falla_foto`, también la subida de la foto"""
+    
+    def __init__(self, falla_foto: bool = False):
+        self.falla_foto = falla_foto
+        self.peticiones = []
+    
+    def post(self, url, data=None, files=None):
+        metodo = url.rsplit('/', 1)[-1]
+        self.peticiones.append((metodo, data))
+        if 'FILEID' in json.dumps(data):
+            return RespuestaFalsa(400, {'ok': False, 'description': 'Bad Request: wrong file identifier'})
+        if metodo == 'sendPhoto' and self.falla_foto:
+            return RespuestaFalsa(500, {'ok': False})
+        foto = {'photo': [{'file_id': 'nuevo'}]}
+        return RespuestaFalsa(200, {'ok': True, 'result': [foto] if metodo == 'sendMediaGroup' else foto})
+
+def crear_bot(tmp_path, transporte: TransporteFalso):
+    bot = TelegramBot('123:ABC', '42', file_ids_file=str(tmp_path / 'file_ids.json'), transporte=transporte)
+    bot.file_ids.guardar(CacheFileIds.clave_foto('https://henko.test/foto.jpg'), 'FILEID')
+    turnos = []
+    bot._esperar_turno = turnos.append
+    return bot, turnos
+
+def test_resubida_tras_file_id_rechazado_espera_turno(tmp_path):
+    transporte = TransporteFalso()
+    bot, turnos = crear_bot(tmp_path, transporte)
+    
+    assert bot.enviar_foto_con_texto('https://henko.test/foto.jpg', 'Hola')
+    assert len(transporte.peticiones) == 2
+    assert len(turnos) == len(transporte.peticiones)
+
+def test_resubida_de_album_espera_turno(tmp_path):
+    transporte = TransporteFalso()
+    bot, turnos = crear_bot(tmp_path, transporte)
+    
+    assert bot.enviar_album([('https://henko.test/foto.jpg', 'Hola')])
+    assert len(transporte.peticiones) == 2
+    assert len(turnos) == len(transporte.peticiones)
+
+def test_respaldo_de_texto_respeta_limite_de_mensaje(tmp_path):
+    transporte = TransporteFalso(falla_foto=True)
+    bot, _ = crear_bot(tmp_path, transporte)
+    caption = '\n\n'.join(f"Párrafo {i} " + 'x' * 300 for i in range(40))
+    
+    assert bot.enviar_foto_con_texto('https://henko.test/foto.jpg', caption)
+    mensajes = [data['text'] for metodo, data in transporte.peticiones if metodo == 'sendMessage']
+    assert len(mensajes) > 1
+    assert all(len(mensaje) <= RenderizadorTelegram.MAX_MENSAJE for mensaje in mensajes)
@@ -0,0 +1,34 @@
+"""Extracción del listado: el modo por enlace y el modo por tarjeta ven los mismos productos"""
+
+import pytest
+
+from benchmark import crear_scraper, generar_pagina_catalogo
+
+# Productos sin ID en el texto: imagen, título y botón "Comprar" apuntan al mismo producto
+LISTADO_SIN_ID = "".join(f"""
+<div class="item">
+  <a href="/productos/body-encaje-{i}/"><img src="https://cdn.test/{i}.jpg"></a>
+  <a href="https://henko.test/productos/body-encaje-{i}/?variante=2">Body Encaje Modelo {i} $15.000</a>
+  <span class="item-price">$15.000</span>
+  <a href="/productos/body-encaje-{i}/">Comprar</a>
+</div>""" for i in range(8))
+
+def extraer(html: str, por_tarjeta: bool):
+    scraper = crear_scraper('https://henko.test', {'extraccion_por_tarjeta': por_tarjeta})
+    return scraper.extraer_productos_pagina(1, scraper._parsear_html(html.encode('utf-8')))
+
+@pytest.mark.parametrize("html, esperados", [
+    (generar_pagina_catalogo(1), 60),
+    (generar_pagina_catalogo(2, estructurados=False), 60),
+    (f"<html><body>{LISTADO_SIN_ID}</body></html>", 8),
+], ids=["fixture", "fixture-sin-estructurados", "sin-id"])
+def test_enlace_y_tarjeta_dan_los_mismos_productos(html, esperados):
+    por_enlace = extraer(html, por_tarjeta=False)
+    por_tarjeta = extraer(html, por_tarjeta=True)
+    
+    assert len(por_enlace) == len(por_tarjeta) == esperados
+
+def test_botones_no_son_productos():
+    nombres = [p.nombre for p in extraer(f"<html><body>{LISTADO_SIN_ID}</body></html>", por_tarjeta=False)]
+    
+    assert not any('Comprar' in nombre for nombre in nombres)
@@ -0,0 +1,28 @@
+"""Muestreo de productos al azar: las páginas salen de todo el listado descubierto"""
+
+import random
+
+from benchmark import crear_scraper
+
+def test_muestreo_usa_todas_las_paginas(monkeypatch):
+    scraper = crear_scraper('https://henko.test', {})
+    pagina_1 = object()
+    monkeypatch.setattr(scraper, 'descubrir_paginacion', lambda: (30, pagina_1))
+    
+    sorteos = []
+    def iterar(paginas, soups):
+        sorteos.append((list(paginas), dict(soups)))
+        scraper.estadisticas_streaming = {'paginas': 0, 'tarjetas': 0}
+        yield from ()
+    monkeypatch.setattr(scraper, '_iterar_productos_con_pagina', iterar)
+    
+    random.seed(0)
+    for _ in range(50):
+        scraper.obtener_productos_aleatorios(5)
+    
+    paginas = {pagina for sorteo, _ in sorteos for pagina in sorteo}
+    assert max(paginas) > 5
+    assert paginas <= set(range(1, 31))
+    # La página 1 del sondeo se reutiliza solo cuando sale sorteada
+    for sorteo, soups in sorteos:
+        assert soups == ({1: pagina_1} if 1 in sorteo else {})
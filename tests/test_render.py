@@ -0,0 +1,52 @@
+"""Renderizado de mensajes: una petición por texto, límites de Telegram y ningún error de formato"""
+
+import pytest
+
+from benchmark import ServidorTelegramFalso, crear_telegram, generar_png
+from henko_bot import CopyGenerator, HenkoBot, Producto, RenderizadorTelegram
+
+NOMBRES = {
+    "simple": "Conjunto Lody Encaje",
+    "markdown": "Body_encaje *NUEVO* [promo 2x1]",
+    "html": "Conjunto <Lody> & Co. 50% off!",
+    "larguisimo": "Soutien Push-Up Encaje " * 60,
+}
+
+@pytest.fixture(scope='module')
+def servidor():
+    with ServidorTelegramFalso(latencia=0) as servidor:
+        yield servidor
+
+@pytest.fixture(scope='module')
+def foto(tmp_path_factory):
+    ruta = tmp_path_factory.mktemp('fotos') / 'foto.png'
+    ruta.write_bytes(generar_png(300, 300))
+    return str(ruta)
+
+@pytest.mark.parametrize('nombre', NOMBRES.values(), ids=NOMBRES.keys())
+@pytest.mark.parametrize('parse_mode', ["HTML", "MarkdownV2"])
+def test_envio_renderizado(servidor, foto, parse_mode, nombre):
+    bot = HenkoBot.__new__(HenkoBot)
+    bot.renderizador = RenderizadorTelegram(parse_mode)
+    telegram = crear_telegram(servidor, renderizador=bot.renderizador)
+    telegram.limitador_grupo.peticiones_por_segundo = 1000  # probar la API, no esperar el límite por chat
+    producto = Producto(id='1', nombre=nombre, marca='Lody', precio_original='$20.000', precio_oferta='$15.000',
+                        stock='En stock', link='https://henko.test/productos/body_encaje-1/', imagen_url=foto,
+                        colores=[], talles=[], categoria='Body')
+    mensaje = bot.generar_mensaje_telegram(producto, CopyGenerator().generar_copy_instagram(producto))
+    servidor.largo_maximo = {'text': 0, 'caption': 0}
+    errores = servidor.errores_formato
+    
+    peticiones = servidor.peticiones
+    assert telegram.enviar_mensaje(mensaje)
+    assert servidor.peticiones - peticiones == 1
+    
+    # El caption lleva lo que entra en 1024 y el resto va en mensajes aparte
+    _, resto = bot.renderizador.caption_y_resto(mensaje)
+    peticiones = servidor.peticiones
+    assert telegram.enviar_foto_con_texto(foto, mensaje)
+    assert servidor.peticiones - peticiones == 1 + len(resto)
+    
+    assert servidor.errores_formato == errores
+    assert servidor.largo_maximo['caption'] <= RenderizadorTelegram.MAX_CAPTION
+    assert servidor.largo_maximo['text'] <= RenderizadorTelegram.MAX_MENSAJE